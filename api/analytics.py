@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Incremental analytics aggregates for the transaction dashboard
+Totals per type/status, daily/hourly volume and top senders/receivers
+"""
+
+import heapq
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DASHBOARD_PATH = 'data/processed/dashboard.json'
+
+
+class AnalyticsEngine:
+    """
+    Running aggregates over a TransactionStore
+
+    Subscribe an instance to the store and every add/remove adjusts the
+    counters in O(1), so serving /analytics or writing dashboard.json
+    never rescans the transactions. Buckets whose count drops to zero are
+    removed so deleted data leaves no trace.
+    """
+
+    def __init__(self):
+        self.on_reset()
+
+    def on_reset(self):
+        """Clear all aggregates"""
+        self.count = 0
+        self.amount = 0.0
+        self.by_type = {}
+        self.by_status = {}
+        self.daily = {}
+        self.hourly = {}
+        self.senders = {}
+        self.receivers = {}
+
+    def on_add(self, transaction):
+        self._apply(transaction, 1)
+
+    def on_remove(self, transaction):
+        self._apply(transaction, -1)
+
+    def _apply(self, transaction, sign):
+        # Derive everything before changing anything: a listener that
+        # raised halfway would leave the store and the aggregates apart
+        amount = float(transaction.get('amount') or 0)
+        timestamp = transaction.get('timestamp')
+        if not isinstance(timestamp, str):
+            timestamp = ''
+
+        self.count += sign
+        self.amount += sign * amount
+
+        _bump(self.by_type, transaction.get('type'), sign, amount)
+        _bump(self.by_status, transaction.get('status'), sign, amount)
+        _bump(self.senders, transaction.get('sender'), sign, amount)
+        _bump(self.receivers, transaction.get('receiver'), sign, amount)
+
+        # ISO timestamps: YYYY-MM-DD for the day, YYYY-MM-DDTHH for the hour
+        if len(timestamp) >= 10:
+            _bump(self.daily, timestamp[:10], sign, amount)
+        if len(timestamp) >= 13:
+            _bump(self.hourly, timestamp[:13].replace(' ', 'T'), sign, amount)
+
+    def snapshot(self, top=10):
+        """
+        Current aggregates as a JSON-ready dictionary
+
+        Args:
+            top: Number of senders/receivers to include in the rankings
+        """
+        return {
+            "totals": {
+                "count": self.count,
+                "amount": round(self.amount, 2)
+            },
+            "by_type": _buckets(self.by_type),
+            "by_status": _buckets(self.by_status),
+            "daily_volume": _buckets(self.daily, sort_keys=True),
+            "hourly_volume": _buckets(self.hourly, sort_keys=True),
+            "top_senders": _top(self.senders, top),
+            "top_receivers": _top(self.receivers, top)
+        }
+
+    def materialize(self, filepath=DASHBOARD_PATH, top=10):
+        """Write the current snapshot to dashboard.json atomically"""
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(top), f, indent=2)
+        os.replace(tmp_path, filepath)
+
+
+def _bump(buckets, key, sign, amount):
+    """Add (sign=1) or remove (sign=-1) one transaction from a bucket"""
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = [0, 0.0]
+
+    bucket[0] += sign
+    bucket[1] += sign * amount
+
+    if bucket[0] <= 0:
+        del buckets[key]
+
+
+def _buckets(buckets, sort_keys=False):
+    keys = sorted(buckets) if sort_keys else buckets
+    return {
+        key: {"count": buckets[key][0], "amount": round(buckets[key][1], 2)}
+        for key in keys
+    }
+
+
+def _top(buckets, n):
+    ranked = heapq.nlargest(n, buckets.items(), key=lambda item: item[1][1])
+    return [
+        {"phone": key, "count": count, "amount": round(amount, 2)}
+        for key, (count, amount) in ranked
+    ]
+
+
+if __name__ == '__main__':
+    from api.journal import Journal
+    from api.store import TransactionStore
+
+    store = TransactionStore()
+    engine = AnalyticsEngine()
+    store.subscribe(engine)
+    store.load(Journal().replay())
+
+    engine.materialize()
+    print(f"Aggregated {engine.count} transactions")
+    print(f"Saved to {DASHBOARD_PATH}")
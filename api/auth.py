@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Basic Authentication for the transaction API
+Salted PBKDF2 password hashes and a bounded cache of verified headers
+"""
+
+from collections import OrderedDict
+import base64
+import getpass
+import hashlib
+import hmac
+import os
+import sys
+import threading
+
+HASH_SCHEME = 'pbkdf2_sha256'
+HASH_ITERATIONS = 100000
+
+
+def hash_password(password, salt=None, iterations=HASH_ITERATIONS):
+    """Hash a password as 'pbkdf2_sha256$iterations$salt$hash' (hex)"""
+    salt = salt if salt is not None else os.urandom(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations)
+    return f"{HASH_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, hashed):
+    """Check a password against a hash_password() string in constant time"""
+    try:
+        scheme, iterations, salt, digest = hashed.split('$')
+        if scheme != HASH_SCHEME:
+            return False
+        candidate = hashlib.pbkdf2_hmac('sha256', password.encode(),
+                                        bytes.fromhex(salt), int(iterations))
+        return hmac.compare_digest(candidate, bytes.fromhex(digest))
+    except ValueError:
+        return False
+
+
+def parse_credentials(text):
+    """
+    Users from 'name:hash,name:hash' (the MOMO_API_CREDENTIALS format)
+
+    Raises:
+        ValueError: for an entry without a name or hash
+    """
+    users = {}
+    for entry in text.split(','):
+        name, _, hashed = entry.strip().partition(':')
+        if not name or not hashed:
+            raise ValueError(f"Invalid credentials entry: {entry!r}")
+        users[name] = hashed
+    return users
+
+
+class BasicAuth:
+    """
+    Verify Basic Authorization headers against hashed passwords
+
+    Passwords are only held as salted PBKDF2 hashes, which are slow to
+    check on purpose. Headers that verified are remembered in an LRU of
+    max_entries, keyed by their SHA-256 digest so no credentials are kept
+    in memory, and repeat requests skip the base64 decode and the hash.
+    Failed attempts are never cached, so they cannot push out valid
+    entries.
+    """
+
+    def __init__(self, users, max_entries=256):
+        self.users = dict(users)
+        self.max_entries = max_entries
+        # Checked for unknown users too, so timing does not reveal which names exist
+        self._dummy = hash_password('')
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, header):
+        """Username for a valid 'Basic ...' header, or None"""
+        if not header:
+            return None
+        key = hashlib.sha256(header.encode()).digest()
+        with self._lock:
+            username = self._verified.get(key)
+            if username is not None:
+                self._verified.move_to_end(key)
+                return username
+
+        username = self._verify(header)
+        if username is not None and self.max_entries:
+            with self._lock:
+                self._verified[key] = username
+                while len(self._verified) > self.max_entries:
+                    self._verified.popitem(last=False)
+        return username
+
+    def set_password(self, username, hashed):
+        """Add or replace a user; forgets every cached verification"""
+        with self._lock:
+            self.users[username] = hashed
+            self._verified.clear()
+
+    def _verify(self, header):
+        auth_type, _, credentials = header.partition(' ')
+        if auth_type.lower() != 'basic':
+            return None
+        try:
+            decoded = base64.b64decode(credentials.strip(), validate=True).decode()
+        except (ValueError, UnicodeDecodeError):
+            return None
+        username, separator, password = decoded.partition(':')
+        if not separator:
+            return None
+        hashed = self.users.get(username)
+        valid = verify_password(password, hashed or self._dummy)
+        return username if valid and hashed is not None else None
+
+
+if __name__ == '__main__':
+    # Print a MOMO_API_CREDENTIALS entry for a user
+    username = sys.argv[1] if len(sys.argv) > 1 else 'admin'
+    password = getpass.getpass(f"Password for {username}: ")
+    print(f"{username}:{hash_password(password)}")
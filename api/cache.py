@@ -0,0 +1,158 @@
+"""
+Versioned response cache for the transaction API
+LRU of encoded GET bodies with ETag/Last-Modified validators
+"""
+
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+import hashlib
+import math
+import threading
+import time
+
+from api.encoding import gzip_bytes
+
+
+class CachedResponse:
+    """
+    One encoded 200 response body and its validators
+
+    The ETag is a hash of the body, so a resource whose bytes did not
+    change keeps its ETag across unrelated writes. It is weak (W/) because
+    the same validator covers the identity and gzip encodings.
+
+    modified is the whole second after the last write (see
+    ResponseCache.invalidate). A body built before that second has begun
+    gets no Last-Modified at all, since a later write in the same second
+    would carry the same date and If-Modified-Since could not tell them
+    apart; such entries are validated by ETag only.
+    """
+
+    __slots__ = ('version', 'body', 'etag', 'last_modified', '_gzipped')
+
+    def __init__(self, version, body, modified):
+        self.version = version
+        self.body = body
+        self.etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.last_modified = formatdate(modified, usegmt=True) if modified <= time.time() else None
+        self._gzipped = None
+
+    def gzipped(self):
+        """The body gzip-compressed, computed on first use"""
+        if self._gzipped is None:
+            self._gzipped = gzip_bytes(self.body)
+        return self._gzipped
+
+    def matches(self, if_none_match=None, if_modified_since=None):
+        """
+        True if the client's copy is current (answer 304)
+
+        If-None-Match takes precedence; If-Modified-Since is only
+        consulted when no If-None-Match header was sent (RFC 9110).
+        """
+        if if_none_match is not None:
+            if if_none_match.strip() == '*':
+                return True
+            # Weak comparison: W/"x" and "x" name the same representation
+            tags = {_strip_weak(tag.strip()) for tag in if_none_match.split(',')}
+            return _strip_weak(self.etag) in tags
+
+        if if_modified_since is not None and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return parsedate_to_datetime(self.last_modified) <= since
+        return False
+
+
+def _strip_weak(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded GET responses keyed on path + query
+
+    Every write bumps the data version and empties the cache
+    (invalidate()), so there is no need to work out which cached pages a
+    write touched. A reader takes the version before reading the store
+    and passes it to put(), so a response computed while a write was in
+    flight is never stored as current.
+
+    Bounded by max_entries and max_bytes (identity bodies); the least
+    recently used entries are evicted first. max_entries=0 disables
+    caching: get() always misses and put() stores nothing.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self.modified = _next_second(time.time())
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Current entry for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body):
+        """
+        Cache body under key if version is still current
+
+        Returns:
+            The CachedResponse (also when it was too old or too large to
+            keep), so the caller can send it either way
+        """
+        # Hash outside the lock; a stale entry is simply not stored
+        entry = CachedResponse(version, body, self.modified)
+        with self._lock:
+            if (version != self.version or not self.max_entries
+                    or len(body) > self.max_bytes):
+                return entry
+
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+            return entry
+
+    def invalidate(self, modified=None):
+        """
+        Record a write: every cached response becomes stale
+
+        Args:
+            modified: When the data last changed (e.g. the data files'
+                mtime at startup); defaults to now
+        """
+        with self._lock:
+            self.version += 1
+            # Rounded up: HTTP dates have one-second resolution, and an
+            # earlier date could equal one already sent for older data
+            self.modified = _next_second(modified if modified is not None else time.time())
+            self._entries.clear()
+            self._bytes = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.body)
+
+
+def _next_second(timestamp):
+    return math.floor(timestamp) + 1
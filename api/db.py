@@ -0,0 +1,312 @@
+"""
+SQLite storage backend for the transaction API
+Pooled connections and a TransactionStore-compatible interface
+"""
+
+from contextlib import contextmanager
+import queue
+import sqlite3
+import threading
+
+from dsa.record import Transaction
+from etl.config import DB_PATH
+from etl.load_db import CREATE_TRANSACTION, IdResolver, connect, create_schema, load_transactions
+
+SELECT_TRANSACTIONS = "SELECT id, type, amount, sender, receiver, timestamp, status, reference FROM vw_transactions"
+
+# Store field -> column of vw_transactions usable in WHERE clauses
+FILTER_COLUMNS = {
+    'type': 'type',
+    'status': 'status',
+    'sender': 'sender',
+    'receiver': 'receiver',
+}
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared across worker threads
+
+    Connections are created up front with the tuned pragmas (WAL lets
+    readers proceed while a writer commits) and handed out through a
+    LIFO queue so hot connections keep their page cache warm.
+    """
+
+    def __init__(self, db_path=DB_PATH, size=8):
+        self.db_path = db_path
+        self._pool = queue.LifoQueue(maxsize=size)
+
+        for _ in range(size):
+            self._pool.put(connect(db_path, check_same_thread=False))
+
+        with self.connection() as conn:
+            create_schema(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and run the block inside BEGIN/COMMIT"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+def row_to_transaction(row):
+    """vw_transactions row (columns in dsa.record.FIELDS order) -> Transaction"""
+    return Transaction(*row)
+
+
+class SQLiteTransactionStore:
+    """
+    TransactionStore backed by SQLite instead of process memory
+
+    Offers the same methods the API uses on api.store.TransactionStore,
+    so datasets larger than RAM can be served. Constraint violations
+    (duplicate reference, unknown status) surface as ValueError.
+
+    The table may also be written by etl/ingest.py while the API runs, so
+    allocate_id() starts past the largest id in the table and add() only
+    ever inserts: an id taken meanwhile fails rather than being
+    overwritten. Reloading by id is load()'s job.
+
+    Writes inside a batch() block share one transaction; each write runs
+    in a savepoint, so a failed row is rolled back on its own. Listeners
+    are told once the row is written, so like AnalyticsEngine they must
+    accept any row the schemas let through without raising.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._listeners = []
+        # Connection of the batch() open on this thread, if any
+        self._local = threading.local()
+
+        with pool.connection() as conn:
+            max_id = conn.execute("SELECT MAX(transaction_id) FROM Transactions").fetchone()[0]
+        self.next_id = (max_id or 0) + 1
+
+    def load(self, transactions):
+        """Replace the table contents with the given transactions"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM Transactions")
+            load_transactions(conn, transactions)
+            max_id = conn.execute("SELECT MAX(transaction_id) FROM Transactions").fetchone()[0]
+        self.next_id = (max_id or 0) + 1
+
+        for listener in self._listeners:
+            listener.on_reset()
+            for transaction in self:
+                listener.on_add(transaction)
+
+    @contextmanager
+    def batch(self):
+        """Run the writes of a with-block in one transaction (one commit)"""
+        with self.pool.transaction() as conn:
+            self._local.conn = conn
+            try:
+                yield
+            finally:
+                self._local.conn = None
+
+    @contextmanager
+    def _write(self):
+        """Connection for one write: its own transaction, or a savepoint in the batch"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self.pool.transaction() as conn:
+                yield conn
+            return
+
+        conn.execute("SAVEPOINT write")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK TO write")
+            raise
+        finally:
+            conn.execute("RELEASE write")
+
+    @contextmanager
+    def _read(self):
+        """The batch connection (sees its uncommitted writes) or a pooled one"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+        else:
+            with self.pool.connection() as conn:
+                yield conn
+
+    def hydrate(self):
+        """Nothing to build: rows are read from the database on demand"""
+
+    def subscribe(self, listener):
+        """Register a listener and replay the current rows into it"""
+        self._listeners.append(listener)
+        listener.on_reset()
+        for transaction in self:
+            listener.on_add(transaction)
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0]
+
+    def __iter__(self):
+        """Stream all transactions in id order, a batch at a time"""
+        last = 0
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    f"{SELECT_TRANSACTIONS} WHERE id > ? ORDER BY id LIMIT 1000", (last,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row_to_transaction(row)
+            last = rows[-1][0]
+
+    def __contains__(self, tid):
+        return self.get(tid) is not None
+
+    def all(self):
+        return list(self)
+
+    def allocate_id(self):
+        with self._read() as conn:
+            max_id = conn.execute("SELECT MAX(transaction_id) FROM Transactions").fetchone()[0]
+        tid = max(self.next_id, (max_id or 0) + 1)
+        self.next_id = tid + 1
+        return tid
+
+    def get(self, tid):
+        return self._fetch_one(f"{SELECT_TRANSACTIONS} WHERE id = ?", (int(tid),))
+
+    def get_by_reference(self, reference):
+        return self._fetch_one(f"{SELECT_TRANSACTIONS} WHERE reference = ?", (reference,))
+
+    def find(self, field, value):
+        transactions, _ = self.query(filters={field: value})
+        return transactions
+
+    def add(self, transaction):
+        """Insert a new row; ValueError if its id or reference is taken"""
+        transaction = Transaction.from_dict(transaction)
+        try:
+            with self._write() as conn:
+                resolver = IdResolver(conn)
+                resolver.resolve_users([transaction.get('sender', ''), transaction.get('receiver', '')])
+                conn.execute(CREATE_TRANSACTION, resolver.row(transaction))
+        except sqlite3.IntegrityError as e:
+            raise ValueError(_constraint_message(e))
+
+        self.next_id = max(self.next_id, transaction.id + 1)
+        self._notify('on_add', transaction)
+        return transaction
+
+    def update(self, tid, changes):
+        transaction = self.get(tid)
+        if transaction is None:
+            return None
+
+        updated = transaction.replace(**changes)
+        try:
+            with self._write() as conn:
+                resolver = IdResolver(conn)
+                resolver.resolve_users([updated.get('sender', ''), updated.get('receiver', '')])
+                row = resolver.row(updated)
+                conn.execute(
+                    """UPDATE Transactions
+                       SET reference = ?, sender_id = ?, receiver_id = ?, category_id = ?,
+                           amount = ?, status = ?, transaction_date = ?,
+                           updated_at = CURRENT_TIMESTAMP
+                       WHERE transaction_id = ?""",
+                    row[1:] + (row[0],)
+                )
+        except sqlite3.IntegrityError as e:
+            raise ValueError(_constraint_message(e))
+
+        self._notify('on_remove', transaction)
+        self._notify('on_add', updated)
+        return updated
+
+    def delete(self, tid):
+        transaction = self.get(tid)
+        if transaction is None:
+            return None
+
+        with self._write() as conn:
+            conn.execute("DELETE FROM Transactions WHERE transaction_id = ?", (int(tid),))
+
+        self._notify('on_remove', transaction)
+        return transaction
+
+    def query(self, filters=None, prefixes=None, min_amount=None, max_amount=None,
+              since=None, until=None, after=None, limit=None):
+        """Same contract as TransactionStore.query, answered with SQL"""
+        clauses = ["id > ?"]
+        params = [int(after) if after is not None else 0]
+
+        for field, value in (filters or {}).items():
+            clauses.append(f"{FILTER_COLUMNS[field]} = ?")
+            params.append(value)
+
+        for field, prefix in (prefixes or {}).items():
+            # A half-open range rather than LIKE, so the phone index applies
+            column = FILTER_COLUMNS[field]
+            clauses.append(f"{column} >= ? AND {column} < ?")
+            params.extend((prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+
+        for clause, value in (("amount >= ?", min_amount), ("amount <= ?", max_amount),
+                              ("timestamp >= ?", since), ("timestamp < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = f"{SELECT_TRANSACTIONS} WHERE {' AND '.join(clauses)} ORDER BY id"
+        if limit is not None:
+            # One extra row tells us whether another page exists
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        page = [row_to_transaction(row) for row in rows[:limit]]
+        next_cursor = page[-1]['id'] if limit is not None and len(rows) > limit else None
+        return page, next_cursor
+
+    def _fetch_one(self, sql, params):
+        with self._read() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return row_to_transaction(row) if row else None
+
+    def _notify(self, event, transaction):
+        for listener in self._listeners:
+            getattr(listener, event)(transaction)
+
+
+def _constraint_message(error):
+    message = str(error)
+    if 'transaction_id' in message:
+        return "Transaction id already exists"
+    if 'reference' in message:
+        return "Reference already exists"
+    if 'status' in message:
+        return "Invalid status"
+    return f"Constraint violation: {message}"
@@ -0,0 +1,243 @@
+"""
+Body encoding for the transaction API
+Compact JSON, incremental list encoding/decoding and chunked/gzip transfer
+"""
+
+import codecs
+import json
+import zlib
+
+from dsa import serializer
+from dsa.record import to_json
+
+# Bodies smaller than this are not worth gzipping
+GZIP_MIN_SIZE = 1024
+
+
+def dumpb(data, pretty=False):
+    """Encode a JSON document as bytes, compact unless pretty is requested"""
+    return serializer.dumpb(data, pretty)
+
+
+def iter_json_list(envelope, key, items, pretty=False, batch_size=256):
+    """
+    Encode {**envelope, key: items} incrementally
+
+    Yields bytes fragments: the envelope fields, then the list in batches
+    of batch_size items, so the whole document is never held at once.
+    Compact output goes through the fast serializer backend; in pretty
+    mode each item goes on its own line (stdlib json, for humans only).
+    """
+    if pretty:
+        open_, field_sep, item_sep, close = b'{\n  ', b',\n  ', b',\n    ', b'\n  ]\n}'
+        list_open, colon = b'[\n    ', b': '
+        encode = lambda value: json.dumps(value, separators=(', ', ': '), default=to_json,
+                                         allow_nan=False).encode()
+    else:
+        open_, field_sep, item_sep, close = b'{', b',', b',', b']}'
+        list_open, colon = b'[', b':'
+        encode = serializer.dumpb
+
+    fields = [serializer.dumpb(k) + colon + encode(v) for k, v in envelope.items()]
+    fields.append(serializer.dumpb(key) + colon + list_open)
+    yield open_ + field_sep.join(fields)
+
+    batch = []
+    count = 0
+    for item in items:
+        if count:
+            batch.append(item_sep)
+        batch.append(encode(item))
+        count += 1
+
+        if count % batch_size == 0:
+            yield b''.join(batch)
+            batch = []
+
+    if batch:
+        yield b''.join(batch)
+    yield close if count or not pretty else b']\n}'
+
+
+def iter_json_items(rfile, length, chunk_size=65536):
+    """
+    Decode a request body item by item as it is read
+
+    The body is either a JSON array or NDJSON (one JSON value per line),
+    told apart by its first non-blank byte. Only one chunk of the raw body
+    is held at a time.
+
+    Yields:
+        (item, error) pairs. In NDJSON each line stands alone, so a
+        malformed line yields (None, message) and decoding continues.
+
+    Raises:
+        ValueError: for a malformed JSON array (nothing after the error
+        can be located)
+    """
+    remaining = length
+
+    def read():
+        nonlocal remaining
+        data = rfile.read(min(chunk_size, remaining)) if remaining > 0 else b''
+        if not data:
+            remaining = 0
+        remaining -= len(data)
+        return data
+
+    head = b''
+    while remaining > 0 and not head.strip():
+        head += read()
+    if head.lstrip()[:1] == b'[':
+        yield from _iter_array(head, read)
+    else:
+        yield from _iter_lines(head, read)
+
+
+def _iter_lines(buffer, read):
+    """NDJSON items; buffer holds bytes already read"""
+    while True:
+        data = read()
+        buffer += data
+        lines = buffer.split(b'\n')
+        buffer = lines.pop() if data else b''
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield serializer.loads(line), None
+            except ValueError:
+                yield None, "Invalid JSON"
+        if not data:
+            return
+
+
+def _iter_array(head, read):
+    """Items of a JSON array; head holds bytes already read, starting with '['"""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = utf8.decode(head)
+    position = buffer.index('[') + 1
+    expect_item = True
+
+    def fill():
+        nonlocal buffer, position
+        data = read()
+        buffer = buffer[position:] + utf8.decode(data, final=not data)
+        position = 0
+        return bool(data)
+
+    def next_char():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                return None
+
+    if next_char() == ']':
+        position += 1
+        expect_item = False
+
+    while expect_item:
+        if next_char() is None:
+            raise ValueError("Unterminated JSON array")
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            item, end = None, None
+        # Until a separator follows, the value may be cut short (12|34, 1|.5)
+        if end is not None:
+            follow = end
+            while follow < len(buffer) and buffer[follow] in ' \t\r\n':
+                follow += 1
+            complete = follow < len(buffer) and buffer[follow] in ',]'
+        if end is None or not complete:
+            if fill():
+                continue
+            if end is None:
+                raise ValueError("Invalid JSON array")
+        position = end
+        yield item, None
+
+        separator = next_char()
+        position += 1
+        if separator == ']':
+            break
+        if separator != ',':
+            raise ValueError("Invalid JSON array")
+
+    if next_char() is not None:
+        raise ValueError("Invalid JSON array")
+
+
+def accepts_gzip(accept_encoding):
+    """True if an Accept-Encoding header allows gzip"""
+    for coding in (accept_encoding or '').split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def gzip_bytes(body):
+    """Compress a complete body with gzip framing"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class ChunkedWriter:
+    """
+    Write a response body incrementally
+
+    Fragments are buffered up to buffer_size bytes and then emitted as one
+    HTTP/1.1 chunk (or written raw when chunked is False, for HTTP/1.0
+    clients where the connection close ends the body). With gzip enabled
+    the data is compressed on the fly.
+    """
+
+    def __init__(self, wfile, chunked=True, gzip=False, buffer_size=65536):
+        self.wfile = wfile
+        self.chunked = chunked
+        self.buffer_size = buffer_size
+        self.bytes_written = 0
+        self._buffer = []
+        self._buffered = 0
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        if data:
+            self._buffer.append(data)
+            self._buffered += len(data)
+        if self._buffered >= self.buffer_size:
+            self._flush_buffer()
+
+    def close(self):
+        """Flush remaining data and terminate the chunked body"""
+        if self._compressor is not None:
+            tail = self._compressor.flush()
+            if tail:
+                self._buffer.append(tail)
+                self._buffered += len(tail)
+        self._flush_buffer()
+        if self.chunked:
+            self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def _flush_buffer(self):
+        if not self._buffered:
+            return
+        data = b''.join(self._buffer)
+        if self.chunked:
+            self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+        else:
+            self.wfile.write(data)
+        self.bytes_written += len(data)
+        self._buffer = []
+        self._buffered = 0
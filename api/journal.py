@@ -0,0 +1,358 @@
+"""
+Write-ahead mutation journal for the transaction store
+Append-only JSON lines with periodic compaction into a snapshot
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+from dsa import serializer
+from dsa.snapshot import MappedSnapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, writers must coordinate
+    fcntl = None
+
+FSYNC_POLICIES = ('always', 'batch', 'never')
+SNAPSHOT_FORMATS = ('binary', 'json')
+
+
+class JournalLocked(RuntimeError):
+    """Another process is writing the journal"""
+
+
+class Journal:
+    """
+    Append-only log of store mutations
+
+    Each POST/PUT/DELETE appends one JSON line instead of rewriting the
+    whole dataset, so write cost no longer depends on row count. The
+    snapshot is only rewritten on compaction.
+
+    Snapshot format:
+        binary - data/transactions.snap (dsa/snapshot.py), opened with
+                 mmap at startup; data/transactions.json is left as is
+                 and can be regenerated with `dsa/snapshot.py export`
+        json   - data/transactions.json
+
+    Whichever snapshot file is newer is the current one, so switching
+    formats never loses the data compacted under the other.
+
+    fsync policy:
+        always - fsync after every record (safest, slowest)
+        batch  - group commit: fsync once per group_size records or
+                 group_interval seconds, whichever comes first; a timer
+                 syncs the tail of a burst that stops short of group_size
+        never  - leave flushing to the OS
+
+    Snapshots are written compact unless pretty is set. Appends, syncs
+    and compaction are serialized by an internal lock, since the batch
+    timer syncs from its own thread.
+
+    Only one process may write a journal: the first append (or an explicit
+    acquire()) takes an exclusive lock on <journal>.lock until close().
+    """
+
+    def __init__(self, snapshot_path='data/transactions.json',
+                 journal_path='data/transactions.journal',
+                 fsync='batch', group_size=64, group_interval=1.0,
+                 compact_every=10000, pretty=False,
+                 snapshot_format='binary'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.compact_every = compact_every
+        self.pretty = pretty
+        self.snapshot_format = snapshot_format
+        self.binary_path = os.path.splitext(snapshot_path)[0] + '.snap'
+        self.meta_path = os.path.splitext(snapshot_path)[0] + '.meta.json'
+
+        self.entries = 0
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._file = None
+        self._grouped = 0
+        self._timer = None
+        self._lock = threading.RLock()
+        self._lock_file = None
+
+    def replay(self):
+        """
+        Rebuild the transaction list from snapshot + journal
+
+        A torn final line (crash mid-append) is ignored; everything before
+        it is applied in order.
+
+        Returns:
+            List of transaction dictionaries (Transaction records for
+            rows from a binary snapshot)
+        """
+        if self._binary_is_current():
+            snapshot = MappedSnapshot(self.binary_path)
+        else:
+            try:
+                with open(self.snapshot_path, 'rb') as f:
+                    snapshot = serializer.load(f)
+            except FileNotFoundError:
+                snapshot = []
+
+        transactions = {str(t['id']): t for t in snapshot}
+        self.entries = 0
+
+        for entry in self.iter_entries():
+            if entry['op'] == 'put':
+                transaction = entry['transaction']
+                transactions[str(transaction['id'])] = transaction
+            elif entry['op'] == 'delete':
+                transactions.pop(str(entry['id']), None)
+            self.entries += 1
+
+        return list(transactions.values())
+
+    def open_snapshot(self):
+        """
+        Map the binary snapshot without decoding it, for fast startup
+
+        The journal is read too (it is bounded by compact_every) so the
+        caller can apply it on top of the snapshot.
+
+        Returns:
+            (MappedSnapshot, list of journal entries), or None when the
+            binary snapshot is missing or older than the JSON one
+        """
+        if not self._binary_is_current():
+            return None
+        snapshot = MappedSnapshot(self.binary_path)
+        entries = list(self.iter_entries())
+        self.entries = len(entries)
+        return snapshot, entries
+
+    def _binary_is_current(self):
+        """True when the binary snapshot exists and is not older than the JSON one"""
+        try:
+            binary_mtime = os.stat(self.binary_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        try:
+            return binary_mtime >= os.stat(self.snapshot_path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+
+    def iter_entries(self):
+        """Yield journal entries in order, stopping at a torn final line"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    try:
+                        yield serializer.loads(line)
+                    except ValueError:
+                        return
+        except FileNotFoundError:
+            return
+
+    def next_id(self):
+        """
+        Next free transaction id without loading the snapshot
+
+        Uses the id high-water mark written alongside the snapshot at
+        compaction plus the ids in the (bounded) journal. Falls back to a
+        full replay when no metadata exists yet.
+        """
+        try:
+            with open(self.meta_path, 'r') as f:
+                next_id = json.load(f)['next_id']
+        except (FileNotFoundError, ValueError, KeyError):
+            return max((int(t['id']) for t in self.replay()), default=0) + 1
+
+        for entry in self.iter_entries():
+            if entry['op'] == 'put':
+                next_id = max(next_id, int(entry['transaction']['id']) + 1)
+        return next_id
+
+    def record_put(self, transaction):
+        """Journal the full state of a created or updated transaction"""
+        self._append({"op": "put", "transaction": transaction})
+
+    def record_delete(self, tid):
+        """Journal a deletion"""
+        self._append({"op": "delete", "id": str(tid)})
+
+    @contextmanager
+    def group(self):
+        """
+        Append many records with a single fsync when the block ends
+
+        Used by bulk writes whatever the fsync policy ('never' still
+        leaves flushing to the OS). Groups may nest.
+        """
+        with self._lock:
+            self._grouped += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._grouped -= 1
+                if not self._grouped and self.fsync != 'never':
+                    self.sync()
+
+    def needs_compaction(self):
+        """True once the journal has grown past compact_every entries"""
+        return self.compact_every > 0 and self.entries >= self.compact_every
+
+    def compact(self, transactions):
+        """
+        Write a fresh snapshot and truncate the journal
+
+        The snapshot and its metadata are each written to a temporary
+        file, fsynced and atomically renamed before the journal is
+        truncated, so a crash leaves either the old snapshot + journal or
+        the new snapshot intact.
+        """
+        with self._lock:
+            if self.snapshot_format == 'binary':
+                write_snapshot(self.binary_path, transactions)
+            else:
+                with _atomic_write(self.snapshot_path) as f:
+                    serializer.dump(transactions, f, pretty=self.pretty)
+
+            next_id = max((int(t['id']) for t in transactions), default=0) + 1
+            with _atomic_write(self.meta_path) as f:
+                f.write(json.dumps({"next_id": next_id, "count": len(transactions)}).encode())
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            open(self.journal_path, 'w').close()
+
+            self.entries = 0
+            self._pending = 0
+
+    def sync(self):
+        """Force pending journal records to disk"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._pending:
+                os.fsync(self._file.fileno())
+            self._pending = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the journal file; release the writer lock"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    def acquire(self):
+        """
+        Take the exclusive writer lock, held until close()
+
+        The API server takes it at startup and etl/ingest.py before it
+        appends, so the two never write the journal, or hand out the same
+        ids, at the same time.
+
+        Raises:
+            JournalLocked: if another process holds the lock
+        """
+        if self._lock_file is not None or fcntl is None:
+            return
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        lock_file = open(self.journal_path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise JournalLocked(f"{self.journal_path} is being written by another process "
+                                "(API server or etl/ingest.py)")
+        self._lock_file = lock_file
+
+    def _open(self):
+        self.acquire()
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Drop a torn final line so new entries are not hidden behind it
+        with open(self.journal_path, 'a+b') as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                block = f.read(position - start)
+                newline = block.rfind(b'\n')
+                if newline != -1:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                f.truncate(position)
+
+        self._file = open(self.journal_path, 'ab')
+
+    def _append(self, entry):
+        with self._lock:
+            if self._file is None:
+                self._open()
+
+            self._file.write(serializer.dumpb(entry) + b'\n')
+            self._file.flush()
+            self.entries += 1
+            self._pending += 1
+
+            if self._grouped:
+                return
+            if self.fsync == 'always':
+                self.sync()
+            elif self.fsync == 'batch':
+                elapsed = time.monotonic() - self._last_sync
+                if self._pending >= self.group_size or elapsed >= self.group_interval:
+                    self.sync()
+                elif self._timer is None:
+                    self._timer = threading.Timer(self.group_interval, self._timed_sync)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _timed_sync(self):
+        """Batch timer: sync whatever the last burst left pending"""
+        with self._lock:
+            self._timer = None
+            self.sync()
+
+
+@contextmanager
+def _atomic_write(path):
+    """Binary file handle whose contents replace path only once fsynced"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,251 @@
+"""
+Request metrics and profiling for the transaction API
+Latency histograms, counters, phase timers and a slow-request profiler
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+
+# Histogram upper bounds in seconds: 0.1 ms to ~13 s, each sqrt(2) times
+# the last, so a quantile interpolated inside a bucket is within ~20%
+BUCKETS = tuple(round(0.0001 * 2 ** (k / 2), 7) for k in range(35))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+PHASES = ('auth', 'parse', 'store', 'serialize', 'persist')
+
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram (Prometheus layout)
+
+    Quantiles are estimated by linear interpolation inside the bucket that
+    holds the requested rank, so memory stays constant however many
+    requests are observed.
+    """
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimated q-quantile in seconds (0.0 when empty)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs ending with +Inf"""
+        total = 0
+        pairs = []
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Metrics:
+    """
+    Process-wide request metrics
+
+    Requests are counted per method, endpoint and status, with request and
+    response bytes and a latency histogram per method and endpoint. Phase
+    timers (auth, parse, store, serialize, persist) are histograms of their
+    own, summed over all endpoints. render() produces the Prometheus text
+    exposition format.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = {}
+        self.request_bytes = {}
+        self.response_bytes = {}
+        self.latency = {}
+        self.phases = {phase: Histogram() for phase in PHASES}
+        self._lock = threading.Lock()
+
+    def observe_request(self, method, endpoint, status, seconds,
+                        request_bytes=0, response_bytes=0):
+        """Record one finished request"""
+        key = (method, endpoint)
+        with self._lock:
+            counter = (method, endpoint, status)
+            self.requests[counter] = self.requests.get(counter, 0) + 1
+            self.request_bytes[key] = self.request_bytes.get(key, 0) + request_bytes
+            self.response_bytes[key] = self.response_bytes.get(key, 0) + response_bytes
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_phase(self, phase, seconds):
+        """Add time spent in one phase of a request"""
+        with self._lock:
+            self.phases[phase].observe(seconds)
+
+    @contextmanager
+    def time(self, phase):
+        """Time a with-block as one phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def render(self, extra=()):
+        """
+        Prometheus text format (version 0.0.4)
+
+        Args:
+            extra: (name, type, help, value) samples owned by the caller
+        """
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family('momo_http_requests_total', 'counter', 'Requests handled')
+            for (method, endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'momo_http_requests_total{{method="{method}",'
+                             f'endpoint="{endpoint}",status="{status}"}} {count}')
+
+            for name, totals, help_text in (
+                    ('momo_http_request_bytes_total', self.request_bytes, 'Request body bytes received'),
+                    ('momo_http_response_bytes_total', self.response_bytes, 'Response bytes sent')):
+                family(name, 'counter', help_text)
+                for (method, endpoint), total in sorted(totals.items()):
+                    lines.append(f'{name}{{method="{method}",endpoint="{endpoint}"}} {total}')
+
+            family('momo_http_request_duration_seconds', 'histogram', 'Request latency')
+            for (method, endpoint), histogram in sorted(self.latency.items()):
+                _histogram_lines(lines, 'momo_http_request_duration_seconds',
+                                 f'method="{method}",endpoint="{endpoint}"', histogram)
+
+            family('momo_http_request_duration_quantile_seconds', 'gauge',
+                   'Request latency quantiles estimated from the histogram')
+            for (method, endpoint), histogram in sorted(self.latency.items()):
+                for q in QUANTILES:
+                    lines.append(f'momo_http_request_duration_quantile_seconds{{method="{method}",'
+                                 f'endpoint="{endpoint}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+
+            family('momo_http_phase_duration_seconds', 'histogram',
+                   'Time spent in each request phase')
+            for phase, histogram in self.phases.items():
+                _histogram_lines(lines, 'momo_http_phase_duration_seconds',
+                                 f'phase="{phase}"', histogram)
+
+            family('momo_http_phase_duration_quantile_seconds', 'gauge',
+                   'Phase time quantiles estimated from the histogram')
+            for phase, histogram in self.phases.items():
+                for q in QUANTILES:
+                    lines.append(f'momo_http_phase_duration_quantile_seconds{{phase="{phase}",'
+                                 f'quantile="{q}"}} {histogram.quantile(q):.6f}')
+
+        family('momo_process_start_time_seconds', 'gauge', 'Server start time (Unix)')
+        lines.append(f'momo_process_start_time_seconds {self.started:.3f}')
+        for name, kind, help_text, value in extra:
+            family(name, kind, help_text)
+            lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(lines, name, labels, histogram):
+    for bound, total in histogram.cumulative():
+        le = '+Inf' if bound == float('inf') else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {total}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in cProfile sampling for slow requests
+
+    A sample_rate fraction of requests runs under cProfile; those that
+    take at least threshold_ms are written to directory as .prof files
+    (open with `python -m pstats` or snakeviz). At most max_dumps files
+    are written per process. sample_rate=0 (the default) turns it off.
+    """
+
+    def __init__(self, sample_rate=0.0, threshold_ms=100.0,
+                 directory='data/logs/profiles', max_dumps=100):
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self.dumps = 0
+
+    def begin(self):
+        """Start profiling this request if it is sampled; returns the profile or None"""
+        if not self.sample_rate or self.dumps >= self.max_dumps:
+            return None
+        if random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active
+            return None
+        return profile
+
+    def end(self, profile, seconds, label):
+        """Stop profiling; dump the profile if the request was slow"""
+        if profile is None:
+            return None
+        profile.disable()
+        elapsed_ms = seconds * 1000
+        if elapsed_ms < self.threshold_ms or self.dumps >= self.max_dumps:
+            return None
+
+        self.dumps += 1
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')
+        path = os.path.join(self.directory,
+                            f"{time.strftime('%Y%m%dT%H%M%S')}_{self.dumps}_{slug}_{elapsed_ms:.0f}ms.prof")
+        profile.dump_stats(path)
+        return path
+
+
+class CountingWriter:
+    """File-like wrapper that counts the bytes written through it"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.bytes_written = 0
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        return self.wfile.write(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.wfile, name)
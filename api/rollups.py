@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Per-user rollups for the transaction API
+Running balances and hour/day/month windows per user and category
+"""
+
+from itertools import groupby
+from operator import itemgetter
+import heapq
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa import serializer
+
+ROLLUPS_PATH = 'data/processed/rollups.json'
+
+# Window size -> length of the ISO timestamp prefix naming the window,
+# coarsest first: a short timestamp still yields its leading windows
+GRANULARITIES = {'month': 7, 'day': 10, 'hour': 13}
+
+# Position of each granularity's windows in UserLedger.buckets
+WINDOW_SLOTS = {granularity: slot for slot, granularity in enumerate(GRANULARITIES, start=1)}
+
+
+class UserLedger:
+    """
+    One user's totals, per-category totals and tumbling windows
+
+    Every bucket is [count, sent, received]. buckets[0] maps category to a
+    bucket; buckets[WINDOW_SLOTS[granularity]] maps (period, category),
+    e.g. ('2024-01-15', 'SEND') for a day. One flat dict per granularity
+    keeps the many single-transaction hour windows small; they are only
+    sorted when a history is asked for.
+    """
+
+    __slots__ = ('total', 'buckets')
+
+    def __init__(self):
+        self.total = [0, 0.0, 0.0]
+        self.buckets = [{} for _ in range(len(GRANULARITIES) + 1)]
+
+    @property
+    def categories(self):
+        return self.buckets[0]
+
+    def windows(self, granularity):
+        return self.buckets[WINDOW_SLOTS[granularity]]
+
+
+class RollupEngine:
+    """
+    Per-user balance ledger over a TransactionStore
+
+    Subscribe an instance to the store and each add/remove posts the
+    amount as sent for the sender and received for the receiver, into the
+    user's totals, their per-category totals and one hour, day and month
+    window each: O(1) per transaction. A user's history is then read from
+    their windows alone, in O(windows) however many transactions they
+    have. Buckets whose count drops to zero are removed, as in
+    AnalyticsEngine.
+
+    active_users() mirrors the vw_active_users view in
+    database/database_setup.sql, and balance is received - sent.
+    """
+
+    def __init__(self):
+        self.on_reset()
+
+    def on_reset(self):
+        """Clear all rollups"""
+        self.users = {}
+
+    def on_add(self, transaction):
+        self._apply(transaction, 1)
+
+    def on_remove(self, transaction):
+        self._apply(transaction, -1)
+
+    def _apply(self, transaction, sign):
+        # Only _post mutates, and only once every key below is known: a
+        # row the SQLite backend let through (a numeric timestamp, say)
+        # posts without windows instead of raising between two parties
+        amount = sign * float(transaction.get('amount') or 0)
+        category = sys.intern(_text(transaction.get('type')) or 'UNKNOWN')
+        timestamp = _text(transaction.get('timestamp')).replace(' ', 'T')
+        # Keys line up with UserLedger.buckets. Periods are interned:
+        # thousands of users share each hour string
+        keys = [category]
+        for length in GRANULARITIES.values():
+            if len(timestamp) < length:
+                break
+            keys.append((sys.intern(timestamp[:length]), category))
+        sender = _text(transaction.get('sender'))
+        receiver = _text(transaction.get('receiver'))
+
+        # A transfer to oneself counts once, like COUNT(DISTINCT ...) in the view
+        if sender and sender == receiver:
+            self._post(sender, keys, sign, amount, amount)
+            return
+        if sender:
+            self._post(sender, keys, sign, amount, 0.0)
+        if receiver:
+            self._post(receiver, keys, sign, 0.0, amount)
+
+    def _post(self, user, keys, sign, sent, received):
+        """Add signed amounts to one user's total and buckets"""
+        ledger = self.users.get(user)
+        if ledger is None:
+            ledger = self.users[user] = UserLedger()
+
+        total = ledger.total
+        total[0] += sign
+        total[1] += sent
+        total[2] += received
+        if total[0] <= 0:
+            # Every bucket of the user is empty too
+            del self.users[user]
+            return
+
+        # Inline rather than a helper per bucket: this runs for every
+        # party of every transaction, on load and on each write
+        for buckets, key in zip(ledger.buckets, keys):
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [sign, sent, received]
+                continue
+            bucket[0] += sign
+            bucket[1] += sent
+            bucket[2] += received
+            if bucket[0] <= 0:
+                del buckets[key]
+
+    def balance(self, user):
+        """
+        A user's totals and per-category totals
+
+        Returns:
+            JSON-ready dictionary, or None for a user with no transactions
+        """
+        ledger = self.users.get(user)
+        if ledger is None:
+            return None
+        return {
+            "phone_number": user,
+            **_totals(ledger.total),
+            "by_type": {category: _totals(bucket)
+                        for category, bucket in sorted(ledger.categories.items())}
+        }
+
+    def history(self, user, granularity='day', start=None, end=None, category=None):
+        """
+        A user's windows in period order
+
+        Args:
+            user: Phone number or party name
+            granularity: 'hour', 'day' or 'month'
+            start, end: Inclusive period prefixes, e.g. '2024-01' or
+                '2024-01-15' (any granularity)
+            category: Only count transactions of this type
+
+        Returns:
+            List of window dictionaries, or None for an unknown user
+
+        Raises:
+            ValueError: for an unknown granularity
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        ledger = self.users.get(user)
+        if ledger is None:
+            return None
+
+        buckets = ledger.windows(granularity)
+        # '~' sorts after every timestamp character, so end matches as a prefix
+        last = end + '~' if end else None
+        keys = sorted(key for key in buckets
+                      if (not start or key[0] >= start) and (not last or key[0] < last))
+
+        history = []
+        # A period's categories are adjacent once sorted
+        for period, group in groupby(keys, key=itemgetter(0)):
+            window = {name: buckets[period, name] for _, name in group}
+            if category is not None:
+                if category in window:
+                    history.append({"period": period, **_totals(window[category])})
+                continue
+
+            total = [sum(bucket[index] for bucket in window.values()) for index in range(3)]
+            history.append({
+                "period": period,
+                **_totals(total),
+                "by_type": {name: _totals(bucket) for name, bucket in window.items()}
+            })
+        return history
+
+    def active_users(self, limit=None):
+        """
+        Rows shaped like vw_active_users, most transactions first
+
+        Args:
+            limit: Return only the top N users (all by default)
+        """
+        def rank(item):
+            return item[1].total[0], item[0]
+
+        items = self.users.items()
+        ranked = (heapq.nlargest(limit, items, key=rank) if limit is not None
+                  else sorted(items, key=rank, reverse=True))
+        return [{"phone_number": user, **_totals(ledger.total)} for user, ledger in ranked]
+
+    def snapshot(self):
+        """Every user's totals and windows as a JSON-ready dictionary"""
+        return {
+            "granularities": list(GRANULARITIES),
+            "users": {
+                user: {
+                    **self.balance(user),
+                    "windows": {granularity: _windows(ledger, granularity)
+                                for granularity in GRANULARITIES}
+                }
+                for user, ledger in sorted(self.users.items())
+            }
+        }
+
+    def materialize(self, filepath=ROLLUPS_PATH):
+        """
+        Write the current snapshot to rollups.json atomically
+
+        O(users x windows): the API only does this on shutdown.
+        """
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            serializer.dump(self.snapshot(), f)
+        os.replace(tmp_path, filepath)
+
+
+def _windows(ledger, granularity):
+    windows = {}
+    for (period, category), bucket in sorted(ledger.windows(granularity).items()):
+        windows.setdefault(period, {})[category] = _totals(bucket)
+    return windows
+
+
+def _text(value):
+    """value if it is a string, else '' (nothing to key a user or window on)"""
+    return value if isinstance(value, str) else ''
+
+
+def _totals(bucket):
+    count, sent, received = bucket
+    return {
+        "total_transactions": count,
+        "total_sent": round(sent, 2),
+        "total_received": round(received, 2),
+        "balance": round(received - sent, 2)
+    }
+
+
+if __name__ == '__main__':
+    from api.journal import Journal
+    from api.store import TransactionStore
+
+    store = TransactionStore()
+    engine = RollupEngine()
+    store.subscribe(engine)
+    store.load(Journal().replay())
+
+    engine.materialize()
+    print(f"Rolled up {len(store)} transactions for {len(engine.users)} users")
+    print(f"Saved to {ROLLUPS_PATH}")
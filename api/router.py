@@ -0,0 +1,83 @@
+"""
+Request routing for the transaction API
+Precompiled path patterns and per-route method dispatch tables
+"""
+
+import re
+
+# {name} in a route template matches a numeric path segment, {name:str}
+# any non-empty segment
+PARAMETER = re.compile(r'\{(\w+(?::\w+)?)\}')
+KINDS = {'int': r'\d+', 'str': r'[^/]+'}
+
+
+class Route:
+    """One path template and its method -> handler name table"""
+
+    __slots__ = ('template', 'pattern', 'handlers')
+
+    def __init__(self, template, handlers):
+        self.template = template
+        self.handlers = handlers
+        self.pattern = None
+        # split() alternates literal text and parameter names
+        parts = PARAMETER.split(template)
+        if len(parts) > 1:
+            self.pattern = re.compile(''.join(
+                _parameter(part) if index % 2 else re.escape(part)
+                for index, part in enumerate(parts)))
+
+    @property
+    def allowed(self):
+        """Methods with a handler, for the Allow header"""
+        return ', '.join(sorted(self.handlers))
+
+
+def _parameter(spec):
+    name, _, kind = spec.partition(':')
+    return f'(?P<{name}>{KINDS[kind or "int"]})'
+
+
+class Router:
+    """
+    Map (method, path) to a handler name and path parameters
+
+    Static paths are found with one dictionary lookup. Templates with
+    parameters are tried in registration order with precompiled patterns
+    that must match the whole path, so '/transactions/12abc' or
+    '/transactions/12/extra' match nothing.
+    """
+
+    def __init__(self):
+        self._static = {}
+        self._dynamic = []
+
+    def add(self, template, **handlers):
+        """
+        Register a template, e.g. add('/transactions/{id}', GET='get_transaction')
+
+        Returns:
+            The Route
+        """
+        route = Route(template, handlers)
+        if route.pattern is None:
+            self._static[template] = route
+        else:
+            self._dynamic.append(route)
+        return route
+
+    def match(self, path):
+        """
+        Route and parameters for a path (query string already removed)
+
+        Returns:
+            (route, params), or (None, None) when no template matches
+        """
+        route = self._static.get(path)
+        if route is not None:
+            return route, {}
+        for route in self._dynamic:
+            found = route.pattern.fullmatch(path)
+            if found:
+                return route, found.groupdict()
+        return None, None
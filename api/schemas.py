@@ -0,0 +1,254 @@
+"""
+Request schemas for the transaction API
+Field names, allowed values and query-string parsing
+"""
+
+from datetime import datetime
+from urllib.parse import parse_qs
+import math
+import re
+
+TRANSACTION_FIELDS = ('id', 'type', 'amount', 'sender', 'receiver',
+                      'timestamp', 'status', 'reference')
+
+TRANSACTION_TYPES = ('SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT')
+
+# Same set as the status CHECK constraint in etl/load_db.py
+TRANSACTION_STATUSES = ('pending', 'completed', 'failed', 'reversed')
+
+MAX_PAGE_SIZE = 1000
+
+# Items accepted by one /transactions/bulk request
+MAX_BULK_SIZE = 100000
+
+REQUIRED_FIELDS = ('type', 'amount', 'sender', 'receiver')
+# Fields the store indexes, orders or prefix-matches as strings
+TEXT_FIELDS = ('sender', 'receiver', 'timestamp', 'status', 'reference')
+
+# Extended ISO 8601 date or date-time: timestamps are range-indexed and
+# bucketed by day/hour as strings, so '2024-01-15T10:30:00' must sort and
+# slice the same way for every row
+ISO_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'
+                           r'(?:Z|[+-]\d{2}:\d{2})?')
+# Fields a PUT may change
+UPDATABLE_FIELDS = ('type', 'amount', 'sender', 'receiver', 'status')
+
+# Query parameter -> store index used for equality filtering
+EQUALITY_FILTERS = ('type', 'status', 'sender', 'receiver')
+
+# Query parameter -> field answered from the phone prefix tries
+PREFIX_FILTERS = {'sender_prefix': 'sender', 'receiver_prefix': 'receiver'}
+
+
+def parse_list_query(query_string):
+    """
+    Parse GET /transactions query parameters
+
+    Supported parameters:
+        limit, cursor           - pagination (cursor is the last id seen)
+        type, status, sender, receiver - exact-match filters
+        sender_prefix, receiver_prefix - phone number prefix filters
+        min_amount, max_amount  - inclusive amount range
+        since, until            - ISO timestamp range (until exclusive)
+        fields                  - comma-separated projection
+
+    Returns:
+        (query, fields) - keyword arguments for TransactionStore.query and
+        the list of fields to return (None for all)
+
+    Raises:
+        ValueError: with a client-facing message for bad parameters
+    """
+    params = {key: values[-1] for key, values in parse_qs(query_string).items()}
+    query = {}
+
+    filters = {}
+    for name in EQUALITY_FILTERS:
+        if name in params:
+            value = params[name]
+            filters[name] = value.upper() if name == 'type' else value
+    if filters:
+        query['filters'] = filters
+
+    prefixes = {}
+    for name, field in PREFIX_FILTERS.items():
+        if name in params:
+            prefixes[field] = params[name]
+    if prefixes:
+        query['prefixes'] = prefixes
+
+    if 'limit' in params:
+        try:
+            limit = int(params['limit'])
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        query['limit'] = limit
+
+    if 'cursor' in params:
+        if not params['cursor'].isdigit():
+            raise ValueError("Invalid cursor")
+        query['after'] = params['cursor']
+
+    for name in ('min_amount', 'max_amount'):
+        if name in params:
+            try:
+                query[name] = float(params[name])
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+
+    for name in ('since', 'until'):
+        if name in params:
+            query[name] = params[name]
+
+    fields = None
+    if 'fields' in params:
+        fields = [f.strip() for f in params['fields'].split(',') if f.strip()]
+        if unknown := [f for f in fields if f not in TRANSACTION_FIELDS]:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return query, fields
+
+
+def project(transaction, fields):
+    """Return only the requested fields of a transaction"""
+    if fields is None:
+        return transaction
+    return {field: transaction.get(field) for field in fields}
+
+
+def validate_transaction(data):
+    """
+    Validate a POST /transactions body
+
+    Returns:
+        Transaction fields without the id: type upper-cased, amount a
+        float, plus timestamp/status/reference when given
+
+    Raises:
+        ValueError: with a client-facing message
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    if missing := [f for f in REQUIRED_FIELDS if f not in data]:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+    fields = {
+        'type': _parse_type(data['type']),
+        'amount': _parse_amount(data['amount']),
+        'sender': _parse_text('sender', data['sender']),
+        'receiver': _parse_text('receiver', data['receiver']),
+    }
+    for field in ('timestamp', 'status', 'reference'):
+        if field in data:
+            fields[field] = _parse_text(field, data[field])
+    if 'timestamp' in fields:
+        fields['timestamp'] = _parse_timestamp(fields['timestamp'])
+    if 'status' in fields:
+        fields['status'] = _parse_status(fields['status'])
+    return fields
+
+
+def validate_changes(data):
+    """
+    Validate a PUT /transactions/{id} body
+
+    Returns:
+        Dictionary of field changes (unknown fields are ignored)
+
+    Raises:
+        ValueError: with a client-facing message
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+
+    changes = {}
+    for field in UPDATABLE_FIELDS:
+        if field in data:
+            changes[field] = data[field]
+    if 'type' in changes:
+        changes['type'] = _parse_type(changes['type'])
+    if 'amount' in changes:
+        changes['amount'] = _parse_amount(changes['amount'])
+    for field in TEXT_FIELDS:
+        if field in changes:
+            changes[field] = _parse_text(field, changes[field])
+    if 'status' in changes:
+        changes['status'] = _parse_status(changes['status'])
+    return changes
+
+
+def parse_id(value):
+    """
+    Transaction id from a bulk item: an int, a digit string or {"id": ...}
+
+    Raises:
+        ValueError: with a client-facing message
+    """
+    if isinstance(value, dict):
+        if 'id' not in value:
+            raise ValueError("Missing fields: id")
+        value = value['id']
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).isdigit():
+        raise ValueError("Invalid id")
+    return str(value)
+
+
+def parse_bulk_item(method, item):
+    """
+    Validate one /transactions/bulk item
+
+    Returns:
+        POST: transaction fields, PUT: (id, changes), DELETE: id
+
+    Raises:
+        ValueError: with a client-facing message
+    """
+    if method == 'POST':
+        return validate_transaction(item)
+    if method == 'PUT':
+        if not isinstance(item, dict):
+            raise ValueError("Expected a JSON object")
+        return parse_id(item), validate_changes(item)
+    return parse_id(item)
+
+
+def _parse_type(value):
+    if not isinstance(value, str) or value.upper() not in TRANSACTION_TYPES:
+        raise ValueError("Invalid transaction type")
+    return value.upper()
+
+
+def _parse_text(field, value):
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+def _parse_status(value):
+    if value not in TRANSACTION_STATUSES:
+        raise ValueError("Invalid status")
+    return value
+
+
+def _parse_timestamp(value):
+    if not ISO_TIMESTAMP.fullmatch(value):
+        raise ValueError("timestamp must be an ISO 8601 date-time, e.g. 2024-01-15T10:30:00")
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError("Invalid timestamp")
+    return value
+
+
+def _parse_amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid amount")
+    if not amount > 0:
+        raise ValueError("Amount must be > 0")
+    if not math.isfinite(amount):
+        raise ValueError("Amount must be a finite number")
+    return amount
@@ -5,177 +5,650 @@ CRUD endpoints with Basic Authentication
 """
 
 from http.server import HTTPServer, BaseHTTPRequestHandler
-import json
-import base64
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import argparse
 import os
-import re
+import select
+import sys
+import threading
+import time
 from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
 
-CREDENTIALS = {"admin": "secure123"}
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.analytics import AnalyticsEngine
+from api.auth import BasicAuth, parse_credentials
+from api.cache import ResponseCache
+from api.db import ConnectionPool, SQLiteTransactionStore
+from api.encoding import (GZIP_MIN_SIZE, ChunkedWriter, accepts_gzip, dumpb,
+                          gzip_bytes, iter_json_items, iter_json_list)
+from api.journal import Journal
+from api.metrics import CountingWriter, Metrics, SlowRequestProfiler
+from api.rollups import GRANULARITIES, RollupEngine
+from api.router import Router
+from api.schemas import (MAX_BULK_SIZE, MAX_PAGE_SIZE, parse_bulk_item,
+                         parse_list_query, project, validate_changes,
+                         validate_transaction)
+from api.store import TransactionStore
+from dsa import serializer
+from dsa.record import Transaction
+
+# PBKDF2 hashes (api/auth.py); the default is admin / secure123.
+# MOMO_API_CREDENTIALS="name:hash,..." replaces it, see .env.example
+DEFAULT_CREDENTIALS = {"admin": "pbkdf2_sha256$100000$2ec9c7535047c6c0590ce6111e345a8e$"
+                                "99ee588664d37d8e920ea21fae1eb906e14e6b8092d32fb226b17aebfa7edbdc"}
+CREDENTIALS = DEFAULT_CREDENTIALS
+if os.environ.get("MOMO_API_CREDENTIALS"):
+    CREDENTIALS = parse_credentials(os.environ["MOMO_API_CREDENTIALS"])
+
+# Persistence settings (see .env.example)
+# "json": in-memory store + journal/snapshot; "sqlite": data/momo.db
+STORAGE_BACKEND = os.environ.get("MOMO_BACKEND", "json")
+DB_PATH = os.environ.get("MOMO_DB_PATH", "data/momo.db")
+DB_POOL_SIZE = int(os.environ.get("MOMO_DB_POOL_SIZE", 8))
+
+# Per-user rollups behind /users (api/rollups.py): on | off | auto. They
+# are held in memory and fed every row at startup, so "auto" only keeps
+# them for the json backend, which holds every row in memory anyway
+ROLLUPS = os.environ.get("MOMO_ROLLUPS", "auto")
+ROLLUPS_ENABLED = ROLLUPS == "on" or (ROLLUPS == "auto" and STORAGE_BACKEND == "json")
+
+JOURNAL_CONFIG = {
+    "fsync": os.environ.get("MOMO_FSYNC", "batch"),
+    "group_size": int(os.environ.get("MOMO_FSYNC_GROUP_SIZE", 64)),
+    "group_interval": float(os.environ.get("MOMO_FSYNC_INTERVAL", 1.0)),
+    "compact_every": int(os.environ.get("MOMO_COMPACT_EVERY", 10000)),
+    "snapshot_format": os.environ.get("MOMO_SNAPSHOT_FORMAT", "binary"),
+}
+
+# GET response cache (api/cache.py); 0 entries disables it
+CACHE_SIZE = int(os.environ.get("MOMO_CACHE_SIZE", 1024))
+CACHE_MAX_BYTES = int(os.environ.get("MOMO_CACHE_MAX_MB", 64)) * 1024 * 1024
+
+# Slow-request profiling (api/metrics.py); sample rate 0 disables it
+PROFILE_CONFIG = {
+    "sample_rate": float(os.environ.get("MOMO_PROFILE_SAMPLE", 0)),
+    "threshold_ms": float(os.environ.get("MOMO_PROFILE_SLOW_MS", 100)),
+    "directory": os.environ.get("MOMO_PROFILE_DIR", "data/logs/profiles"),
+}
+
+# Seconds between checks for queued connections while a keep-alive
+# connection is idle
+IDLE_POLL_INTERVAL = 0.05
+
+# Path templates -> per-method handler names, compiled once at import
+ROUTES = Router()
+ROUTES.add('/transactions', GET='list_transactions', POST='post_transaction')
+ROUTES.add('/transactions/bulk', POST='bulk_write', PUT='bulk_write', DELETE='bulk_write')
+ROUTES.add('/transactions/{id}', GET='get_transaction', PUT='put_transaction',
+           DELETE='delete_transaction')
+ROUTES.add('/analytics', GET='send_analytics')
+ROUTES.add('/metrics', GET='send_metrics')
+ROUTES.add('/users', GET='list_users')
+ROUTES.add('/users/{phone:str}', GET='get_user')
+ROUTES.add('/users/{phone:str}/history', GET='get_user_history')
+
+# GET handlers whose responses go through the response cache
+CACHED_HANDLERS = {'list_transactions', 'get_transaction', 'send_analytics',
+                   'list_users', 'get_user', 'get_user_history'}
 
 
 class TransactionAPI(BaseHTTPRequestHandler):
-    """REST API handler with in-memory storage"""
+    """REST API handler with indexed in-memory storage"""
+    
+    # HTTP/1.1 keeps connections alive; every response carries Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Socket timeout once a request has started arriving
+    timeout = 15
+    # How long a worker waits for the next request on an idle keep-alive
+    # connection; cut short whenever other connections queue for a worker
+    idle_timeout = 5
+    # Headers and body are separate writes; without TCP_NODELAY the body
+    # waits on the client's delayed ACK (~40ms per keep-alive request)
+    disable_nagle_algorithm = True
     
-    transactions = []
-    next_id = 1
+    store = TransactionStore()
+    analytics = AnalyticsEngine()
+    store.subscribe(analytics)
+    # None when disabled; the /users endpoints then answer 404
+    rollups = RollupEngine() if ROLLUPS_ENABLED else None
+    if rollups is not None:
+        store.subscribe(rollups)
+    journal = None
+    cache = ResponseCache(CACHE_SIZE, CACHE_MAX_BYTES)
+    auth = BasicAuth(CREDENTIALS)
+    metrics = Metrics()
+    profiler = SlowRequestProfiler(**PROFILE_CONFIG)
+    # Guards store, next_id and journal when serving concurrently
+    lock = threading.RLock()
     
     @classmethod
     def load_data(cls):
-        """Load transactions from JSON file"""
+        """
+        Load transactions from snapshot and replay the journal
+
+        With a binary snapshot the store starts cold on the mapped file
+        and is ready at once; the indexes are built by a background
+        thread (under the lock) while id lookups and writes are served.
+        """
+        if STORAGE_BACKEND == 'sqlite':
+            cls.use_sqlite()
+            return
+        
+        cls.journal = Journal(**JOURNAL_CONFIG)
+        # Held for the server's lifetime: etl/ingest.py must not append meanwhile
+        cls.journal.acquire()
+        cls.cache.invalidate(modified=data_modified(
+            cls.journal.snapshot_path, cls.journal.binary_path, cls.journal.journal_path))
         try:
-            with open('data/transactions.json', 'r') as f:
-                cls.transactions = json.load(f)
-                if cls.transactions:
-                    cls.next_id = max(int(t['id']) for t in cls.transactions) + 1
-        except:
-            cls.transactions = []
+            opened = cls.journal.open_snapshot()
+            if opened is None:
+                cls.store.load(cls.journal.replay())
+                return
+            
+            snapshot, entries = opened
+            cls.store.load_snapshot(snapshot)
+            for entry in entries:
+                if entry['op'] == 'put':
+                    cls.store.add(entry['transaction'])
+                elif entry['op'] == 'delete':
+                    cls.store.delete(entry['id'])
+            threading.Thread(target=cls.warm_up, daemon=True).start()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load data: {e}")
+            cls.store.load([])
+    
+    @classmethod
+    def warm_up(cls):
+        """Build the in-memory indexes for a store started on a snapshot"""
+        with cls.lock:
+            cls.store.hydrate()
+    
+    @classmethod
+    def use_sqlite(cls, db_path=DB_PATH, pool_size=DB_POOL_SIZE):
+        """Serve from SQLite; writes are durable on commit, so no journal"""
+        cls.store = SQLiteTransactionStore(ConnectionPool(db_path, size=pool_size))
+        cls.store.subscribe(cls.analytics)
+        if cls.rollups is not None:
+            cls.store.subscribe(cls.rollups)
+        cls.journal = None
+        cls.cache.invalidate(modified=data_modified(db_path, db_path + '-wal'))
+    
+    @classmethod
+    def compact(cls):
+        """Compact the journal into a full snapshot and refresh dashboard.json"""
+        with cls.metrics.time('persist'):
+            if cls.journal is not None:
+                cls.journal.compact(cls.store.all())
+            cls.analytics.materialize()
     
     @classmethod
     def save_data(cls):
-        """Save transactions to JSON file"""
-        os.makedirs('data', exist_ok=True)
-        with open('data/transactions.json', 'w') as f:
-            json.dump(cls.transactions, f, indent=2)
+        """
+        compact(), then write rollups.json (on shutdown only)
+        
+        rollups.json holds every user's windows and is never read back
+        (startup rebuilds the rollups), so it stays off the compactions
+        that run on the request path under the lock.
+        """
+        cls.compact()
+        if cls.rollups is not None:
+            with cls.metrics.time('persist'):
+                cls.rollups.materialize()
     
-    def authenticate(self):
-        """Basic Authentication"""
-        auth = self.headers.get('Authorization')
-        if not auth:
-            return False
+    @classmethod
+    @contextmanager
+    def write_batch(cls):
+        """
+        Persist the writes of a with-block with one flush
         
-        try:
-            auth_type, credentials = auth.split(' ', 1)
-            if auth_type.lower() != 'basic':
+        The journal fsyncs once at the end; SQLite commits once. The
+        caller holds the lock.
+        """
+        if cls.journal is not None:
+            batch = cls.journal.group()
+        elif isinstance(cls.store, SQLiteTransactionStore):
+            batch = cls.store.batch()
+        else:
+            batch = nullcontext()
+        
+        with batch:
+            yield
+            flush_start = time.perf_counter()
+        cls.metrics.observe_phase('persist', time.perf_counter() - flush_start)
+    
+    @classmethod
+    def record_put(cls, transaction):
+        """Persist a created/updated transaction via the journal"""
+        cls.cache.invalidate()
+        if cls.journal is None:
+            return
+        with cls.metrics.time('persist'):
+            cls.journal.record_put(transaction)
+        if cls.journal.needs_compaction():
+            cls.compact()
+    
+    @classmethod
+    def record_delete(cls, tid):
+        """Persist a deletion via the journal"""
+        cls.cache.invalidate()
+        if cls.journal is None:
+            return
+        with cls.metrics.time('persist'):
+            cls.journal.record_delete(tid)
+        if cls.journal.needs_compaction():
+            cls.compact()
+    
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+    
+    def handle(self):
+        """Serve requests until the connection closes or goes idle"""
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.await_request():
+            self.handle_one_request()
+    
+    def await_request(self):
+        """
+        Wait for the next keep-alive request without pinning the worker
+        
+        True once request bytes are available. False after idle_timeout,
+        or at once while connections wait in the pool queue: idle clients
+        are closed (and reconnect) rather than stall everyone else.
+        """
+        deadline = time.monotonic() + self.idle_timeout
+        while not self.input_ready():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or getattr(self.server, 'waiting', 0):
                 return False
-            
-            decoded = base64.b64decode(credentials).decode()
-            username, password = decoded.split(':', 1)
-            return CREDENTIALS.get(username) == password
-        except:
-            return False
+            select.select([self.connection], [], [], min(remaining, IDLE_POLL_INTERVAL))
+        return True
+    
+    def input_ready(self):
+        """True if a read would not block: buffered (pipelined) bytes, data or EOF"""
+        self.connection.settimeout(0)
+        try:
+            if self.rfile.peek(1):
+                return True
+        except OSError:
+            # Reset by the peer: let handle_one_request see the error
+            return True
+        finally:
+            self.connection.settimeout(self.timeout)
+        # Nothing buffered or received: readable now means EOF
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        return bool(readable)
+    
+    def handle_one_request(self):
+        """Handle one request, recording its latency, status and bytes"""
+        # The handler lives as long as the keep-alive connection, so
+        # per-request state must not leak into the next request
+        self.response_status = None
+        self.body_consumed = False
+        self.route = None
+        # Set to the route template once the path is matched
+        self.endpoint = 'other'
+        start = time.perf_counter()
+        profile = self.profiler.begin()
+        written = self.wfile.bytes_written
+        try:
+            super().handle_one_request()
+            if self.response_status is not None and self.has_unread_body():
+                # A handler that ignores the body (e.g. GET, DELETE, a cache
+                # hit): close rather than read the body as the next request
+                self.close_connection = True
+        finally:
+            elapsed = time.perf_counter() - start
+            # No response: the connection closed or timed out while idle
+            if self.response_status is None:
+                if profile is not None:
+                    profile.disable()
+            else:
+                # A malformed request line leaves no command, path or headers
+                method = self.command or 'INVALID'
+                endpoint = self.endpoint
+                headers = getattr(self, 'headers', None)
+                length = headers.get('Content-Length', '') if headers else ''
+                request_bytes = int(length) if length.isdigit() else 0
+                self.metrics.observe_request(method, endpoint, self.response_status, elapsed,
+                                             request_bytes, self.wfile.bytes_written - written)
+                self.profiler.end(profile, elapsed, f"{method} {endpoint}")
+    
+    def send_response(self, code, message=None):
+        self.response_status = code
+        super().send_response(code, message)
+    
+    def authenticate(self):
+        """Basic Authentication"""
+        with self.metrics.time('auth'):
+            return self.auth.check(self.headers.get('Authorization')) is not None
+    
+    def wants_pretty(self):
+        """True if the client asked for indented JSON with ?pretty=1"""
+        query = parse_qs(urlsplit(self.path).query)
+        return query.get('pretty', ['0'])[-1] not in ('0', 'false', '')
+    
+    def wants_gzip(self):
+        """True if the client accepts a gzip-encoded response"""
+        return accepts_gzip(self.headers.get('Accept-Encoding'))
     
     def send_json(self, status, data):
-        """Send JSON response"""
+        """Send JSON response (compact unless ?pretty=1, gzip if accepted)"""
+        self.send_encoded(status, self.encode(data))
+    
+    def encode(self, data):
+        """Encode a JSON document (compact unless ?pretty=1), timed"""
+        with self.metrics.time('serialize'):
+            return dumpb(data, pretty=self.wants_pretty())
+    
+    def send_encoded(self, status, body, entry=None):
+        """Send an encoded JSON body; a cache entry adds its validators"""
+        gzip = self.wants_gzip() and len(body) >= GZIP_MIN_SIZE
+        if gzip:
+            body = entry.gzipped() if entry is not None else gzip_bytes(body)
+        
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        if gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        if entry is not None:
+            self.send_header('ETag', entry.etag)
+            if entry.last_modified:
+                self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data, indent=2).encode())
+        self.wfile.write(body)
     
-    def send_error(self, status, message):
+    def send_cached(self, entry):
+        """Send a cached 200 response, or 304 if the client's copy is current"""
+        if not entry.matches(self.headers.get('If-None-Match'),
+                             self.headers.get('If-Modified-Since')):
+            self.send_encoded(200, entry.body, entry)
+            return
+        
+        self.send_response(304)
+        self.send_header('ETag', entry.etag)
+        if entry.last_modified:
+            self.send_header('Last-Modified', entry.last_modified)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+    
+    def send_json_stream(self, status, envelope, key, items):
+        """
+        Stream {**envelope, key: items} without building the full body
+        
+        HTTP/1.1 clients get Transfer-Encoding: chunked; HTTP/1.0 clients
+        get a raw body terminated by closing the connection.
+        """
+        chunked = self.request_version == 'HTTP/1.1'
+        gzip = self.wants_gzip()
+        
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        
+        writer = ChunkedWriter(self.wfile, chunked=chunked, gzip=gzip)
+        fragments = iter_json_list(envelope, key, items, pretty=self.wants_pretty())
+        serialize = 0.0
+        while True:
+            start = time.perf_counter()
+            fragment = next(fragments, None)
+            serialize += time.perf_counter() - start
+            if fragment is None:
+                break
+            writer.write(fragment)
+        writer.close()
+        self.metrics.observe_phase('serialize', serialize)
+    
+    def send_error(self, status, message=None, explain=None):
         """Send error response"""
+        body = dumpb({"error": message})
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         if status == 401:
             self.send_header('WWW-Authenticate', 'Basic realm="API"')
+        if status == 405:
+            self.send_header('Allow', self.route.allowed)
+        if self.has_unread_body():
+            # An unread request body would corrupt the next keep-alive request
+            self.send_header('Connection', 'close')
+            self.close_connection = True
         self.end_headers()
-        self.wfile.write(json.dumps({"error": message}, indent=2).encode())
+        self.wfile.write(body)
+    
+    def has_unread_body(self):
+        """True if the request sent a body that has not been consumed"""
+        headers = getattr(self, 'headers', None)
+        if headers is None or self.body_consumed:
+            return False
+        return int(headers.get('Content-Length') or 0) > 0
     
     def parse_body(self):
         """Parse JSON request body"""
         try:
-            length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(length).decode()
-            return json.loads(body) if body else {}
+            with self.metrics.time('parse'):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                self.body_consumed = True
+                return serializer.loads(body) if body else {}
         except:
             return None
     
-    def do_GET(self):
-        """Handle GET requests"""
+    def dispatch(self):
+        """Route a request to its handler: authenticate, match, call"""
+        url = urlsplit(self.path)
+        self.route, params = ROUTES.match(url.path)
+        if self.route is not None:
+            self.endpoint = self.route.template
+        
         if not self.authenticate():
             self.send_error(401, "Unauthorized")
             return
         
-        # GET /transactions
-        if self.path == '/transactions':
-            self.send_json(200, {
-                "count": len(self.transactions),
-                "transactions": self.transactions
-            })
-        
-        # GET /transactions/{id}
-        elif match := re.match(r'/transactions/(\d+)', self.path):
-            tid = match.group(1)
-            transaction = next((t for t in self.transactions if t['id'] == tid), None)
-            
-            if transaction:
-                self.send_json(200, {"transaction": transaction})
-            else:
-                self.send_error(404, f"Transaction {tid} not found")
-        
-        else:
+        if self.route is None:
             self.send_error(404, "Endpoint not found")
+            return
+        
+        handler = self.route.handlers.get(self.command)
+        if handler is None:
+            self.send_error(405, f"Method {self.command} not allowed")
+            return
+        
+        if self.command == 'GET' and handler in CACHED_HANDLERS:
+            # Unchanged since the last identical GET: no store access, no encoding
+            entry = self.cache.get(self.path)
+            if entry is not None:
+                self.send_cached(entry)
+                return
+            self.cache_version = self.cache.version
+        
+        getattr(self, handler)(url, *params.values())
     
-    def do_POST(self):
-        """Handle POST requests"""
-        if not self.authenticate():
-            self.send_error(401, "Unauthorized")
+    do_GET = do_POST = do_PUT = do_DELETE = dispatch
+    
+    def get_transaction(self, url, tid):
+        """GET /transactions/{id}"""
+        with self.metrics.time('store'):
+            transaction = self.store.get(tid)
+        
+        if not transaction:
+            self.send_error(404, f"Transaction {tid} not found")
             return
         
-        if self.path != '/transactions':
-            self.send_error(404, "Endpoint not found")
+        body = self.encode({"transaction": transaction})
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def list_transactions(self, url):
+        """
+        GET /transactions with pagination, filters and projection
+        
+        Pages of up to MAX_PAGE_SIZE rows are encoded whole and cached;
+        larger results are streamed and not cached.
+        """
+        try:
+            query, fields = parse_list_query(url.query)
+        except ValueError as e:
+            self.send_error(400, str(e))
             return
         
-        data = self.parse_body()
-        if data is None:
-            self.send_error(400, "Invalid JSON")
+        with self.lock, self.metrics.time('store'):
+            transactions, next_cursor = self.store.query(**query)
+        
+        envelope = {"count": len(transactions)}
+        if 'limit' in query:
+            envelope["next_cursor"] = next_cursor
+        items = (project(t, fields) for t in transactions)
+        
+        if len(transactions) > MAX_PAGE_SIZE:
+            self.send_json_stream(200, envelope, "transactions", items)
             return
         
-        # Validate required fields
-        required = ['type', 'amount', 'sender', 'receiver']
-        if missing := [f for f in required if f not in data]:
-            self.send_error(400, f"Missing fields: {', '.join(missing)}")
+        with self.metrics.time('serialize'):
+            body = b''.join(iter_json_list(envelope, "transactions", items,
+                                           pretty=self.wants_pretty()))
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def send_analytics(self, url):
+        """GET /analytics - precomputed dashboard aggregates"""
+        top = parse_qs(url.query).get('top', ['10'])[-1]
+        if not top.isdigit():
+            self.send_error(400, "top must be a positive integer")
             return
         
-        # Validate type
-        if data['type'].upper() not in ['SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT']:
-            self.send_error(400, "Invalid transaction type")
+        with self.lock, self.metrics.time('store'):
+            # Aggregates are fed by the store, which must be fully loaded
+            self.store.hydrate()
+            snapshot = self.analytics.snapshot(top=int(top))
+        body = self.encode(snapshot)
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def rollups_enabled(self):
+        """False after answering 404 when the server runs without rollups"""
+        if self.rollups is None:
+            self.send_error(404, "User rollups are disabled (see MOMO_ROLLUPS)")
+            return False
+        return True
+    
+    def list_users(self, url):
+        """GET /users - per-user totals, as the vw_active_users view"""
+        if not self.rollups_enabled():
+            return
+        limit = parse_qs(url.query).get('limit', ['100'])[-1]
+        if not limit.isdigit():
+            self.send_error(400, "limit must be a positive integer")
+            return
+        
+        with self.lock, self.metrics.time('store'):
+            # Rollups are fed by the store, which must be fully loaded
+            self.store.hydrate()
+            users = self.rollups.active_users(limit=int(limit))
+        body = self.encode({"count": len(users), "users": users})
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def get_user(self, url, phone):
+        """GET /users/{phone} - running balance and per-type totals"""
+        if not self.rollups_enabled():
+            return
+        phone = unquote(phone)
+        with self.lock, self.metrics.time('store'):
+            self.store.hydrate()
+            user = self.rollups.balance(phone)
+        
+        if user is None:
+            self.send_error(404, f"User {phone} not found")
+            return
+        
+        body = self.encode({"user": user})
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def get_user_history(self, url, phone):
+        """GET /users/{phone}/history - hour/day/month windows"""
+        if not self.rollups_enabled():
+            return
+        phone = unquote(phone)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        granularity = params.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            self.send_error(400, f"granularity must be one of {', '.join(GRANULARITIES)}")
+            return
+        category = params.get('type')
+        
+        with self.lock, self.metrics.time('store'):
+            self.store.hydrate()
+            history = self.rollups.history(phone, granularity, start=params.get('start'),
+                                           end=params.get('end'),
+                                           category=category.upper() if category else None)
+        
+        if history is None:
+            self.send_error(404, f"User {phone} not found")
+            return
+        
+        body = self.encode({"phone_number": phone, "granularity": granularity,
+                            "count": len(history), "windows": history})
+        self.send_cached(self.cache.put(self.path, self.cache_version, body))
+    
+    def send_metrics(self, url):
+        """GET /metrics - Prometheus text exposition"""
+        extra = [
+            ('momo_store_transactions', 'gauge', 'Transactions in the store', len(self.store)),
+            ('momo_response_cache_entries', 'gauge', 'Cached GET responses', len(self.cache)),
+            ('momo_response_cache_hits_total', 'counter', 'Response cache hits', self.cache.hits),
+            ('momo_response_cache_misses_total', 'counter', 'Response cache misses', self.cache.misses),
+        ]
+        if self.journal is not None:
+            extra.append(('momo_journal_entries', 'gauge',
+                          'Journal entries since the last compaction', self.journal.entries))
+        
+        body = self.metrics.render(extra).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def post_transaction(self, url):
+        """POST /transactions"""
+        data = self.parse_body()
+        if data is None:
+            self.send_error(400, "Invalid JSON")
             return
         
-        # Validate amount
         try:
-            amount = float(data['amount'])
-            if amount <= 0:
-                self.send_error(400, "Amount must be > 0")
-                return
-        except:
-            self.send_error(400, "Invalid amount")
+            fields = validate_transaction(data)
+        except ValueError as e:
+            self.send_error(400, str(e))
             return
         
-        # Create transaction
-        transaction = {
-            "id": str(self.next_id),
-            "type": data['type'].upper(),
-            "amount": amount,
-            "sender": data['sender'],
-            "receiver": data['receiver'],
-            "timestamp": data.get('timestamp', datetime.now().isoformat()),
-            "status": data.get('status', 'completed'),
-            "reference": data.get('reference', f"TXN{self.next_id:06d}")
-        }
-        
-        self.transactions.append(transaction)
-        self.next_id += 1
-        self.save_data()
+        with self.lock:
+            try:
+                transaction = self.apply_create(fields)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
         
         self.send_json(201, {
             "message": "Transaction created",
             "transaction": transaction
         })
     
-    def do_PUT(self):
-        """Handle PUT requests"""
-        if not self.authenticate():
-            self.send_error(401, "Unauthorized")
-            return
-        
-        match = re.match(r'/transactions/(\d+)', self.path)
-        if not match:
-            self.send_error(404, "Endpoint not found")
-            return
-        
-        tid = match.group(1)
-        transaction = next((t for t in self.transactions if t['id'] == tid), None)
+    def put_transaction(self, url, tid):
+        """PUT /transactions/{id}"""
+        with self.metrics.time('store'):
+            transaction = self.store.get(tid)
         
         if not transaction:
             self.send_error(404, f"Transaction {tid} not found")
@@ -186,79 +659,234 @@ class TransactionAPI(BaseHTTPRequestHandler):
             self.send_error(400, "Invalid JSON")
             return
         
-        # Update fields
-        if 'type' in data:
-            if data['type'].upper() not in ['SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT']:
-                self.send_error(400, "Invalid transaction type")
-                return
-            transaction['type'] = data['type'].upper()
+        try:
+            changes = validate_changes(data)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
         
-        if 'amount' in data:
+        with self.lock:
             try:
-                amount = float(data['amount'])
-                if amount <= 0:
-                    self.send_error(400, "Amount must be > 0")
-                    return
-                transaction['amount'] = amount
-            except:
-                self.send_error(400, "Invalid amount")
+                transaction = self.apply_update(tid, changes)
+            except ValueError as e:
+                self.send_error(400, str(e))
                 return
         
-        if 'sender' in data:
-            transaction['sender'] = data['sender']
-        if 'receiver' in data:
-            transaction['receiver'] = data['receiver']
-        if 'status' in data:
-            transaction['status'] = data['status']
-        
-        self.save_data()
+        if not transaction:
+            self.send_error(404, f"Transaction {tid} not found")
+            return
         
         self.send_json(200, {
             "message": "Transaction updated",
             "transaction": transaction
         })
     
-    def do_DELETE(self):
-        """Handle DELETE requests"""
-        if not self.authenticate():
-            self.send_error(401, "Unauthorized")
-            return
-        
-        match = re.match(r'/transactions/(\d+)', self.path)
-        if not match:
-            self.send_error(404, "Endpoint not found")
-            return
-        
-        tid = match.group(1)
-        transaction = next((t for t in self.transactions if t['id'] == tid), None)
+    def delete_transaction(self, url, tid):
+        """DELETE /transactions/{id}"""
+        with self.lock:
+            transaction = self.apply_delete(tid)
         
         if not transaction:
             self.send_error(404, f"Transaction {tid} not found")
             return
         
-        self.transactions = [t for t in self.transactions if t['id'] != tid]
-        self.save_data()
-        
         self.send_json(200, {
             "message": "Transaction deleted",
             "transaction": transaction
         })
+    
+    def apply_create(self, fields):
+        """Add a validated POST body under a new id (caller holds the lock)"""
+        tid = self.store.allocate_id()
+        transaction = Transaction(**{
+            "id": tid,
+            "timestamp": datetime.now().isoformat(),
+            "status": "completed",
+            "reference": f"TXN{tid:06d}",
+            **fields
+        })
+        with self.metrics.time('store'):
+            transaction = self.store.add(transaction)
+        self.record_put(transaction)
+        return transaction
+    
+    def apply_update(self, tid, changes):
+        """Apply validated changes; None if absent (caller holds the lock)"""
+        with self.metrics.time('store'):
+            transaction = self.store.update(tid, changes)
+        if transaction:
+            self.record_put(transaction)
+        return transaction
+    
+    def apply_delete(self, tid):
+        """Delete by id; None if absent (caller holds the lock)"""
+        with self.metrics.time('store'):
+            transaction = self.store.delete(tid)
+        if transaction:
+            self.record_delete(tid)
+        return transaction
+    
+    def bulk_write(self, url):
+        """
+        POST/PUT/DELETE /transactions/bulk
+        
+        The body is a JSON array or NDJSON of items: POST bodies to
+        create, {"id": ..., <changes>} to update, ids (or {"id": ...}) to
+        delete. Items are decoded and validated as the body streams in,
+        then applied in order under the lock as one batch with a single
+        persistence flush. Each item gets its own result; a bad item does
+        not stop the rest.
+        """
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        
+        method = self.command
+        results = []
+        operations = []
+        parse_start = time.perf_counter()
+        try:
+            for index, (item, error) in enumerate(iter_json_items(self.rfile, length)):
+                if index >= MAX_BULK_SIZE:
+                    raise ValueError(f"Batch exceeds {MAX_BULK_SIZE} items")
+                result = {"index": index}
+                results.append(result)
+                try:
+                    if error:
+                        raise ValueError(error)
+                    operations.append((result, parse_bulk_item(method, item)))
+                except ValueError as e:
+                    result.update(status=400, error=str(e))
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        self.body_consumed = True
+        self.metrics.observe_phase('parse', time.perf_counter() - parse_start)
+        
+        apply = {
+            'POST': lambda op: (201, self.apply_create(op)),
+            'PUT': lambda op: (200, self.apply_update(*op)),
+            'DELETE': lambda op: (200, self.apply_delete(op)),
+        }[method]
+        
+        with self.lock, self.write_batch():
+            for result, operation in operations:
+                try:
+                    status, transaction = apply(operation)
+                except ValueError as e:
+                    result.update(status=400, error=str(e))
+                    continue
+                if transaction:
+                    result.update(status=status, id=transaction['id'])
+                else:
+                    tid = operation[0] if method == 'PUT' else operation
+                    result.update(status=404, error=f"Transaction {tid} not found")
+        
+        succeeded = sum(1 for result in results if result['status'] < 400)
+        self.send_json_stream(200, {
+            "count": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }, "results", results)
+    
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that hands each connection to a fixed-size thread pool
+    
+    Unlike ThreadingMixIn this caps the number of threads; connections
+    beyond the pool wait in the executor queue, and connections beyond
+    that wait in the listen backlog. A worker idling on a keep-alive
+    connection closes it as soon as another connection is queued.
+    """
+    
+    def __init__(self, server_address, handler_class, workers=8, backlog=128):
+        self.request_queue_size = backlog
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='api-worker')
+        # Connections queued for a worker; idle keep-alive ones yield to them
+        self.waiting = 0
+        self._waiting_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+    
+    def process_request(self, request, client_address):
+        with self._waiting_lock:
+            self.waiting += 1
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        with self._waiting_lock:
+            self.waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def data_modified(*paths):
+    """Newest mtime among the paths that exist, or None"""
+    mtimes = [os.path.getmtime(path) for path in paths if os.path.exists(path)]
+    return max(mtimes, default=None)
+
 
+def describe_credentials():
+    """Startup banner text; the password is shown only while it is the built-in default"""
+    if CREDENTIALS is DEFAULT_CREDENTIALS:
+        return "admin / secure123 (default; set MOMO_API_CREDENTIALS)"
+    return f"{', '.join(sorted(CREDENTIALS))} (from MOMO_API_CREDENTIALS)"
 
-def run_server(port=8000):
+
+def default_workers():
+    """Worker threads: requests are mostly I/O bound, so oversubscribe cores"""
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def run_server(port=8000, workers=None, backlog=128, keepalive=5, threaded=True):
     """Start REST API server"""
     TransactionAPI.load_data()
+    TransactionAPI.idle_timeout = keepalive
     
-    server = HTTPServer(('', port), TransactionAPI)
-    print(f"Server running on http://localhost:{port}")
-    print(f"Credentials: admin / secure123")
-    print(f"Loaded {len(TransactionAPI.transactions)} transactions\n")
+    if threaded:
+        workers = workers or default_workers()
+        server = PooledHTTPServer(('', port), TransactionAPI,
+                                  workers=workers, backlog=backlog)
+        mode = f"{workers} worker threads"
+    else:
+        server = HTTPServer(('', port), TransactionAPI)
+        mode = "single-threaded"
+    
+    print(f"Server running on http://localhost:{port} ({mode})")
+    print(f"Credentials: {describe_credentials()}")
+    print(f"Loaded {len(TransactionAPI.store)} transactions\n")
     
     try:
         server.serve_forever()
     except KeyboardInterrupt:
+        server.server_close()
+        with TransactionAPI.lock:
+            TransactionAPI.save_data()
         print("\nServer stopped")
 
 
 if __name__ == '__main__':
-    run_server()
+    parser = argparse.ArgumentParser(description='MoMo SMS Transaction REST API')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker threads (default: 4 per core, max 32)')
+    parser.add_argument('--backlog', type=int, default=128,
+                        help='Listen socket backlog')
+    parser.add_argument('--keepalive', type=float, default=5,
+                        help='Idle keep-alive timeout in seconds (cut short when workers are busy)')
+    parser.add_argument('--single-threaded', action='store_true',
+                        help='Serve one request at a time')
+    args = parser.parse_args()
+    
+    run_server(port=args.port, workers=args.workers, backlog=args.backlog,
+               keepalive=args.keepalive, threaded=not args.single_threaded)
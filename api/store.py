@@ -0,0 +1,454 @@
+"""
+Indexed in-memory transaction store
+Primary-id hash index plus secondary indexes for the API
+"""
+
+from bisect import bisect_right, insort
+from functools import partial
+
+from dsa.indexes import PrefixTrie, SortedIndex
+from dsa.record import Transaction
+
+
+class TransactionStore:
+    """
+    Transaction storage with O(1) point lookups and deletes
+
+    Transactions are kept as compact Transaction records (dsa/record.py)
+    in a dictionary keyed by integer id (the same hash index shown in
+    dsa/search_compare.build_dictionary). Ids are accepted as ints or
+    numeric strings; indexes share the record's own id object. Secondary
+    indexes map reference to a single id and sender/receiver/type/status to the ids
+    sharing that value. A sorted list of integer ids backs cursor
+    pagination. Amount and timestamp are held in sorted (bisect) indexes
+    for range queries, and sender/receiver in prefix tries for phone
+    prefix queries (see dsa/indexes.py); those are built in bulk on the
+    first query that needs them, so startup does not pay for unused
+    indexes. Every mutation goes through add/update/delete so the indexes
+    never drift from the records.
+
+    Listeners registered with subscribe() are told about every row that
+    enters or leaves the store (on_add/on_remove, plus on_reset before a
+    full load), which lets derived views such as analytics stay current
+    without rescanning. An update is reported as remove(old) + add(new).
+
+    load_snapshot() starts the store cold on top of a memory-mapped binary
+    snapshot (dsa/snapshot.py): point lookups, inserts, updates and
+    deletes work at once against the mapping plus an overlay of changes,
+    while anything that needs the indexes (queries, iteration, listeners)
+    first calls hydrate() to build the in-memory store. The API hydrates
+    in the background right after startup.
+    """
+
+    INDEXED_FIELDS = ('sender', 'receiver', 'type', 'status')
+    # Range-indexed field -> value types that can be ordered together
+    RANGE_FIELDS = {'amount': (int, float), 'timestamp': str}
+    PREFIX_FIELDS = ('sender', 'receiver')
+
+    def __init__(self, transactions=None):
+        self._by_id = {}
+        self._by_reference = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._ranges = {}
+        self._prefixes = {}
+        self._sorted_ids = []
+        self._listeners = []
+        self.next_id = 1
+        # Cold mode: mapped snapshot, id -> record (None = deleted) changes, row count
+        self._base = None
+        self._overlay = {}
+        self._count = 0
+
+        if transactions:
+            self.load(transactions)
+
+    def load(self, transactions):
+        """Replace the store contents and rebuild every index"""
+        self._base = None
+        self._overlay = {}
+        self._by_id = {}
+        self._by_reference = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        self._ranges = {}
+        self._prefixes = {}
+        self._sorted_ids = []
+        self.next_id = 1
+
+        for listener in self._listeners:
+            listener.on_reset()
+
+        for transaction in transactions:
+            self.add(transaction)
+
+    def load_snapshot(self, snapshot):
+        """
+        Start cold on a MappedSnapshot without decoding any rows
+
+        Listeners are reset now and receive every row when the store is
+        hydrated.
+        """
+        self.load([])
+        self._base = snapshot
+        self._count = len(snapshot)
+        self.next_id = snapshot.max_id + 1
+
+    def hydrate(self):
+        """
+        Decode the snapshot and overlay into the in-memory store
+
+        The new state is built aside and swapped in, so lock-free readers
+        calling get() see either the cold view or the complete store.
+        No-op once hydrated.
+        """
+        base, overlay = self._base, self._overlay
+        if base is None:
+            return
+
+        def merged():
+            for position in range(len(base)):
+                tid = base.ids[position]
+                if tid not in overlay:
+                    yield base.record(position)
+                elif overlay[tid] is not None:
+                    yield overlay[tid]
+            # Rows inserted since startup, after every snapshot row
+            for tid in sorted(overlay):
+                if overlay[tid] is not None and base.position(tid) is None:
+                    yield overlay[tid]
+
+        hot = TransactionStore(merged())
+        self._by_id = hot._by_id
+        self._by_reference = hot._by_reference
+        self._indexes = hot._indexes
+        self._sorted_ids = hot._sorted_ids
+        self.next_id = max(self.next_id, hot.next_id)
+        # The overlay is left in place: a get() that read _base just before
+        # this must still find the changes made on top of it
+        self._base = None
+
+        for listener in self._listeners:
+            listener.on_reset()
+            for transaction in self._by_id.values():
+                listener.on_add(transaction)
+
+    def subscribe(self, listener):
+        """Register a listener and replay the current rows into it"""
+        self.hydrate()
+        self._listeners.append(listener)
+        listener.on_reset()
+        for transaction in self._by_id.values():
+            listener.on_add(transaction)
+
+    def __len__(self):
+        if self._base is not None:
+            return self._count
+        return len(self._by_id)
+
+    def __iter__(self):
+        self.hydrate()
+        return iter(self._by_id.values())
+
+    def __contains__(self, tid):
+        return self.get(tid) is not None
+
+    def all(self):
+        """Return all transactions in insertion order"""
+        self.hydrate()
+        return list(self._by_id.values())
+
+    def allocate_id(self):
+        """Reserve and return the next transaction id"""
+        tid = self.next_id
+        self.next_id += 1
+        return tid
+
+    def get(self, tid):
+        """Look up a transaction by id - O(1), O(log n) while cold"""
+        key = _key(tid)
+        base = self._base
+        if base is not None:
+            overlay = self._overlay
+            if key in overlay:
+                return overlay[key]
+            return base.get(key) if key is not None else None
+        return self._by_id.get(key)
+
+    def get_by_reference(self, reference):
+        """Look up a transaction by reference - O(1)"""
+        self.hydrate()
+        tid = self._by_reference.get(reference)
+        return self._by_id.get(tid) if tid is not None else None
+
+    def find(self, field, value):
+        """Return all transactions whose indexed field equals value"""
+        self.hydrate()
+        ids = self._indexes[field].get(value, {})
+        return [self._by_id[tid] for tid in ids]
+
+    def add(self, transaction):
+        """
+        Insert a transaction that already carries an id
+
+        Dictionaries in the JSON shape are converted to Transaction
+        records; the stored record is returned.
+        """
+        transaction = Transaction.from_dict(transaction)
+        tid = transaction.id
+        if self._base is not None:
+            if self.get(tid) is None:
+                self._count += 1
+            self._overlay[tid] = transaction
+            self.next_id = max(self.next_id, tid + 1)
+            return transaction
+
+        old = self._by_id.get(tid)
+        self._swap(old, transaction)
+        if old is None:
+            self._insert_sorted(tid)
+        self._by_id[tid] = transaction
+        self.next_id = max(self.next_id, tid + 1)
+        return transaction
+
+    def update(self, tid, changes):
+        """
+        Apply field changes to a transaction, keeping indexes in sync
+
+        The record is replaced rather than mutated in place, so a reader
+        still holding the old record never sees a half-applied update.
+        """
+        transaction = self.get(tid)
+        if transaction is None:
+            return None
+
+        if self._base is not None:
+            updated = transaction.replace(**changes)
+            self._overlay[updated.id] = updated
+            return updated
+
+        updated = transaction.replace(**changes)
+        self._swap(transaction, updated)
+        self._by_id[updated.id] = updated
+        return updated
+
+    def delete(self, tid):
+        """Remove a transaction by id - O(1)"""
+        if self._base is not None:
+            transaction = self.get(tid)
+            if transaction is not None:
+                self._overlay[transaction.id] = None
+                self._count -= 1
+            return transaction
+
+        transaction = self._by_id.get(_key(tid))
+        if transaction is not None:
+            self._swap(transaction, None)
+            del self._by_id[transaction.id]
+            self._remove_sorted(transaction.id)
+        return transaction
+
+    def range(self, field, low=None, high=None, include_high=True):
+        """Transactions whose range-indexed field lies in [low, high], in field order"""
+        self.hydrate()
+        ids = self._range_index(field).range(low, high, include_high)
+        return [self._by_id[tid] for tid in ids]
+
+    def find_prefix(self, field, prefix):
+        """Transactions whose sender/receiver starts with prefix"""
+        self.hydrate()
+        return [self._by_id[tid] for tid in self._prefix_trie(field).find(prefix)]
+
+    def query(self, filters=None, prefixes=None, min_amount=None, max_amount=None,
+              since=None, until=None, after=None, limit=None):
+        """
+        Filtered, id-ordered page of transactions
+
+        Every condition that has an index can report its match count
+        cheaply (hash index size, trie subtree count, or two bisects on a
+        sorted index). The most selective one supplies the candidate ids;
+        the remaining conditions are checked on those records. When even
+        the best index matches more than half the store, walking the
+        sorted id list is cheaper than sorting the candidates.
+
+        Args:
+            filters: Mapping of indexed field -> required value
+            prefixes: Mapping of sender/receiver -> required prefix
+            min_amount / max_amount: Inclusive amount bounds
+            since / until: ISO timestamp bounds (since inclusive, until exclusive)
+            after: Cursor - only return ids greater than this
+            limit: Maximum number of transactions to return
+
+        Returns:
+            (transactions, next_cursor) where next_cursor is None on the last page
+        """
+        self.hydrate()
+        filters = filters or {}
+        prefixes = prefixes or {}
+        after = int(after) if after is not None else 0
+
+        # (match count, fetch ids) for each indexed condition
+        sources = []
+        for field, value in filters.items():
+            ids = self._indexes[field].get(value, {})
+            sources.append((len(ids), partial(iter, ids)))
+        for field, prefix in prefixes.items():
+            trie = self._prefix_trie(field)
+            sources.append((trie.count(prefix), partial(trie.find, prefix)))
+        for field, low, high, include_high in (('amount', min_amount, max_amount, True),
+                                               ('timestamp', since, until, False)):
+            if low is not None or high is not None:
+                index = self._range_index(field)
+                sources.append((index.count(low, high, include_high),
+                                partial(index.range, low, high, include_high)))
+
+        candidates = self._sorted_ids
+        if sources:
+            count, fetch = min(sources, key=lambda source: source[0])
+            if count <= len(self._sorted_ids) // 2:
+                candidates = sorted(tid for tid in fetch() if tid > after)
+
+        page = []
+        for position in range(bisect_right(candidates, after), len(candidates)):
+            transaction = self._by_id[candidates[position]]
+
+            if any(getattr(transaction, field) != value for field, value in filters.items()):
+                continue
+            if any(not (getattr(transaction, field) or '').startswith(prefix)
+                   for field, prefix in prefixes.items()):
+                continue
+
+            amount = transaction.amount
+            if min_amount is not None and amount < min_amount:
+                continue
+            if max_amount is not None and amount > max_amount:
+                continue
+
+            timestamp = transaction.timestamp or ''
+            if since is not None and timestamp < since:
+                continue
+            if until is not None and timestamp >= until:
+                continue
+
+            if limit is not None and len(page) == limit:
+                return page, page[-1]['id']
+            page.append(transaction)
+
+        return page, None
+
+    def _swap(self, old, new):
+        """
+        Move the indexes and listeners from old to new (either may be None)
+
+        Runs before the id map changes. If indexing or a listener fails,
+        the indexes and listeners are rebuilt from the untouched id map
+        and the error is re-raised, so a failed write leaves no row that
+        is served by id but missing from the indexes or derived views.
+        """
+        try:
+            if old is not None:
+                self._unindex(old)
+            if new is not None:
+                self._index(new)
+            if old is not None:
+                self._notify('on_remove', old)
+            if new is not None:
+                self._notify('on_add', new)
+        except Exception:
+            self._rebuild()
+            raise
+
+    def _rebuild(self):
+        """Re-derive every index and listener from the id map"""
+        self._by_reference = {}
+        self._indexes = {field: {} for field in self.INDEXED_FIELDS}
+        # Range indexes and tries are rebuilt lazily on the next query
+        self._ranges = {}
+        self._prefixes = {}
+        for transaction in self._by_id.values():
+            self._index(transaction)
+        for listener in self._listeners:
+            listener.on_reset()
+            for transaction in self._by_id.values():
+                listener.on_add(transaction)
+
+    def _notify(self, event, transaction):
+        for listener in self._listeners:
+            getattr(listener, event)(transaction)
+
+    def _insert_sorted(self, tid):
+        if not self._sorted_ids or tid > self._sorted_ids[-1]:
+            # Fast path: new ids are allocated in increasing order
+            self._sorted_ids.append(tid)
+        else:
+            insort(self._sorted_ids, tid)
+
+    def _remove_sorted(self, tid):
+        position = bisect_right(self._sorted_ids, tid) - 1
+        if position >= 0 and self._sorted_ids[position] == tid:
+            del self._sorted_ids[position]
+
+    def _index(self, transaction):
+        tid = transaction.id
+
+        reference = transaction.reference
+        if reference is not None:
+            self._by_reference[reference] = tid
+
+        for field, index in self._indexes.items():
+            # Dict used as an insertion-ordered set of ids
+            index.setdefault(getattr(transaction, field), {})[tid] = None
+
+        for field, index in self._ranges.items():
+            index.add(self._range_key(transaction, field), tid)
+        for field, trie in self._prefixes.items():
+            trie.add(getattr(transaction, field), tid)
+
+    def _unindex(self, transaction):
+        tid = transaction.id
+
+        reference = transaction.reference
+        if self._by_reference.get(reference) == tid:
+            del self._by_reference[reference]
+
+        for field, index in self._indexes.items():
+            value = getattr(transaction, field)
+            ids = index.get(value)
+            if ids is not None:
+                ids.pop(tid, None)
+                if not ids:
+                    del index[value]
+
+        for field, index in self._ranges.items():
+            index.remove(self._range_key(transaction, field), tid)
+        for field, trie in self._prefixes.items():
+            trie.remove(getattr(transaction, field), tid)
+
+    def _range_index(self, field):
+        index = self._ranges.get(field)
+        if index is None:
+            index = self._ranges[field] = SortedIndex(
+                (self._range_key(transaction, field), tid)
+                for tid, transaction in self._by_id.items())
+        return index
+
+    def _prefix_trie(self, field):
+        trie = self._prefixes.get(field)
+        if trie is None:
+            trie = self._prefixes[field] = PrefixTrie()
+            for tid, transaction in self._by_id.items():
+                trie.add(getattr(transaction, field), tid)
+        return trie
+
+    def _range_key(self, transaction, field):
+        """Field value if it can be ordered in the range index, else None"""
+        value = getattr(transaction, field)
+        if isinstance(value, self.RANGE_FIELDS[field]) and not isinstance(value, bool):
+            return value
+        return None
+
+
+def _key(tid):
+    """Store key for an id given as an int or numeric string (None if neither)"""
+    try:
+        return int(tid)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Benchmark Harness
+Synthetic MoMo datasets, repeated timings, memory peaks and JSON reports
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import base64
+import http.client
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa import serializer
+from dsa.search_compare import build_dictionary, dictionary_lookup, linear_search
+from dsa.xml_parser import iter_transactions, parse_xml_to_json
+
+TYPES = ('SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT')
+STATUSES = ('completed', 'completed', 'completed', 'pending', 'failed')
+COUNTERPARTIES = ('BANK', 'ATM001', 'ATM002', 'MERCHANT_XYZ', 'SUPERMARKET', 'UTILITY_CO')
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_OUTPUT = 'dsa/benchmark_results.json'
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+def iter_synthetic(count, seed=42, users=None):
+    """
+    Yield count synthetic SMS attribute dictionaries in the XML schema
+
+    Phone numbers are drawn from a pool of `users` subscribers (default
+    count // 20) so sender/receiver cardinality looks like real exports.
+    """
+    rng = random.Random(seed)
+    users = users or max(10, count // 20)
+    phones = [f"07{rng.randrange(10 ** 8):08d}" for _ in range(users)]
+    start = datetime(2024, 1, 1)
+
+    for n in range(1, count + 1):
+        ttype = rng.choice(TYPES)
+        phone = rng.choice(phones)
+        other = rng.choice(phones) if ttype in ('SEND', 'RECEIVE') else rng.choice(COUNTERPARTIES)
+        sender, receiver = (other, phone) if ttype in ('RECEIVE', 'WITHDRAW') else (phone, other)
+        yield {
+            'type': ttype,
+            'amount': str(rng.randrange(100, 100000, 50)),
+            'sender': sender,
+            'receiver': receiver,
+            'timestamp': (start + timedelta(seconds=n * 37)).isoformat(),
+            'status': rng.choice(STATUSES),
+            'reference': f"TXN{n:08d}"
+        }
+
+
+def generate_xml(filepath, count, seed=42):
+    """Write a synthetic <sms_records> export with count records"""
+    with open(filepath, 'w') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<sms_records>\n')
+        for sms in iter_synthetic(count, seed):
+            attributes = ' '.join(f'{key}="{value}"' for key, value in sms.items())
+            f.write(f'    <sms {attributes}/>\n')
+        f.write('</sms_records>\n')
+    return filepath
+
+
+def generate_transactions(count, seed=42):
+    """Synthetic transactions in the data/transactions.json shape"""
+    return [
+        {"id": str(n), **sms, "amount": float(sms['amount'])}
+        for n, sms in enumerate(iter_synthetic(count, seed), start=1)
+    ]
+
+
+# ----------------------------------------------------------------------
+# Measurement
+# ----------------------------------------------------------------------
+
+def measure(func, repeat=5, warmup=1, setup=None):
+    """
+    Time func with warmup and repetitions using time.perf_counter
+
+    setup (optional) runs before every call, outside the timed region,
+    and its return value is passed to func.
+
+    Returns:
+        Statistics in milliseconds: min, median, mean, stdev, max
+    """
+    for _ in range(warmup):
+        func(setup()) if setup else func()
+
+    runs = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        func(argument) if setup else func()
+        runs.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'repeat': repeat,
+        'warmup': warmup,
+        'min_ms': round(min(runs), 4),
+        'median_ms': round(statistics.median(runs), 4),
+        'mean_ms': round(statistics.fmean(runs), 4),
+        'stdev_ms': round(statistics.stdev(runs), 4) if len(runs) > 1 else 0.0,
+        'max_ms': round(max(runs), 4)
+    }
+
+
+def measure_memory(func, setup=None):
+    """Peak traced allocation (MiB) of a single call, measured separately from timing"""
+    argument = setup() if setup else None
+    tracemalloc.start()
+    try:
+        func(argument) if setup else func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / (1024 * 1024), 3)
+
+
+def run_case(func, repeat, warmup, setup=None, memory=True, rows=None):
+    result = measure(func, repeat, warmup, setup)
+    if memory:
+        result['peak_mib'] = measure_memory(func, setup)
+    if rows:
+        result['rows_per_sec'] = round(rows / (result['median_ms'] / 1000), 1) if result['median_ms'] else 0
+    return result
+
+
+# ----------------------------------------------------------------------
+# Scenarios - each returns {case_name: result}
+# ----------------------------------------------------------------------
+
+def scenario_xml_parse(ctx):
+    xml_file, size = ctx['xml_file'], ctx['size']
+    out = os.path.join(ctx['tmpdir'], 'parsed.json')
+    return {
+        'tree_parse_to_json': run_case(
+            lambda: _silently(parse_xml_to_json, xml_file, out), ctx['repeat'], ctx['warmup'], rows=size),
+        'iterparse_stream': run_case(
+            lambda: sum(1 for _ in iter_transactions(xml_file)), ctx['repeat'], ctx['warmup'], rows=size),
+    }
+
+
+def scenario_json(ctx):
+    transactions, size = ctx['transactions'], ctx['size']
+    path = os.path.join(ctx['tmpdir'], 'transactions.json')
+    with open(path, 'w') as f:
+        json.dump(transactions, f, indent=2)
+
+    def load():
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save(indent):
+        with open(path, 'w') as f:
+            json.dump(transactions, f, indent=indent)
+
+    def fast_load():
+        with open(path, 'rb') as f:
+            return serializer.load(f)
+
+    def fast_save():
+        with open(path, 'wb') as f:
+            serializer.dump(transactions, f)
+
+    fast = serializer.backend.name
+    return {
+        'load': run_case(load, ctx['repeat'], ctx['warmup'], rows=size),
+        'save_indent2': run_case(lambda: save(2), ctx['repeat'], ctx['warmup'], rows=size),
+        'save_compact': run_case(lambda: save(None), ctx['repeat'], ctx['warmup'], rows=size),
+        f'load_{fast}': run_case(fast_load, ctx['repeat'], ctx['warmup'], rows=size),
+        f'save_compact_{fast}': run_case(fast_save, ctx['repeat'], ctx['warmup'], rows=size),
+    }
+
+
+def scenario_search(ctx):
+    transactions = ctx['transactions']
+    index = build_dictionary(transactions)
+    ids = [t['id'] for t in random.Random(1).choices(transactions, k=200)]
+
+    return {
+        'linear_search_x200': run_case(
+            lambda: [linear_search(transactions, tid) for tid in ids],
+            ctx['repeat'], ctx['warmup'], memory=False),
+        'dictionary_lookup_x200': run_case(
+            lambda: [dictionary_lookup(index, tid) for tid in ids],
+            ctx['repeat'], ctx['warmup'], memory=False),
+        'build_dictionary': run_case(
+            lambda: build_dictionary(transactions), ctx['repeat'], ctx['warmup'], rows=ctx['size']),
+    }
+
+
+def scenario_aggregations(ctx):
+    from api.analytics import AnalyticsEngine
+    from dsa.columnar import dict_group_by, np
+
+    transactions = ctx['transactions']
+
+    def incremental_build():
+        engine = AnalyticsEngine()
+        for transaction in transactions:
+            engine.on_add(transaction)
+        return engine
+
+    engine = incremental_build()
+    results = {
+        'dict_group_by_type': run_case(
+            lambda: dict_group_by(transactions, 'type'), ctx['repeat'], ctx['warmup'], rows=ctx['size']),
+        'analytics_full_build': run_case(
+            incremental_build, ctx['repeat'], ctx['warmup'], rows=ctx['size']),
+        'analytics_snapshot': run_case(
+            lambda: engine.snapshot(), ctx['repeat'], ctx['warmup'], memory=False),
+    }
+
+    if np is not None:
+        from dsa.columnar import ColumnarTransactions
+        columns = ColumnarTransactions.from_records(transactions)
+        results['columnar_group_by_type'] = run_case(
+            lambda: columns.group_by('type'), ctx['repeat'], ctx['warmup'], rows=ctx['size'])
+    return results
+
+
+def scenario_api_crud(ctx, operations=200):
+    """POST/GET/PUT/DELETE round-trips against an in-process server"""
+    from api.journal import Journal
+    from api.server import PooledHTTPServer, TransactionAPI
+
+    TransactionAPI.store.load([dict(t) for t in ctx['transactions']])
+    TransactionAPI.journal = Journal(
+        snapshot_path=os.path.join(ctx['tmpdir'], 'api.json'),
+        journal_path=os.path.join(ctx['tmpdir'], 'api.journal'),
+        compact_every=0
+    )
+    TransactionAPI.log_message = lambda *args: None
+
+    server = PooledHTTPServer(('127.0.0.1', 0), TransactionAPI, workers=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    headers = {
+        'Authorization': 'Basic ' + base64.b64encode(b'admin:secure123').decode(),
+        'Content-Type': 'application/json'
+    }
+    ids = [t['id'] for t in random.Random(2).choices(ctx['transactions'], k=operations)]
+
+    def request(conn, method, path, body=None):
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+        return response.status, payload
+
+    def crud_cycle():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        for tid in ids:
+            request(conn, 'GET', f'/transactions/{tid}')
+        created = []
+        for n in range(operations):
+            _, payload = request(conn, 'POST', '/transactions',
+                                 {"type": "SEND", "amount": n + 1, "sender": "A", "receiver": "B"})
+            created.append(json.loads(payload)['transaction']['id'])
+        for tid in created:
+            request(conn, 'PUT', f'/transactions/{tid}', {"amount": 5})
+        for tid in created:
+            request(conn, 'DELETE', f'/transactions/{tid}')
+        conn.close()
+
+    def list_page():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        request(conn, 'GET', '/transactions?limit=1000&type=SEND')
+        conn.close()
+
+    try:
+        results = {
+            f'crud_cycle_{operations * 4}_requests': run_case(
+                crud_cycle, ctx['repeat'], ctx['warmup'], memory=False),
+            'list_page_1000': run_case(list_page, ctx['repeat'], ctx['warmup'], memory=False),
+        }
+        results[f'crud_cycle_{operations * 4}_requests']['requests_per_sec'] = round(
+            operations * 4 / (results[f'crud_cycle_{operations * 4}_requests']['median_ms'] / 1000), 1)
+    finally:
+        server.shutdown()
+        server.server_close()
+        TransactionAPI.journal.close()
+    return results
+
+
+SCENARIOS = {
+    'xml_parse': scenario_xml_parse,
+    'json': scenario_json,
+    'search': scenario_search,
+    'aggregations': scenario_aggregations,
+    'api_crud': scenario_api_crud,
+}
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def _silently(func, *args):
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        return func(*args)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def environment():
+    """Metadata that makes results comparable across versions"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, scenarios=None, repeat=5, warmup=1, seed=42):
+    """
+    Run every selected scenario at every dataset size
+
+    Returns:
+        {"environment": {...}, "results": {size: {scenario: {case: stats}}}}
+    """
+    scenarios = scenarios or list(SCENARIOS)
+    report = {'environment': environment(), 'settings': {
+        'sizes': list(sizes), 'scenarios': scenarios, 'repeat': repeat, 'warmup': warmup, 'seed': seed
+    }, 'results': {}}
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='momo-bench-') as tmpdir:
+            print(f"\n=== {size} transactions ===")
+            ctx = {
+                'size': size,
+                'tmpdir': tmpdir,
+                'repeat': repeat,
+                'warmup': warmup,
+                'xml_file': generate_xml(os.path.join(tmpdir, 'sms.xml'), size, seed),
+                'transactions': generate_transactions(size, seed),
+            }
+
+            report['results'][str(size)] = {}
+            for name in scenarios:
+                results = SCENARIOS[name](ctx)
+                report['results'][str(size)][name] = results
+                for case, stats in results.items():
+                    peak = f"  peak {stats['peak_mib']:.2f} MiB" if 'peak_mib' in stats else ''
+                    print(f"  {name:<13}{case:<32}{stats['median_ms']:>12.3f} ms "
+                          f"(±{stats['stdev_ms']:.3f}){peak}")
+
+    return report
+
+
+def save_report(report, filepath=DEFAULT_OUTPUT):
+    """Write the machine-readable report"""
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filepath, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {filepath}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MoMo SMS benchmark harness')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Dataset sizes, e.g. 1000 100000 10000000')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--generate', metavar='XML_FILE',
+                        help='Only write a synthetic export of --sizes[0] records and exit')
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_xml(args.generate, args.sizes[0], args.seed)
+        print(f"Wrote {args.sizes[0]} synthetic SMS to {args.generate}")
+    else:
+        report = run_benchmarks(args.sizes, args.scenarios, args.repeat, args.warmup, args.seed)
+        save_report(report, args.output)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Compact Transaction Record
+__slots__ record with an integer id, interned codes and the JSON shape on demand
+"""
+
+from collections.abc import Mapping
+import json
+import random
+import sys
+import threading
+import tracemalloc
+
+FIELDS = ('id', 'type', 'amount', 'sender', 'receiver', 'timestamp', 'status', 'reference')
+
+
+class CodeTable:
+    """
+    Bidirectional mapping between repeated string values and small int codes
+
+    Codes are handed out on first sight, so values outside the known
+    vocabulary (e.g. 'UNKNOWN' from the parser) still round-trip. A new
+    value is appended to values before its code is published, under a
+    lock, so a code never points at a missing or different value and a
+    non-string value raises without registering anything.
+    """
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        self._lock = threading.Lock()
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        """Code for value, assigning the next one if it is new"""
+        code = self.codes.get(value)
+        if code is None:
+            value = sys.intern(value)
+            with self._lock:
+                code = self.codes.get(value)
+                if code is None:
+                    self.values.append(value)
+                    code = self.codes[value] = len(self.values) - 1
+        return code
+
+    def value(self, code):
+        """Value for a code"""
+        return self.values[code]
+
+
+TYPE_CODES = CodeTable(('SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT'))
+STATUS_CODES = CodeTable(('completed', 'pending', 'failed', 'reversed'))
+
+
+class Transaction(Mapping):
+    """
+    One transaction in well under half the memory of the equivalent dict
+
+    Attributes hold the compact form: id is an int, type and status are
+    codes into TYPE_CODES/STATUS_CODES, and sender/receiver are interned
+    so each phone number is stored once however many rows mention it.
+
+    The Mapping interface presents the JSON shape (string id, decoded
+    type/status), so code written against transaction dictionaries -
+    t['id'], t.get('amount'), {**t} - keeps working. Fields that are None
+    are treated as absent, like a key missing from a dictionary. Records
+    are never changed in place; replace() returns an updated copy.
+    """
+
+    __slots__ = ('id', 'type_code', 'amount', 'sender', 'receiver',
+                 'timestamp', 'status_code', 'reference')
+
+    def __init__(self, id=None, type=None, amount=None, sender=None, receiver=None,
+                 timestamp=None, status=None, reference=None):
+        self.id = int(id) if id is not None else None
+        self.type_code = TYPE_CODES.code(type) if type is not None else None
+        self.amount = amount
+        self.sender = sys.intern(sender) if isinstance(sender, str) else sender
+        self.receiver = sys.intern(receiver) if isinstance(receiver, str) else receiver
+        self.timestamp = timestamp
+        self.status_code = STATUS_CODES.code(status) if status is not None else None
+        self.reference = reference
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a dictionary in the data/transactions.json shape"""
+        if isinstance(data, cls):
+            return data
+        get = data.get
+        return cls(get('id'), get('type'), get('amount'), get('sender'), get('receiver'),
+                   get('timestamp'), get('status'), get('reference'))
+
+    def to_dict(self):
+        """The data/transactions.json shape (string id)"""
+        return {field: value for field in FIELDS
+                if (value := _GETTERS[field](self)) is not None}
+
+    def replace(self, **changes):
+        """Copy with the given fields changed"""
+        return Transaction(**{**{field: _GETTERS[field](self) for field in FIELDS}, **changes})
+
+    @property
+    def type(self):
+        return TYPE_CODES.values[self.type_code] if self.type_code is not None else None
+
+    @property
+    def status(self):
+        return STATUS_CODES.values[self.status_code] if self.status_code is not None else None
+
+    def get(self, key, default=None):
+        getter = _GETTERS.get(key)
+        value = getter(self) if getter is not None else None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return (field for field in FIELDS if _GETTERS[field](self) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Transaction({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Transaction, tuple(_GETTERS[field](self) for field in FIELDS))
+
+
+_GETTERS = {
+    'id': lambda t: str(t.id) if t.id is not None else None,
+    'type': lambda t: TYPE_CODES.values[t.type_code] if t.type_code is not None else None,
+    'amount': lambda t: t.amount,
+    'sender': lambda t: t.sender,
+    'receiver': lambda t: t.receiver,
+    'timestamp': lambda t: t.timestamp,
+    'status': lambda t: STATUS_CODES.values[t.status_code] if t.status_code is not None else None,
+    'reference': lambda t: t.reference,
+}
+
+
+def to_json(value):
+    """json.dumps default= hook that encodes Transaction records"""
+    if isinstance(value, Transaction):
+        return value.to_dict()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+# ----------------------------------------------------------------------
+# Memory report
+# ----------------------------------------------------------------------
+
+def synthesize_dicts(count, seed=42):
+    """Synthetic transactions as fresh dictionaries, as json.load produces them"""
+    rng = random.Random(seed)
+    phones = [f"07{rng.randrange(10 ** 8):08d}" for _ in range(max(10, count // 20))]
+    rows = [
+        {
+            "id": str(n),
+            "type": rng.choice(TYPE_CODES.values),
+            "amount": float(rng.randrange(100, 100000, 50)),
+            "sender": rng.choice(phones),
+            "receiver": rng.choice(phones),
+            "timestamp": f"2024-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00",
+            "status": rng.choice(STATUS_CODES.values),
+            "reference": f"TXN{n:08d}"
+        }
+        for n in range(1, count + 1)
+    ]
+    # Round-trip through JSON so no strings are shared, like a real load
+    return json.loads(json.dumps(rows))
+
+
+def measure_memory(count):
+    """
+    Traced memory of count rows held as dictionaries vs Transaction records
+
+    Returns:
+        Dictionary with bytes per row for both layouts and the savings
+    """
+    payload = json.dumps(synthesize_dicts(count))
+
+    tracemalloc.start()
+    rows = json.loads(payload)
+    dict_bytes, _ = tracemalloc.get_traced_memory()
+    del rows
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    records = [Transaction.from_dict(row) for row in json.loads(payload)]
+    record_bytes, _ = tracemalloc.get_traced_memory()
+    del records
+    tracemalloc.stop()
+
+    return {
+        'rows': count,
+        'dict_bytes_per_row': round(dict_bytes / count, 1),
+        'record_bytes_per_row': round(record_bytes / count, 1),
+        'dict_mib': round(dict_bytes / (1024 * 1024), 2),
+        'record_mib': round(record_bytes / (1024 * 1024), 2),
+        'savings_pct': round(100 * (1 - record_bytes / dict_bytes), 1)
+    }
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    results = measure_memory(size)
+
+    print("="*70)
+    print("TRANSACTION MEMORY: dict vs __slots__ record")
+    print("="*70)
+    print(f"Rows: {results['rows']}")
+    print(f"dict:        {results['dict_mib']:>8.2f} MiB ({results['dict_bytes_per_row']:.0f} bytes/row)")
+    print(f"Transaction: {results['record_mib']:>8.2f} MiB ({results['record_bytes_per_row']:.0f} bytes/row)")
+    print(f"Savings:     {results['savings_pct']:.1f}%")
+    print("="*70)
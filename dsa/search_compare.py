@@ -38,39 +38,48 @@ def dictionary_lookup(transaction_dict, target_id):
     return transaction_dict.get(str(target_id))
 
 
-def benchmark(transactions, num_searches=1000):
-    """Compare performance of both search methods"""
+def benchmark(transactions, num_searches=1000, repeat=5):
+    """
+    Compare performance of both search methods
+    
+    Each method runs the same random search ids `repeat` times; the best
+    run is reported (least disturbed by other processes).
+    """
     
     if not transactions:
         return None
     
     print(f"Dataset: {len(transactions)} transactions")
-    print(f"Searches: {num_searches}\n")
+    print(f"Searches: {num_searches} x {repeat} runs\n")
     
     # Build dictionary
-    build_start = time.time()
+    build_start = time.perf_counter()
     transaction_dict = build_dictionary(transactions)
-    build_time = time.time() - build_start
+    build_time = time.perf_counter() - build_start
     
     # Generate random IDs
     all_ids = [str(t.get('id')) for t in transactions if 'id' in t]
     search_ids = random.choices(all_ids, k=num_searches)
     
+    def best_of(search):
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for search_id in search_ids:
+                search(search_id)
+            runs.append(time.perf_counter() - start)
+        return min(runs)
+    
     # Test Linear Search
-    linear_start = time.time()
-    for search_id in search_ids:
-        linear_search(transactions, search_id)
-    linear_time = time.time() - linear_start
+    linear_time = best_of(lambda search_id: linear_search(transactions, search_id))
     
     # Test Dictionary Lookup
-    dict_start = time.time()
-    for search_id in search_ids:
-        dictionary_lookup(transaction_dict, search_id)
-    dict_time = time.time() - dict_start
+    dict_time = best_of(lambda search_id: dictionary_lookup(transaction_dict, search_id))
     
     return {
         'dataset_size': len(transactions),
         'num_searches': num_searches,
+        'repeat': repeat,
         'build_time_ms': build_time * 1000,
         'linear_total_ms': linear_time * 1000,
         'linear_avg_ms': (linear_time / num_searches) * 1000,
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+JSON Serializer
+orjson or msgspec when installed, stdlib json otherwise
+"""
+
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa.record import Transaction, to_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+class StdlibBackend:
+    """The json module: always available, slowest"""
+
+    name = 'json'
+
+    def dumpb(self, data, pretty=False):
+        # allow_nan=False: 'Infinity' is not JSON the other backends can read
+        if pretty:
+            return json.dumps(data, indent=2, default=to_json, allow_nan=False).encode()
+        return json.dumps(data, separators=(',', ':'), default=to_json, allow_nan=False).encode()
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonBackend:
+    """orjson: Rust encoder/decoder producing bytes directly"""
+
+    name = 'orjson'
+
+    def dumpb(self, data, pretty=False):
+        body = orjson.dumps(data, default=to_json, option=orjson.OPT_INDENT_2 if pretty else 0)
+        if b'null' in body:
+            _check_finite(data)
+        return body
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecBackend:
+    """msgspec.json: C encoder/decoder producing bytes directly"""
+
+    name = 'msgspec'
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder(enc_hook=to_json)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumpb(self, data, pretty=False):
+        body = self._encoder.encode(data)
+        if b'null' in body:
+            _check_finite(data)
+        return msgspec.json.format(body, indent=2) if pretty else body
+
+    def loads(self, data):
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # Same exception family as the other backends
+            raise ValueError(str(e))
+
+
+def _check_finite(data):
+    """
+    Raise ValueError for a NaN or infinite float anywhere in data
+
+    orjson and msgspec encode those as null, which would drop the value
+    without a word; stdlib json raises the same error. Only walked when
+    the output holds a null, so ordinary documents pay one bytes scan.
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                raise ValueError("Out of range float values are not JSON compliant")
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, Transaction):
+            stack.append(value.amount)
+
+
+# Fastest first; 'auto' picks the first one installed
+BACKENDS = {
+    'orjson': (OrjsonBackend, orjson),
+    'msgspec': (MsgspecBackend, msgspec),
+    'json': (StdlibBackend, json),
+}
+
+
+def get_backend(name='auto'):
+    """
+    Instantiate a backend by name
+
+    Raises:
+        ValueError: for an unknown or uninstalled backend
+    """
+    if name == 'auto':
+        name = next(n for n, (_, module) in BACKENDS.items() if module is not None)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    backend_class, module = BACKENDS[name]
+    if module is None:
+        raise ValueError(f"JSON backend not installed: {name}")
+    return backend_class()
+
+
+def use_backend(name='auto'):
+    """Switch the module-level functions to another backend"""
+    global backend
+    backend = get_backend(name)
+    return backend
+
+
+backend = get_backend(os.environ.get('MOMO_JSON_BACKEND', 'auto'))
+
+
+def dumpb(data, pretty=False):
+    """Encode to UTF-8 bytes; compact unless pretty (2-space indent)"""
+    return backend.dumpb(data, pretty)
+
+
+def dumps(data, pretty=False):
+    """Encode to str; compact unless pretty (2-space indent)"""
+    return backend.dumpb(data, pretty).decode()
+
+
+def loads(data):
+    """
+    Decode a str or bytes document
+
+    Raises:
+        ValueError: for malformed JSON (every backend)
+    """
+    return backend.loads(data)
+
+
+def load(f):
+    """Decode a whole file object (text or binary)"""
+    return backend.loads(f.read())
+
+
+def dump(data, f, pretty=False):
+    """Encode into a file object opened in binary mode"""
+    f.write(backend.dumpb(data, pretty))
+
+
+# ----------------------------------------------------------------------
+# Benchmark
+# ----------------------------------------------------------------------
+
+def benchmark(transactions, repeat=3):
+    """
+    Compare every installed backend on load, save and response encoding
+
+    save/load use the whole dataset (startup and save_data), response
+    encodes a 1000-row page the way send_json does.
+
+    Returns:
+        {backend: {case: best-of-repeat milliseconds}}
+    """
+    page = {"count": 1000, "transactions": transactions[:1000]}
+
+    def best_of(run):
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            runs.append(time.perf_counter() - start)
+        return round(min(runs) * 1000, 3)
+
+    results = {}
+    for name, (_, module) in BACKENDS.items():
+        if module is None:
+            continue
+        candidate = get_backend(name)
+        document = candidate.dumpb(transactions)
+        results[name] = {
+            'save_compact': best_of(lambda: candidate.dumpb(transactions)),
+            'save_pretty': best_of(lambda: candidate.dumpb(transactions, pretty=True)),
+            'load': best_of(lambda: candidate.loads(document)),
+            'response_page': best_of(lambda: candidate.dumpb(page)),
+            'compact_bytes': len(document),
+        }
+    return results
+
+
+def print_results(results, rows):
+    """Print formatted benchmark results, with speedups over stdlib json"""
+    cases = ('save_compact', 'save_pretty', 'load', 'response_page')
+    baseline = results['json']
+
+    print("="*70)
+    print(f"JSON BACKENDS ({rows} transactions, best of runs, ms)")
+    print("="*70)
+    print(f"{'Backend':<10}" + ''.join(f"{case:>15}" for case in cases))
+    for name, timings in results.items():
+        print(f"{name:<10}" + ''.join(f"{timings[case]:>15.2f}" for case in cases))
+        if name != 'json':
+            print(f"{'  speedup':<10}" + ''.join(
+                f"{baseline[case] / timings[case]:>14.1f}x" if timings[case] else f"{'-':>15}"
+                for case in cases))
+    print(f"\nCompact document: {baseline['compact_bytes'] / (1024 * 1024):.1f} MiB "
+          f"(active backend: {backend.name})")
+    print("="*70)
+
+
+if __name__ == '__main__':
+    from dsa.record import synthesize_dicts
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print_results(benchmark(synthesize_dicts(size)), size)
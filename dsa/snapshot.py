@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Binary Transaction Snapshot
+Fixed-width columns, a string table and an id index, read through mmap
+"""
+
+from array import array
+from bisect import bisect_left
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa import serializer
+from dsa.record import Transaction
+
+MAGIC = b'MOMOSNAP'
+VERSION = 1
+
+# Columns stored as references into the string table, in file order
+STRING_COLUMNS = ('type', 'sender', 'receiver', 'timestamp', 'status', 'reference')
+# Low-cardinality columns whose decoded strings are worth caching
+CACHED_COLUMNS = ('type', 'status', 'sender', 'receiver')
+
+NO_STRING = 0xFFFFFFFF
+
+# magic, version, little-endian flag, rows, strings, then one offset per section:
+# ids, amounts, each STRING_COLUMNS entry, string offsets, string data
+HEADER = struct.Struct('<8sIIQQ' + 'Q' * (4 + len(STRING_COLUMNS)))
+
+
+def write_snapshot(filepath, transactions):
+    """
+    Write transactions as a binary snapshot
+
+    Rows are sorted by id, so the id column doubles as the id index
+    (binary search). Strings are deduplicated into one table, which
+    stores each phone number, type and status once. The file is written
+    to a temporary path, fsynced and renamed into place.
+
+    Layout (native byte order, sections 8-byte aligned):
+        header | ids int64[rows] | amounts float64[rows] (NaN = missing)
+        | one uint32[rows] per STRING_COLUMNS entry (string refs)
+        | string offsets uint64[strings + 1] | UTF-8 string data
+
+    Returns:
+        Number of rows written
+    """
+    rows = sorted(transactions, key=lambda t: int(t['id']))
+
+    ids = array('q')
+    amounts = array('d')
+    refs = {column: array('I') for column in STRING_COLUMNS}
+    table = {}
+    offsets = array('Q', [0])
+    data = bytearray()
+
+    for transaction in rows:
+        ids.append(int(transaction['id']))
+        amount = transaction.get('amount')
+        amounts.append(float(amount) if amount is not None else float('nan'))
+
+        for column in STRING_COLUMNS:
+            value = transaction.get(column)
+            if value is None:
+                refs[column].append(NO_STRING)
+                continue
+            ref = table.get(value)
+            if ref is None:
+                ref = table[value] = len(table)
+                data += str(value).encode()
+                offsets.append(len(data))
+            refs[column].append(ref)
+
+    sections = [ids, amounts] + [refs[column] for column in STRING_COLUMNS] + [offsets, data]
+
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = filepath + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        position = _align(HEADER.size)
+        section_offsets = []
+        for section in sections:
+            section_offsets.append(position)
+            position = _align(position + memoryview(section).nbytes)
+
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == 'little',
+                            len(rows), len(table), *section_offsets))
+        for offset, section in zip(section_offsets, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section)
+
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+    return len(rows)
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+class MappedSnapshot:
+    """
+    Read-only view of a binary snapshot
+
+    Opening maps the file and reads the header only, so it takes the same
+    time for ten rows or ten million. Columns are memoryviews over the
+    mapping; a Transaction is decoded only when a row is accessed.
+    Lookups by id bisect the sorted id column: O(log n), no index to build.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"Not a transaction snapshot: {filepath}")
+        magic, version, little, rows, strings, *offsets = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} transaction snapshot: {filepath}")
+        if bool(little) != (sys.byteorder == 'little'):
+            raise ValueError("Snapshot was written on a machine with a different byte order")
+
+        view = memoryview(self._mmap)
+        self.rows = rows
+        self.ids = view[offsets[0]:offsets[0] + 8 * rows].cast('q')
+        self.amounts = view[offsets[1]:offsets[1] + 8 * rows].cast('d')
+        self._refs = {
+            column: view[offset:offset + 4 * rows].cast('I')
+            for column, offset in zip(STRING_COLUMNS, offsets[2:])
+        }
+        self._string_offsets = view[offsets[-2]:offsets[-2] + 8 * (strings + 1)].cast('Q')
+        self._data = view[offsets[-1]:]
+        self._cache = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for position in range(self.rows):
+            yield self.record(position)
+
+    @property
+    def max_id(self):
+        """Highest id in the snapshot (0 when empty)"""
+        return self.ids[-1] if self.rows else 0
+
+    def position(self, tid):
+        """Row number of an id, or None - O(log n)"""
+        position = bisect_left(self.ids, tid)
+        if position < self.rows and self.ids[position] == tid:
+            return position
+        return None
+
+    def get(self, tid):
+        """Decode the row with this id (None if absent)"""
+        position = self.position(tid)
+        return self.record(position) if position is not None else None
+
+    def record(self, position):
+        """Decode one row into a Transaction"""
+        amount = self.amounts[position]
+        return Transaction(
+            self.ids[position],
+            self._string('type', position),
+            amount if amount == amount else None,
+            self._string('sender', position),
+            self._string('receiver', position),
+            self._string('timestamp', position),
+            self._string('status', position),
+            self._string('reference', position),
+        )
+
+    def _string(self, column, position):
+        ref = self._refs[column][position]
+        if ref == NO_STRING:
+            return None
+        cached = column in CACHED_COLUMNS
+        if cached and ref in self._cache:
+            return self._cache[ref]
+        value = str(self._data[self._string_offsets[ref]:self._string_offsets[ref + 1]], 'utf-8')
+        if cached:
+            self._cache[ref] = value
+        return value
+
+
+def export_json(snapshot_path, json_path, pretty=False):
+    """Write a binary snapshot out as a data/transactions.json file"""
+    snapshot = MappedSnapshot(snapshot_path)
+    with open(json_path, 'wb') as f:
+        serializer.dump(list(snapshot), f, pretty=pretty)
+    return len(snapshot)
+
+
+def benchmark(json_path):
+    """
+    Startup cost of the JSON snapshot vs the binary snapshot
+
+    Both paths end with a store that can answer GET /transactions/{id}.
+    """
+    from api.store import TransactionStore
+
+    snapshot_path = os.path.splitext(json_path)[0] + '.bench.snap'
+    with open(json_path, 'rb') as f:
+        rows = write_snapshot(snapshot_path, serializer.load(f))
+
+    try:
+        start = time.perf_counter()
+        with open(json_path, 'rb') as f:
+            TransactionStore(serializer.load(f))
+        json_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = TransactionStore()
+        store.load_snapshot(MappedSnapshot(snapshot_path))
+        store.get(rows // 2 or 1)
+        mapped_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.hydrate()
+        hydrate_s = time.perf_counter() - start
+
+        return {
+            'rows': rows,
+            'json_bytes': os.path.getsize(json_path),
+            'snapshot_bytes': os.path.getsize(snapshot_path),
+            'json_startup_ms': round(json_s * 1000, 2),
+            'mapped_startup_ms': round(mapped_s * 1000, 2),
+            'background_hydrate_ms': round(hydrate_s * 1000, 2),
+        }
+    finally:
+        os.remove(snapshot_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Binary transaction snapshots')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='JSON -> binary snapshot')
+    build.add_argument('json_file', nargs='?', default='data/transactions.json')
+    build.add_argument('snapshot', nargs='?', default='data/transactions.snap')
+
+    export = commands.add_parser('export', help='Binary snapshot -> JSON')
+    export.add_argument('snapshot', nargs='?', default='data/transactions.snap')
+    export.add_argument('json_file', nargs='?', default='data/transactions.json')
+    export.add_argument('--pretty', action='store_true')
+
+    bench = commands.add_parser('bench', help='Compare startup time with JSON')
+    bench.add_argument('json_file', nargs='?', default='data/transactions.json')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        with open(args.json_file, 'rb') as f:
+            count = write_snapshot(args.snapshot, serializer.load(f))
+        print(f"Wrote {count} transactions to {args.snapshot}")
+    elif args.command == 'export':
+        count = export_json(args.snapshot, args.json_file, pretty=args.pretty)
+        print(f"Exported {count} transactions to {args.json_file}")
+    else:
+        results = benchmark(args.json_file)
+        print("="*70)
+        print("STARTUP: JSON snapshot vs memory-mapped binary snapshot")
+        print("="*70)
+        print(f"Rows: {results['rows']}")
+        print(f"Size: JSON {results['json_bytes'] / 1024:.0f} KiB, "
+              f"binary {results['snapshot_bytes'] / 1024:.0f} KiB")
+        print(f"JSON load + index:      {results['json_startup_ms']:>10.2f} ms")
+        print(f"mmap open + first read: {results['mapped_startup_ms']:>10.2f} ms")
+        print(f"Background hydration:   {results['background_hydrate_ms']:>10.2f} ms")
+        print("="*70)
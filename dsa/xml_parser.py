@@ -5,50 +5,147 @@ Parses modified_sms_v2.xml into JSON format
 """
 
 import xml.etree.ElementTree as ET
+import argparse
 import json
 import os
+import sys
+import textwrap
+import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def parse_xml_to_json(xml_file='modified_sms_v2.xml', output_file='data/transactions.json'):
+from dsa import serializer
+from dsa.record import Transaction
+from etl.dead_letter import DeadLetterQueue
+from etl.parse_xml import iter_sms_range, next_record_offset, records_end_offset
+from etl.run import live_api_files
+
+
+def build_transaction(sms, transaction_id):
+    """Convert one <sms> element into a compact Transaction record"""
+    return Transaction(
+        id=transaction_id,
+        type=sms.get('type', 'UNKNOWN').upper(),
+        amount=float(sms.get('amount', 0)),
+        sender=sms.get('sender', ''),
+        receiver=sms.get('receiver', ''),
+        timestamp=sms.get('timestamp', ''),
+        status=sms.get('status', 'completed'),
+        reference=sms.get('reference', f'TXN{transaction_id:06d}')
+    )
+
+
+def iter_transactions(xml_file='modified_sms_v2.xml', start_id=1, recover=False,
+                      dead_letter=None):
+    """
+    Stream transactions from an XML file one at a time
+    
+    Uses iterparse and clears each <sms> element once it has been
+    converted, so memory stays flat regardless of file size. Records that
+    cannot be converted (e.g. a non-numeric amount) are written to
+    dead_letter and skipped without using up an id.
+    
+    Args:
+        xml_file: Path to input XML file
+        start_id: ID assigned to the first transaction
+        recover: Skip corrupt XML fragments (dead-lettered) instead of
+            raising ET.ParseError
+        dead_letter: DeadLetterQueue (default: a new one in data/logs/dead_letter)
+    
+    Yields:
+        Transaction records in document order
+    """
+    owns_dead_letter = dead_letter is None
+    if owns_dead_letter:
+        dead_letter = DeadLetterQueue(name='xml_parser')
+    transaction_id = start_id
+    
+    try:
+        for sms in _iter_sms(xml_file, recover, dead_letter):
+            transaction = _build_or_reject(sms, transaction_id, xml_file, dead_letter)
+            if transaction is not None:
+                yield transaction
+                transaction_id += 1
+    finally:
+        if owns_dead_letter:
+            dead_letter.close()
+
+
+def _iter_sms(xml_file, recover, dead_letter):
+    """<sms> elements (strict) or attribute dictionaries (recover)"""
+    if not recover:
+        return _iter_elements(xml_file)
+    
+    def corrupt(offset, reason, fragment):
+        dead_letter.add(xml_file, 'parse', reason, offset=offset, fragment=fragment)
+    
+    end = records_end_offset(xml_file)
+    with open(xml_file, 'rb') as f:
+        start = next_record_offset(f, 0, end)
+    return iter_sms_range(xml_file, start, end, recover=True, on_error=corrupt)
+
+
+def _iter_elements(xml_file):
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'sms':
+            yield elem
+            elem.clear()
+            root.clear()
+
+
+def _build_or_reject(sms, transaction_id, xml_file, dead_letter):
+    """build_transaction, or None after dead-lettering a malformed record"""
+    try:
+        return build_transaction(sms, transaction_id)
+    except (ValueError, TypeError) as e:
+        dead_letter.add(xml_file, 'build', str(e), record=dict(sms.items()))
+        return None
+
+
+def parse_xml_to_json(xml_file='modified_sms_v2.xml', output_file='data/transactions.json',
+                      pretty=False, recover=False):
     """
     Parse XML SMS records and convert to JSON
     
+    Malformed records are written to data/logs/dead_letter/ and skipped.
+    A malformed document fails the whole parse unless recover is set, in
+    which case only the corrupt fragments are skipped.
+    
     Args:
         xml_file: Path to input XML file
         output_file: Path to output JSON file
+        pretty: Indent the output (compact by default)
+        recover: Skip corrupt XML fragments instead of failing
     
     Returns:
-        List of transaction dictionaries
+        List of Transaction records (empty if output_file is refused, see
+        etl.run.live_api_files)
     """
+    if _refuse_live_output(output_file):
+        return []
+    dead_letter = DeadLetterQueue(name='xml_parser')
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        
-        transactions = []
-        transaction_id = 1
-        
-        for sms in root.findall('.//sms'):
-            transaction = {
-                "id": str(transaction_id),
-                "type": sms.get('type', 'UNKNOWN').upper(),
-                "amount": float(sms.get('amount', 0)),
-                "sender": sms.get('sender', ''),
-                "receiver": sms.get('receiver', ''),
-                "timestamp": sms.get('timestamp', ''),
-                "status": sms.get('status', 'completed'),
-                "reference": sms.get('reference', f'TXN{transaction_id:06d}')
-            }
-            
-            transactions.append(transaction)
-            transaction_id += 1
+        if recover:
+            transactions = list(iter_transactions(xml_file, recover=True,
+                                                  dead_letter=dead_letter))
+        else:
+            root = ET.parse(xml_file).getroot()
+            transactions = []
+            for sms in root.iter('sms'):
+                transaction = _build_or_reject(sms, len(transactions) + 1, xml_file, dead_letter)
+                if transaction is not None:
+                    transactions.append(transaction)
         
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
         
-        with open(output_file, 'w') as f:
-            json.dump(transactions, f, indent=2)
+        with open(output_file, 'wb') as f:
+            serializer.dump(transactions, f, pretty=pretty)
         
         print(f"Parsed {len(transactions)} transactions")
         print(f"Saved to {output_file}")
+        _report_dead_letters(dead_letter)
         
         return transactions
         
@@ -56,8 +153,112 @@ def parse_xml_to_json(xml_file='modified_sms_v2.xml', output_file='data/transact
         print(f"Error: File '{xml_file}' not found")
         return []
     except ET.ParseError as e:
-        print(f"XML parse error: {e}")
+        print(f"XML parse error: {e} (use --recover to skip corrupt records)")
         return []
+    finally:
+        dead_letter.close()
+
+
+def _refuse_live_output(output_file):
+    """
+    True (with a message) if output_file is a snapshot the API has moved past
+
+    The parser renumbers from id 1: written over the API's data, it would
+    win over a newer .snap and the journal would replay onto other rows.
+    """
+    live = live_api_files(output_file)
+    if live:
+        print(f"Error: {output_file} has newer API data in {', '.join(live)}; "
+              "use etl/ingest.py to add records, or stop the server and move "
+              "those files aside to rebuild from scratch")
+    return bool(live)
+
+
+def _report_dead_letters(dead_letter):
+    if len(dead_letter):
+        print(f"Skipped {len(dead_letter)} malformed records -> {dead_letter.path}")
+
+
+def stream_xml_to_json(xml_file='modified_sms_v2.xml', output_file='data/transactions.json',
+                       report_every=100000, pretty=False, recover=False):
+    """
+    Streaming variant of parse_xml_to_json for very large backups
+    
+    Transactions are written to the output as they are parsed, so only one
+    record is held in memory at a time. Output goes to a temporary file that
+    replaces output_file on success, leaving the old file intact on error.
+    The JSON layout is identical to parse_xml_to_json with the same pretty.
+    
+    Args:
+        xml_file: Path to input XML file
+        output_file: Path to output JSON file
+        report_every: Print progress every N records (0 disables)
+        pretty: Indent the output (compact by default)
+        recover: Skip corrupt XML fragments instead of failing
+    
+    Returns:
+        Dictionary with record count, elapsed seconds and records/sec, or
+        None on error
+    """
+    if _refuse_live_output(output_file):
+        return None
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    tmp_file = output_file + '.tmp'
+    count = 0
+    start = time.perf_counter()
+    dead_letter = DeadLetterQueue(name='xml_parser')
+    
+    try:
+        with open(tmp_file, 'wb') as f:
+            f.write(b'[')
+            for transaction in iter_transactions(xml_file, recover=recover,
+                                                 dead_letter=dead_letter):
+                if pretty:
+                    f.write(b',\n' if count else b'\n')
+                    f.write(textwrap.indent(serializer.dumps(transaction, pretty=True), '  ').encode())
+                else:
+                    f.write(b',' if count else b'')
+                    f.write(serializer.dumpb(transaction))
+                count += 1
+                
+                if report_every and count % report_every == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {count} records ({count / elapsed:.0f} records/sec)")
+            f.write(b'\n]' if count and pretty else b']')
+        
+        os.replace(tmp_file, output_file)
+        
+    except FileNotFoundError:
+        print(f"Error: File '{xml_file}' not found")
+        _remove_quietly(tmp_file)
+        return None
+    except ET.ParseError as e:
+        print(f"XML parse error: {e} (use --recover to skip corrupt records)")
+        _remove_quietly(tmp_file)
+        return None
+    finally:
+        dead_letter.close()
+    
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0
+    
+    print(f"Parsed {count} transactions in {elapsed:.2f}s ({rate:.0f} records/sec)")
+    print(f"Saved to {output_file}")
+    _report_dead_letters(dead_letter)
+    
+    return {
+        'records': count,
+        'elapsed_s': elapsed,
+        'records_per_sec': rate
+    }
+
+
+def _remove_quietly(path):
+    """Delete a file if it exists"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
 
 def create_sample_xml(filename='modified_sms_v2.xml'):
@@ -125,14 +326,27 @@ def create_sample_xml(filename='modified_sms_v2.xml'):
 
 
 if __name__ == '__main__':
-    xml_file = 'modified_sms_v2.xml'
+    parser = argparse.ArgumentParser(description='Parse MoMo SMS XML into JSON')
+    parser.add_argument('xml_file', nargs='?', default='modified_sms_v2.xml')
+    parser.add_argument('--output', default='data/transactions.json')
+    parser.add_argument('--stream', action='store_true',
+                        help='Use constant-memory iterparse mode for large files')
+    parser.add_argument('--pretty', action='store_true',
+                        help='Indent the JSON output (compact by default)')
+    parser.add_argument('--recover', action='store_true',
+                        help='Skip corrupt XML fragments (dead-lettered) instead of failing')
+    args = parser.parse_args()
     
-    if not os.path.exists(xml_file):
+    if not os.path.exists(args.xml_file):
         print("XML file not found. Creating sample...")
-        create_sample_xml(xml_file)
-    
-    transactions = parse_xml_to_json(xml_file)
+        create_sample_xml(args.xml_file)
     
-    if transactions:
-        print(f"\nSample transaction:")
-        print(json.dumps(transactions[0], indent=2))
+    if args.stream:
+        stream_xml_to_json(args.xml_file, args.output, pretty=args.pretty, recover=args.recover)
+    else:
+        transactions = parse_xml_to_json(args.xml_file, args.output, pretty=args.pretty,
+                                         recover=args.recover)
+        
+        if transactions:
+            print(f"\nSample transaction:")
+            print(json.dumps(transactions[0].to_dict(), indent=2))
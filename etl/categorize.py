@@ -0,0 +1,49 @@
+"""
+Categorization stage of the ETL pipeline
+Assigns each record one of the Transaction_Categories names
+"""
+
+TRANSACTION_TYPES = ('SEND', 'RECEIVE', 'DEPOSIT', 'WITHDRAW', 'PAYMENT')
+
+# Keywords in the SMS body, checked in order, when no valid type is given
+BODY_KEYWORDS = (
+    ('received', 'RECEIVE'),
+    ('deposit', 'DEPOSIT'),
+    ('withdraw', 'WITHDRAW'),
+    ('payment', 'PAYMENT'),
+    ('paid', 'PAYMENT'),
+    ('transferred', 'SEND'),
+    ('sent', 'SEND'),
+)
+
+TYPE_ALIASES = {
+    'TRANSFER': 'SEND',
+    'WITHDRAWAL': 'WITHDRAW',
+    'PAY': 'PAYMENT',
+    'INCOMING': 'RECEIVE',
+}
+
+
+def categorize_type(record_type, body=''):
+    """
+    Map a raw type (or, failing that, the SMS body) to a category
+
+    Returns:
+        One of TRANSACTION_TYPES, or 'UNKNOWN'
+    """
+    record_type = (record_type or '').upper()
+    record_type = TYPE_ALIASES.get(record_type, record_type)
+    if record_type in TRANSACTION_TYPES:
+        return record_type
+
+    text = (body or '').lower()
+    for keyword, category in BODY_KEYWORDS:
+        if keyword in text:
+            return category
+    return 'UNKNOWN'
+
+
+def categorize(record):
+    """Set the record's type to its category and drop the raw body"""
+    record['type'] = categorize_type(record.get('type'), record.pop('body', ''))
+    return record
@@ -0,0 +1,79 @@
+"""
+Cleaning and normalization stage of the ETL pipeline
+Turns raw <sms> attributes into consistently formatted records
+"""
+
+from datetime import datetime, timezone
+import re
+
+PHONE_SEPARATORS = re.compile(r'[\s\-().]')
+
+# Epoch values above this are milliseconds (SMS backups store date="...ms")
+EPOCH_MS_THRESHOLD = 10 ** 11
+
+
+def normalize_phone(value):
+    """Strip separators from phone numbers; upper-case named parties"""
+    value = (value or '').strip()
+    compact = PHONE_SEPARATORS.sub('', value)
+    if compact.lstrip('+').isdigit():
+        return compact
+    return value.upper()
+
+
+def normalize_amount(value):
+    """Parse an amount such as '5,000' or '1500.50 RWF' into a float"""
+    if value is None or str(value).strip() == '':
+        raise ValueError("missing amount")
+
+    text = str(value).replace(',', '').strip()
+    text = re.sub(r'[A-Za-z\s]+$', '', text)
+    amount = round(float(text), 2)
+    if amount <= 0:
+        raise ValueError(f"non-positive amount: {value}")
+    return amount
+
+
+def normalize_timestamp(value):
+    """
+    Normalize a timestamp to ISO 'YYYY-MM-DDTHH:MM:SS'
+
+    Accepts ISO strings (with 'T' or space) and epoch seconds or
+    milliseconds. Epoch values are converted as UTC. Unparseable values
+    raise ValueError.
+    """
+    text = (value or '').strip()
+    if not text:
+        raise ValueError("missing timestamp")
+
+    if text.isdigit():
+        epoch = int(text)
+        if epoch > EPOCH_MS_THRESHOLD:
+            epoch //= 1000
+        parsed = datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+    else:
+        parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+
+    return parsed.replace(microsecond=0).isoformat()
+
+
+def clean_record(raw):
+    """
+    Normalize one raw <sms> attribute dictionary
+
+    Returns:
+        Record dictionary without an id (ids are assigned by the driver)
+
+    Raises:
+        ValueError: if the amount or timestamp cannot be parsed
+    """
+    return {
+        "type": (raw.get('type') or '').strip().upper(),
+        "amount": normalize_amount(raw.get('amount')),
+        "sender": normalize_phone(raw.get('sender')),
+        "receiver": normalize_phone(raw.get('receiver')),
+        "timestamp": normalize_timestamp(raw.get('timestamp') or raw.get('date')),
+        "status": (raw.get('status') or 'completed').strip().lower(),
+        "reference": (raw.get('reference') or '').strip(),
+        "body": raw.get('body', '')
+    }
@@ -0,0 +1,30 @@
+"""
+ETL configuration
+Paths and tuning knobs, overridable through environment variables
+"""
+
+import os
+
+XML_PATH = os.environ.get('MOMO_XML_PATH', 'modified_sms_v2.xml')
+RAW_DIR = os.environ.get('MOMO_RAW_DIR', 'data/raw')
+TRANSACTIONS_JSON = os.environ.get('MOMO_TRANSACTIONS_JSON', 'data/transactions.json')
+# JSON written by etl/run.py; kept apart from the API's live snapshot above
+ETL_OUTPUT_JSON = os.environ.get('MOMO_ETL_OUTPUT', 'data/processed/transactions.json')
+DB_PATH = os.environ.get('MOMO_DB_PATH', 'data/momo.db')
+
+# Malformed records and corrupt XML fragments (etl/dead_letter.py)
+DEAD_LETTER_DIR = os.environ.get('MOMO_DEAD_LETTER_DIR', 'data/logs/dead_letter')
+
+# Rows per executemany batch / SQLite transaction when bulk loading
+DB_BATCH_SIZE = int(os.environ.get('MOMO_DB_BATCH_SIZE', 50000))
+
+# Pragmas applied to every SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'foreign_keys': 'ON',
+    'temp_store': 'MEMORY',
+    'cache_size': -65536,        # KiB (negative) -> 64 MiB page cache
+    'mmap_size': 268435456,      # 256 MiB
+    'busy_timeout': 5000,        # ms
+}
@@ -0,0 +1,82 @@
+"""
+Dead-letter queue for the ETL pipeline
+Records and XML fragments that could not be used, with the reason, as JSONL
+"""
+
+import json
+import os
+import time
+
+from etl.config import DEAD_LETTER_DIR
+
+# Longest XML fragment kept per entry (characters)
+MAX_FRAGMENT = 4096
+
+
+def make_entry(source, stage, reason, offset=None, record=None, fragment=None):
+    """
+    One dead-letter entry
+
+    Args:
+        source: Input file the record came from
+        stage: Where it was rejected ('parse', 'clean', 'build')
+        reason: Error message
+        offset: Byte offset of the fragment in source, when known
+        record: Raw <sms> attributes, for records that parsed
+        fragment: Raw XML bytes, for fragments that did not
+    """
+    if isinstance(fragment, bytes):
+        fragment = fragment.decode('utf-8', errors='replace')
+    return {
+        "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "source": source,
+        "stage": stage,
+        "offset": offset,
+        "reason": reason,
+        "record": record,
+        "fragment": fragment[:MAX_FRAGMENT] if fragment is not None else None
+    }
+
+
+class DeadLetterQueue:
+    """
+    Append-only JSONL file of rejected records for one run
+
+    The file (<directory>/<timestamp>_<name>_<pid>.jsonl) is only created
+    when the first entry arrives, so clean runs leave nothing behind.
+    Entries are built with make_entry, which worker processes can call
+    themselves and ship back to the parent for writing.
+    """
+
+    def __init__(self, directory=DEAD_LETTER_DIR, name='etl'):
+        self.directory = directory
+        self.name = name
+        self.path = None
+        self.counts = {}
+        self._file = None
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def add(self, source, stage, reason, **details):
+        """Record one rejected record or fragment (see make_entry)"""
+        self.write([make_entry(source, stage, reason, **details)])
+
+    def write(self, entries):
+        """Append entries built by make_entry"""
+        if not entries:
+            return
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(
+                self.directory, f"{time.strftime('%Y%m%dT%H%M%S')}_{self.name}_{os.getpid()}.jsonl")
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for entry in entries:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.counts[entry['stage']] = self.counts.get(entry['stage'], 0) + 1
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Incremental, Idempotent XML Ingestion
+Checkpoints each export so re-runs only process newly appended SMS
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etl.categorize import categorize
+from etl.clean_normalize import clean_record
+from etl.config import DB_PATH
+from etl.dead_letter import DeadLetterQueue
+from etl.parse_xml import iter_sms_range, next_record_offset, records_end_offset
+from etl.run import discover_inputs
+
+CHECKPOINT_PATH = 'data/processed/ingest_checkpoint.json'
+SEEN_REFERENCES_PATH = 'data/processed/seen_references.txt'
+
+# Bytes hashed at the start of a file and just before its checkpoint offset
+FINGERPRINT_BYTES = 4096
+
+
+def _sha256_range(xml_file, start, length):
+    with open(xml_file, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(length)).hexdigest()
+
+
+def fingerprint(xml_file, offset):
+    """
+    Cheap identity of an export up to offset
+
+    Hashes the first and the last FINGERPRINT_BYTES before offset. If both
+    still match, the file has only been appended to since the checkpoint.
+    """
+    return {
+        'head': _sha256_range(xml_file, 0, FINGERPRINT_BYTES),
+        'tail': _sha256_range(xml_file, max(0, offset - FINGERPRINT_BYTES),
+                              min(offset, FINGERPRINT_BYTES))
+    }
+
+
+def dedupe_key(record):
+    """The SMS reference, or a content hash for records without one"""
+    if record.get('reference'):
+        return record['reference']
+    content = '|'.join(str(record.get(field)) for field in
+                       ('type', 'amount', 'sender', 'receiver', 'timestamp'))
+    return 'sha1:' + hashlib.sha1(content.encode()).hexdigest()
+
+
+class Checkpoint:
+    """
+    Per-file ingest progress plus the set of already-ingested references
+
+    File entries ({size, offset, head, tail}) are rewritten atomically
+    after each run. Seen references live in an append-only text file, one
+    per line, so recording new ones costs O(new).
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH, references_path=SEEN_REFERENCES_PATH):
+        self.path = path
+        self.references_path = references_path
+
+        try:
+            with open(path, 'r') as f:
+                self.files = json.load(f)['files']
+        except (FileNotFoundError, ValueError, KeyError):
+            self.files = {}
+
+        try:
+            with open(references_path, 'r') as f:
+                self.seen = {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            self.seen = set()
+
+    def resume_offset(self, xml_file):
+        """
+        Where to resume reading an export
+
+        Returns:
+            None if the file is unchanged since the last run, the saved
+            offset if it has only grown, or 0 for a new/rewritten file
+        """
+        entry = self.files.get(os.path.abspath(xml_file))
+        if entry is None:
+            return 0
+
+        size = os.path.getsize(xml_file)
+        if size < entry['offset']:
+            return 0
+        if fingerprint(xml_file, entry['offset']) != {'head': entry['head'], 'tail': entry['tail']}:
+            return 0
+        if size == entry['size']:
+            return None
+        return entry['offset']
+
+    def mark_file(self, xml_file, offset):
+        self.files[os.path.abspath(xml_file)] = {
+            'size': os.path.getsize(xml_file),
+            'offset': offset,
+            **fingerprint(xml_file, offset)
+        }
+
+    def add_references(self, keys):
+        if not keys:
+            return
+        directory = os.path.dirname(self.references_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.references_path, 'a') as f:
+            f.writelines(key + '\n' for key in keys)
+            f.flush()
+            os.fsync(f.fileno())
+        self.seen.update(keys)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class JournalSink:
+    """
+    Append new transactions to the API's mutation journal
+
+    Ids continue from the journal's high-water mark (snapshot metadata +
+    journal), so ids handed out by the API are never reused and the
+    snapshot is never rewritten. The journal's writer lock is taken
+    first, so this fails fast with JournalLocked while the server runs.
+    """
+
+    def __init__(self):
+        from api.journal import Journal
+        self.journal = Journal(fsync='never')
+        self.journal.acquire()
+        self.next_id = self.journal.next_id()
+
+    def known_keys(self, full=False):
+        """
+        Keys of records already in the store
+
+        Normally only the journal is read (covers a crash between writing
+        records and checkpointing). With full=True - the first run, before
+        any references were recorded - the whole snapshot is included.
+        """
+        if full:
+            return {dedupe_key(t) for t in self.journal.replay()}
+        return {dedupe_key(entry['transaction']) for entry in self.journal.iter_entries()
+                if entry['op'] == 'put'}
+
+    def write(self, transactions):
+        for transaction in transactions:
+            self.journal.record_put(transaction)
+
+    def flush(self):
+        """One fsync per ingested file (group commit)"""
+        self.journal.sync()
+
+    def close(self):
+        self.journal.close()
+
+
+class SQLiteIngestSink:
+    """Append new transactions to the SQLite database"""
+
+    def __init__(self, db_path=DB_PATH):
+        from etl.load_db import connect, create_schema, load_transactions
+        self._load = load_transactions
+        self.conn = connect(db_path)
+        create_schema(self.conn)
+        max_id = self.conn.execute("SELECT MAX(transaction_id) FROM Transactions").fetchone()[0]
+        self.next_id = (max_id or 0) + 1
+
+    def known_keys(self, full=False):
+        if not full:
+            return set()
+        return {reference for reference, in self.conn.execute("SELECT reference FROM Transactions")}
+
+    def write(self, transactions):
+        self._load(self.conn, transactions)
+
+    def flush(self):
+        pass  # load_transactions commits each batch
+
+    def close(self):
+        self.conn.close()
+
+
+def ingest(xml_files, sink, checkpoint, recover=False, dead_letter=None):
+    """
+    Ingest only what is new in each export
+
+    Unchanged files are skipped after a fingerprint check; grown files are
+    read from their checkpoint offset; new or rewritten files are read in
+    full but every SMS whose reference was seen before is skipped. Only new
+    records are assigned ids and appended to the sink.
+
+    Records that fail cleaning, and with recover=True corrupt XML fragments,
+    go to dead_letter (a DeadLetterQueue in DEAD_LETTER_DIR by default).
+    The file is still checkpointed, so they are not re-read next run.
+
+    Returns:
+        Metrics dictionary
+    """
+    seen = checkpoint.seen | sink.known_keys(full=not checkpoint.seen)
+    stats = {'files': len(xml_files), 'skipped_files': 0, 'scanned': 0,
+             'duplicates': 0, 'rejected': 0, 'corrupt': 0, 'ingested': 0}
+    owns_dead_letter = dead_letter is None
+    if owns_dead_letter:
+        dead_letter = DeadLetterQueue(name='ingest')
+    start_time = time.perf_counter()
+
+    for xml_file in xml_files:
+        resume = checkpoint.resume_offset(xml_file)
+        if resume is None:
+            stats['skipped_files'] += 1
+            continue
+
+        end = records_end_offset(xml_file)
+        with open(xml_file, 'rb') as f:
+            start = next_record_offset(f, resume, end)
+
+        def corrupt(offset, reason, fragment):
+            stats['corrupt'] += 1
+            dead_letter.add(xml_file, 'parse', reason, offset=offset, fragment=fragment)
+
+        batch = []
+        new_keys = []
+        for raw in iter_sms_range(xml_file, start, end, recover=recover, on_error=corrupt):
+            stats['scanned'] += 1
+            try:
+                record = categorize(clean_record(raw))
+            except (ValueError, TypeError) as e:
+                stats['rejected'] += 1
+                dead_letter.add(xml_file, 'clean', str(e), record=raw)
+                continue
+
+            key = dedupe_key(record)
+            if key in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(key)
+            new_keys.append(key)
+
+            tid = sink.next_id
+            sink.next_id += 1
+            batch.append({"id": str(tid), **record,
+                          "reference": record['reference'] or f"TXN{tid:06d}"})
+
+        # Sink first, then references, then checkpoint: a crash in between
+        # can only cause re-reading, never lost records
+        sink.write(batch)
+        sink.flush()
+        checkpoint.add_references(new_keys)
+        checkpoint.mark_file(xml_file, end)
+        checkpoint.save()
+        stats['ingested'] += len(batch)
+
+    sink.close()
+    if owns_dead_letter:
+        dead_letter.close()
+    stats['dead_letter'] = dead_letter.path
+    stats['elapsed_s'] = round(time.perf_counter() - start_time, 4)
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Incremental MoMo SMS ingestion')
+    parser.add_argument('inputs', nargs='*', help='XML files or directories (default: data/raw)')
+    parser.add_argument('--sink', choices=('journal', 'sqlite'), default='journal',
+                        help='journal: data/transactions.journal (JSON store); sqlite: data/momo.db')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--recover', action='store_true',
+                        help='Skip corrupt XML fragments (dead-lettered) instead of aborting')
+    args = parser.parse_args()
+
+    from api.journal import JournalLocked
+    try:
+        sink = SQLiteIngestSink(args.db) if args.sink == 'sqlite' else JournalSink()
+    except JournalLocked as e:
+        parser.error(f"{e}; stop the server first")
+    stats = ingest(discover_inputs(args.inputs), sink, Checkpoint(), recover=args.recover)
+
+    print(f"Files: {stats['files']} ({stats['skipped_files']} unchanged)")
+    print(f"Scanned {stats['scanned']} SMS: {stats['ingested']} new, "
+          f"{stats['duplicates']} already ingested, {stats['rejected']} rejected, "
+          f"{stats['corrupt']} corrupt fragments skipped")
+    if stats['dead_letter']:
+        print(f"Dead letters: {stats['dead_letter']}")
+    print(f"Elapsed: {stats['elapsed_s']:.2f}s")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+SQLite Loader for MoMo SMS Transactions
+Maps the database/database_setup.sql schema onto SQLite and bulk-loads it
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa import serializer
+from etl.config import DB_BATCH_SIZE, DB_PATH, SQLITE_PRAGMAS, TRANSACTIONS_JSON
+
+# SQLite translation of database/database_setup.sql (MySQL ENUMs become
+# CHECK constraints, AUTO_INCREMENT becomes INTEGER PRIMARY KEY).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INTEGER PRIMARY KEY,
+    phone_number TEXT NOT NULL UNIQUE,
+    full_name TEXT,
+    email TEXT,
+    registration_date TEXT DEFAULT CURRENT_TIMESTAMP,
+    account_status TEXT DEFAULT 'active'
+        CHECK (account_status IN ('active', 'suspended', 'closed')),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_users_status ON Users (account_status);
+
+CREATE TABLE IF NOT EXISTS Transaction_Categories (
+    category_id INTEGER PRIMARY KEY,
+    category_name TEXT NOT NULL UNIQUE,
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS Transactions (
+    transaction_id INTEGER PRIMARY KEY,
+    reference TEXT NOT NULL UNIQUE,
+    sender_id INTEGER NOT NULL REFERENCES Users (user_id)
+        ON DELETE RESTRICT ON UPDATE CASCADE,
+    receiver_id INTEGER NOT NULL REFERENCES Users (user_id)
+        ON DELETE RESTRICT ON UPDATE CASCADE,
+    category_id INTEGER NOT NULL REFERENCES Transaction_Categories (category_id)
+        ON DELETE RESTRICT ON UPDATE CASCADE,
+    amount REAL NOT NULL CHECK (amount > 0),
+    currency TEXT DEFAULT 'SZL',
+    status TEXT DEFAULT 'pending'
+        CHECK (status IN ('pending', 'completed', 'failed', 'reversed')),
+    transaction_date TEXT NOT NULL,
+    description TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_sender ON Transactions (sender_id);
+CREATE INDEX IF NOT EXISTS idx_receiver ON Transactions (receiver_id);
+CREATE INDEX IF NOT EXISTS idx_date ON Transactions (transaction_date);
+CREATE INDEX IF NOT EXISTS idx_status ON Transactions (status);
+CREATE INDEX IF NOT EXISTS idx_category ON Transactions (category_id);
+
+-- API-shaped rows (same fields as data/transactions.json)
+CREATE VIEW IF NOT EXISTS vw_transactions AS
+SELECT t.transaction_id AS id, c.category_name AS type, t.amount,
+       s.phone_number AS sender, r.phone_number AS receiver,
+       t.transaction_date AS timestamp, t.status, t.reference
+FROM Transactions t
+JOIN Users s ON t.sender_id = s.user_id
+JOIN Users r ON t.receiver_id = r.user_id
+JOIN Transaction_Categories c ON t.category_id = c.category_id;
+
+CREATE VIEW IF NOT EXISTS vw_active_users AS
+SELECT u.user_id, u.phone_number, u.full_name, u.account_status,
+       COUNT(DISTINCT t.transaction_id) AS total_transactions,
+       COALESCE(SUM(CASE WHEN t.sender_id = u.user_id THEN t.amount ELSE 0 END), 0) AS total_sent,
+       COALESCE(SUM(CASE WHEN t.receiver_id = u.user_id THEN t.amount ELSE 0 END), 0) AS total_received
+FROM Users u
+LEFT JOIN Transactions t ON u.user_id = t.sender_id OR u.user_id = t.receiver_id
+WHERE u.account_status = 'active'
+GROUP BY u.user_id;
+"""
+
+CATEGORIES = [
+    ('SEND', 'Send money to another user'),
+    ('RECEIVE', 'Receive money from another user'),
+    ('DEPOSIT', 'Deposit money into account'),
+    ('WITHDRAW', 'Withdraw money from account'),
+    ('PAYMENT', 'Payment for goods or services'),
+]
+
+# Upsert on the primary key only: re-loading the same ids is idempotent,
+# while a clashing reference still fails the UNIQUE constraint.
+INSERT_TRANSACTION = """
+INSERT INTO Transactions
+    (transaction_id, reference, sender_id, receiver_id, category_id,
+     amount, status, transaction_date)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (transaction_id) DO UPDATE SET
+    reference = excluded.reference,
+    sender_id = excluded.sender_id,
+    receiver_id = excluded.receiver_id,
+    category_id = excluded.category_id,
+    amount = excluded.amount,
+    status = excluded.status,
+    transaction_date = excluded.transaction_date,
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+
+# Plain insert for new rows: an id or reference already taken fails
+# instead of overwriting a row another writer put there
+CREATE_TRANSACTION = """
+INSERT INTO Transactions
+    (transaction_id, reference, sender_id, receiver_id, category_id,
+     amount, status, transaction_date)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def connect(db_path=DB_PATH, check_same_thread=True):
+    """Open a SQLite connection with the tuned pragmas applied"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # isolation_level=None: transactions are opened explicitly with BEGIN
+    conn = sqlite3.connect(db_path, isolation_level=None,
+                           check_same_thread=check_same_thread)
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def create_schema(conn):
+    """Create tables, indexes and views, and seed the categories"""
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        "INSERT OR IGNORE INTO Transaction_Categories (category_name, description) VALUES (?, ?)",
+        CATEGORIES
+    )
+
+
+class IdResolver:
+    """
+    Phone number / category name -> surrogate key, with caching
+
+    Missing users and categories are inserted on first sight. Lookups for
+    a whole batch are resolved with a few executemany/SELECT round-trips
+    instead of one query per row.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.users = {}
+        self.categories = dict(
+            (name, cid) for cid, name in
+            conn.execute("SELECT category_id, category_name FROM Transaction_Categories")
+        )
+
+    def resolve_users(self, phones):
+        missing = [p for p in set(phones) if p not in self.users]
+        if not missing:
+            return
+
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO Users (phone_number) VALUES (?)",
+            ((p,) for p in missing)
+        )
+        # Bounded IN lists stay below SQLite's host-parameter limit
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            self.users.update(
+                (phone, uid) for uid, phone in self.conn.execute(
+                    f"SELECT user_id, phone_number FROM Users WHERE phone_number IN ({placeholders})",
+                    chunk
+                )
+            )
+
+    def resolve_category(self, name):
+        cid = self.categories.get(name)
+        if cid is None:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO Transaction_Categories (category_name) VALUES (?)", (name,)
+            )
+            cid = self.conn.execute(
+                "SELECT category_id FROM Transaction_Categories WHERE category_name = ?", (name,)
+            ).fetchone()[0]
+            self.categories[name] = cid
+        return cid
+
+    def row(self, transaction):
+        """Transaction dict -> INSERT_TRANSACTION parameters"""
+        tid = int(transaction['id'])
+        return (
+            tid,
+            transaction.get('reference') or f"TXN{tid:06d}",
+            self.users[transaction.get('sender', '')],
+            self.users[transaction.get('receiver', '')],
+            self.resolve_category(transaction.get('type', 'UNKNOWN')),
+            float(transaction['amount']),
+            transaction.get('status', 'completed'),
+            transaction.get('timestamp', '')
+        )
+
+
+def load_transactions(conn, transactions, batch_size=DB_BATCH_SIZE, commit=True):
+    """
+    Bulk-load transaction dictionaries
+
+    Rows are buffered into batches; each batch resolves its users and
+    categories and is inserted with a single executemany inside one
+    BEGIN/COMMIT, which keeps the per-row cost close to the raw insert.
+    Accepts any iterable, including the streaming iter_transactions.
+    With commit=False the batches join a transaction the caller opened.
+
+    Returns:
+        Number of rows loaded
+    """
+    resolver = IdResolver(conn)
+    count = 0
+    batch = []
+
+    def insert():
+        phones = [t.get('sender', '') for t in batch] + [t.get('receiver', '') for t in batch]
+        resolver.resolve_users(phones)
+        conn.executemany(INSERT_TRANSACTION, [resolver.row(t) for t in batch])
+
+    def flush():
+        if not commit:
+            insert()
+            return
+        conn.execute("BEGIN")
+        try:
+            insert()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    for transaction in transactions:
+        batch.append(transaction)
+        if len(batch) >= batch_size:
+            flush()
+            count += len(batch)
+            batch = []
+
+    if batch:
+        flush()
+        count += len(batch)
+
+    return count
+
+
+def load_json_to_db(json_file=TRANSACTIONS_JSON, db_path=DB_PATH):
+    """Load data/transactions.json into the SQLite database"""
+    with open(json_file, 'rb') as f:
+        transactions = serializer.load(f)
+
+    conn = connect(db_path)
+    try:
+        create_schema(conn)
+        start = time.perf_counter()
+        count = load_transactions(conn, transactions)
+        elapsed = time.perf_counter() - start
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"Loaded {count} transactions into {db_path} in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+    return count
+
+
+if __name__ == '__main__':
+    json_file = sys.argv[1] if len(sys.argv) > 1 else TRANSACTIONS_JSON
+    db_path = sys.argv[2] if len(sys.argv) > 2 else DB_PATH
+    load_json_to_db(json_file, db_path)
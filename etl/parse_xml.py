@@ -0,0 +1,190 @@
+"""
+XML extraction stage of the ETL pipeline
+Streams raw <sms> attribute dictionaries from whole files or byte ranges
+"""
+
+import os
+import re
+import xml.etree.ElementTree as ET
+
+# Start of an <sms> element (but not <sms_records>)
+SMS_START = re.compile(rb'<sms[\s/>]')
+RECORDS_END = b'</sms_records>'
+
+READ_SIZE = 1 << 20
+
+
+def iter_sms(xml_file):
+    """
+    Yield the attributes of every <sms> element in a file
+
+    Uses iterparse and clears processed elements, so memory stays flat.
+    """
+    context = ET.iterparse(xml_file, events=('start', 'end'))
+    _, root = next(context)
+    for event, elem in context:
+        if event == 'end' and elem.tag == 'sms':
+            yield dict(elem.attrib)
+            elem.clear()
+            root.clear()
+
+
+def split_ranges(xml_file, chunk_size):
+    """
+    Split a flat <sms_records> export into byte ranges of ~chunk_size
+
+    Every boundary is moved forward to the start of the next <sms element,
+    so each range holds only complete records and can be parsed on its own.
+
+    Returns:
+        List of (start, end) byte offsets
+    """
+    size = os.path.getsize(xml_file)
+    with open(xml_file, 'rb') as f:
+        boundaries = [next_record_offset(f, 0, size)]
+        while boundaries[-1] < size:
+            boundaries.append(next_record_offset(f, boundaries[-1] + chunk_size, size))
+
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end]
+
+
+def iter_sms_range(xml_file, start, end, recover=False, on_error=None):
+    """
+    Yield <sms> attributes from one byte range produced by split_ranges
+
+    The range is wrapped in a synthetic root element and fed to an
+    incremental pull parser in READ_SIZE pieces. A malformed document
+    raises ET.ParseError unless recover is set (see _iter_sms_recovering).
+    """
+    if recover:
+        yield from _iter_sms_recovering(xml_file, start, end, on_error)
+        return
+
+    parser = ET.XMLPullParser(events=('end',))
+    parser.feed(b'<chunk>')
+
+    for data in _iter_range(xml_file, start, end):
+        parser.feed(data)
+        yield from _drain(parser)
+
+    parser.feed(b'</chunk>')
+    yield from _drain(parser)
+    parser.close()
+
+
+def _iter_range(xml_file, start, end):
+    """READ_SIZE pieces of a byte range, stopping at </sms_records>"""
+    with open(xml_file, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+
+            # The last range may run into the document's closing tag
+            closing = data.find(RECORDS_END)
+            if closing != -1:
+                data = data[:closing]
+                remaining = 0
+
+            yield data
+
+
+def _iter_sms_recovering(xml_file, start, end, on_error):
+    """
+    Error-tolerant iter_sms_range: skip corrupt fragments, keep the rest
+
+    The range is parsed in blocks that end on an <sms boundary. A block
+    that parses is handled in one go, so clean input costs about the same
+    as strict mode. A block that does not is split at every <sms start and
+    each fragment is parsed alone; fragments that still fail are passed to
+    on_error(offset, reason, fragment) and skipped.
+    """
+    for offset, block in _iter_record_blocks(xml_file, start, end):
+        try:
+            chunk = ET.fromstring(b'<chunk>' + block + b'</chunk>')
+        except ET.ParseError:
+            pass
+        else:
+            for elem in chunk.iter('sms'):
+                yield dict(elem.attrib)
+            continue
+
+        starts = [match.start() for match in SMS_START.finditer(block)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        for begin, stop in zip(starts, starts[1:] + [len(block)]):
+            fragment = block[begin:stop]
+            try:
+                chunk = ET.fromstring(b'<chunk>' + fragment + b'</chunk>')
+            except ET.ParseError as e:
+                if on_error is not None:
+                    on_error(offset + begin, f"XML parse error: {e}", fragment)
+                continue
+            for elem in chunk.iter('sms'):
+                yield dict(elem.attrib)
+
+
+def _iter_record_blocks(xml_file, start, end):
+    """(offset, bytes) blocks of a range, each cut just before an <sms start"""
+    offset = start
+    pending = b''
+    for data in _iter_range(xml_file, start, end):
+        block = pending + data
+        cut = _last_record_start(block)
+        if cut > 0:
+            yield offset, block[:cut]
+            offset += cut
+            block = block[cut:]
+        pending = block
+    if pending:
+        yield offset, pending
+
+
+def _last_record_start(block):
+    """Offset of the last complete '<sms' tag opening in block (-1 if none)"""
+    position = len(block)
+    while True:
+        position = block.rfind(b'<sms', 0, position)
+        if position == -1 or SMS_START.match(block, position):
+            return position
+
+
+def _drain(parser):
+    for _, elem in parser.read_events():
+        if elem.tag == 'sms':
+            yield dict(elem.attrib)
+            elem.clear()
+
+
+def next_record_offset(f, position, size):
+    """Offset of the first <sms element at or after position (size if none)"""
+    if position >= size:
+        return size
+
+    f.seek(position)
+    offset = position
+    tail = b''
+    while True:
+        data = f.read(READ_SIZE)
+        if not data:
+            return size
+        window = tail + data
+        match = SMS_START.search(window)
+        if match:
+            return offset - len(tail) + match.start()
+        # Keep a few bytes in case the tag straddles two reads
+        tail = window[-8:]
+        offset += len(data)
+
+
+def records_end_offset(xml_file):
+    """Offset of the closing </sms_records> tag (file size if absent)"""
+    size = os.path.getsize(xml_file)
+    with open(xml_file, 'rb') as f:
+        f.seek(max(0, size - READ_SIZE))
+        tail = f.read()
+    closing = tail.rfind(RECORDS_END)
+    return size - len(tail) + closing if closing != -1 else size
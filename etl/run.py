@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Parallel ETL Driver
+parse -> clean/normalize -> categorize in a process pool, load in the parent
+"""
+
+from collections import deque
+import argparse
+import glob
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import textwrap
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa import serializer
+from etl.categorize import categorize
+from etl.clean_normalize import clean_record
+from etl.config import DB_PATH, ETL_OUTPUT_JSON, RAW_DIR, XML_PATH
+from etl.dead_letter import DeadLetterQueue, make_entry
+from etl.parse_xml import iter_sms_range, split_ranges
+
+# Order of the fields shipped back from workers (tuples pickle cheaper than dicts)
+RECORD_FIELDS = ('type', 'amount', 'sender', 'receiver', 'timestamp', 'status', 'reference')
+
+DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+class StageMetrics:
+    """Record count, busy time and per-task latency for one pipeline stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+        self.tasks = 0
+        self.busy_s = 0.0
+        self.max_latency_s = 0.0
+
+    def add(self, records, seconds):
+        self.records += records
+        self.tasks += 1
+        self.busy_s += seconds
+        self.max_latency_s = max(self.max_latency_s, seconds)
+
+    def summary(self):
+        return {
+            'records': self.records,
+            'tasks': self.tasks,
+            'busy_s': round(self.busy_s, 4),
+            'records_per_sec': round(self.records / self.busy_s, 1) if self.busy_s else 0,
+            'avg_latency_ms': round(self.busy_s / self.tasks * 1000, 3) if self.tasks else 0,
+            'max_latency_ms': round(self.max_latency_s * 1000, 3)
+        }
+
+
+def plan_tasks(xml_files, chunk_size=DEFAULT_CHUNK_SIZE):
+    """One task per byte-range chunk, in file order then offset order"""
+    tasks = []
+    for xml_file in xml_files:
+        for start, end in split_ranges(xml_file, chunk_size):
+            tasks.append((xml_file, start, end))
+    return tasks
+
+
+def process_chunk(task, recover=False):
+    """
+    Worker: parse, clean and categorize one byte range
+
+    Args:
+        task: (xml_file, start, end) from plan_tasks
+        recover: Skip corrupt XML fragments instead of failing the chunk
+
+    Returns:
+        (records, parsed, dead, timings) where records are RECORD_FIELDS
+        tuples without ids, parsed is a count, dead holds dead-letter
+        entries (make_entry) for rejected records and skipped fragments,
+        and timings maps stage name -> seconds
+    """
+    xml_file, start, end = task
+    timings = {'parse': 0.0, 'clean': 0.0, 'categorize': 0.0}
+    records = []
+    dead = []
+
+    def corrupt(offset, reason, fragment):
+        dead.append(make_entry(xml_file, 'parse', reason, offset=offset, fragment=fragment))
+
+    clock = time.perf_counter
+    stage_start = clock()
+    raw_records = list(iter_sms_range(xml_file, start, end, recover=recover, on_error=corrupt))
+    timings['parse'] = clock() - stage_start
+
+    cleaned = []
+    stage_start = clock()
+    for raw in raw_records:
+        try:
+            cleaned.append(clean_record(raw))
+        except (ValueError, TypeError) as e:
+            dead.append(make_entry(xml_file, 'clean', str(e), record=raw))
+    timings['clean'] = clock() - stage_start
+
+    stage_start = clock()
+    for record in cleaned:
+        categorize(record)
+        records.append(tuple(record[field] for field in RECORD_FIELDS))
+    timings['categorize'] = clock() - stage_start
+
+    return records, len(raw_records), dead, timings
+
+
+class JsonSink:
+    """Write transactions as a JSON array in the data/transactions.json layout"""
+
+    def __init__(self, output_file, pretty=False):
+        self.output_file = output_file
+        self.tmp_file = output_file + '.tmp'
+        self.pretty = pretty
+        directory = os.path.dirname(output_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.f = open(self.tmp_file, 'wb')
+        self.f.write(b'[')
+        self.count = 0
+
+    def write(self, transactions):
+        for transaction in transactions:
+            if self.pretty:
+                self.f.write(b',\n' if self.count else b'\n')
+                self.f.write(textwrap.indent(serializer.dumps(transaction, pretty=True), '  ').encode())
+            else:
+                self.f.write(b',' if self.count else b'')
+                self.f.write(serializer.dumpb(transaction))
+            self.count += 1
+
+    def close(self):
+        self.f.write(b'\n]' if self.count and self.pretty else b']')
+        self.f.close()
+        os.replace(self.tmp_file, self.output_file)
+
+    def abort(self):
+        """Discard the partial output; the existing file is left as it was"""
+        self.f.close()
+        if os.path.exists(self.tmp_file):
+            os.remove(self.tmp_file)
+
+
+class SQLiteSink:
+    """
+    Bulk-load transactions into the SQLite database
+
+    The whole run is one transaction, committed by close(): a failed run
+    leaves the database as it was rather than half loaded.
+    """
+
+    def __init__(self, db_path):
+        from etl.load_db import connect, create_schema, load_transactions
+        self._load = load_transactions
+        # Written to from the loader thread
+        self.conn = connect(db_path, check_same_thread=False)
+        create_schema(self.conn)
+        self.conn.execute("BEGIN")
+
+    def write(self, transactions):
+        self._load(self.conn, transactions, commit=False)
+
+    def close(self):
+        self.conn.execute("COMMIT")
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+    def abort(self):
+        """Roll the run back; the database keeps only what it had before"""
+        self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+def run_pipeline(xml_files, sink, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 queue_size=None, start_id=1, recover=False, dead_letter=None):
+    """
+    Run the ETL pipeline over many XML files
+
+    Chunks are processed in a multiprocessing pool with at most queue_size
+    tasks in flight. Results are consumed in task order, so ids are
+    assigned deterministically (file order, then document order) no matter
+    which worker finishes first. A loader thread drains a bounded queue
+    into the sink, overlapping disk writes with parsing.
+
+    Records that fail cleaning, and with recover=True corrupt XML fragments,
+    are written to dead_letter (a DeadLetterQueue in DEAD_LETTER_DIR by
+    default) and the run carries on without them.
+
+    If the run fails, sink.abort() is called instead of sink.close().
+
+    Returns:
+        Metrics dictionary with per-stage throughput and latency
+    """
+    workers = workers or os.cpu_count() or 1
+    queue_size = queue_size or workers * 2
+    owns_dead_letter = dead_letter is None
+    if owns_dead_letter:
+        dead_letter = DeadLetterQueue(name='run')
+
+    stages = {name: StageMetrics(name) for name in ('parse', 'clean', 'categorize', 'load')}
+    load_queue = queue.Queue(maxsize=queue_size)
+    load_errors = []
+
+    def loader():
+        while True:
+            batch = load_queue.get()
+            if batch is None:
+                return
+            stage_start = time.perf_counter()
+            try:
+                sink.write(batch)
+            except Exception as e:
+                load_errors.append(e)
+            stages['load'].add(len(batch), time.perf_counter() - stage_start)
+
+    loader_thread = threading.Thread(target=loader, name='etl-loader')
+    loader_thread.start()
+
+    next_id = start_id
+    wall_start = time.perf_counter()
+    completed = False
+
+    try:
+        tasks = plan_tasks(xml_files, chunk_size)
+        with multiprocessing.Pool(workers) as pool:
+            in_flight = deque()
+            pending = iter(tasks)
+
+            def submit():
+                task = next(pending, None)
+                if task is not None:
+                    in_flight.append(pool.apply_async(process_chunk, (task, recover)))
+
+            for _ in range(queue_size):
+                submit()
+
+            while in_flight:
+                records, parsed, dead, timings = in_flight.popleft().get()
+                submit()
+
+                stages['parse'].add(parsed, timings['parse'])
+                stages['clean'].add(parsed, timings['clean'])
+                stages['categorize'].add(len(records), timings['categorize'])
+                dead_letter.write(dead)
+
+                batch = []
+                for values in records:
+                    transaction = {"id": str(next_id), **dict(zip(RECORD_FIELDS, values))}
+                    if not transaction['reference']:
+                        transaction['reference'] = f"TXN{next_id:06d}"
+                    batch.append(transaction)
+                    next_id += 1
+                load_queue.put(batch)
+        completed = True
+    finally:
+        load_queue.put(None)
+        loader_thread.join()
+        if owns_dead_letter:
+            dead_letter.close()
+        if not completed or load_errors:
+            sink.abort()
+
+    if load_errors:
+        raise load_errors[0]
+    sink.close()
+
+    wall = time.perf_counter() - wall_start
+    loaded = next_id - start_id
+    return {
+        'files': len(xml_files),
+        'tasks': len(tasks),
+        'workers': workers,
+        'records': loaded,
+        'rejected': dead_letter.counts.get('clean', 0),
+        'corrupt': dead_letter.counts.get('parse', 0),
+        'dead_letter': dead_letter.path,
+        'wall_s': round(wall, 4),
+        'records_per_sec': round(loaded / wall, 1) if wall > 0 else 0,
+        'stages': {name: stage.summary() for name, stage in stages.items()}
+    }
+
+
+def live_api_files(output_file):
+    """
+    API files that make output_file unsafe to overwrite
+
+    When output_file is the API's data/transactions.json, the API may have
+    compacted newer data next to it (.snap, .meta.json) and journaled
+    writes since. A renumbered JSON written over it would be taken as
+    newer than the .snap and the old journal replayed onto unrelated rows.
+
+    Returns:
+        Paths of a .snap or .meta.json not older than output_file and of a
+        non-empty journal
+    """
+    stem = os.path.splitext(output_file)[0]
+    try:
+        output_mtime = os.stat(output_file).st_mtime_ns
+    except FileNotFoundError:
+        output_mtime = -1
+
+    live = []
+    for path in (stem + '.snap', stem + '.meta.json'):
+        try:
+            if os.stat(path).st_mtime_ns >= output_mtime:
+                live.append(path)
+        except FileNotFoundError:
+            pass
+    journal = stem + '.journal'
+    if os.path.exists(journal) and os.path.getsize(journal) > 0:
+        live.append(journal)
+    return live
+
+
+def existing_transactions(db_path):
+    """
+    Rows already in db_path, which run_pipeline would renumber over
+
+    Ids start at 1 and are upserted, so loading into a database the API
+    or etl/ingest.py has written to would overwrite those rows.
+    """
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM Transactions").fetchone()[0]
+    except sqlite3.OperationalError:
+        # No Transactions table yet
+        return 0
+    finally:
+        conn.close()
+
+
+def discover_inputs(paths):
+    """Expand CLI paths/directories; default to data/raw/*.xml or the sample"""
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(RAW_DIR, '*.xml'))) or [XML_PATH]
+
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.xml'))))
+        else:
+            files.append(path)
+    return files
+
+
+def print_metrics(metrics):
+    """Print formatted pipeline metrics"""
+    print("="*70)
+    print("ETL PIPELINE METRICS")
+    print("="*70)
+    print(f"Files: {metrics['files']}  Tasks: {metrics['tasks']}  Workers: {metrics['workers']}")
+    print(f"Records: {metrics['records']}  Rejected: {metrics['rejected']}  "
+          f"Corrupt fragments: {metrics['corrupt']}")
+    if metrics['dead_letter']:
+        print(f"Dead letters: {metrics['dead_letter']}")
+    print(f"Wall time: {metrics['wall_s']:.2f}s ({metrics['records_per_sec']:.0f} records/sec)\n")
+    print(f"{'Stage':<12}{'Records':>10}{'Busy s':>10}{'Rec/s':>12}{'Avg ms':>10}{'Max ms':>10}")
+    for name, stage in metrics['stages'].items():
+        print(f"{name:<12}{stage['records']:>10}{stage['busy_s']:>10.3f}"
+              f"{stage['records_per_sec']:>12.0f}{stage['avg_latency_ms']:>10.2f}"
+              f"{stage['max_latency_ms']:>10.2f}")
+    print("="*70)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parallel MoMo SMS ETL')
+    parser.add_argument('inputs', nargs='*', help='XML files or directories (default: data/raw)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_SIZE / (1024 * 1024),
+                        help='Byte-range size per worker task')
+    parser.add_argument('--sink', choices=('json', 'sqlite'), default='json')
+    parser.add_argument('--pretty', action='store_true', help='Indent JSON sink output')
+    parser.add_argument('--recover', action='store_true',
+                        help='Skip corrupt XML fragments (dead-lettered) instead of aborting')
+    parser.add_argument('--output', default=None,
+                        help=f'Output file (default: {ETL_OUTPUT_JSON} or {DB_PATH})')
+    args = parser.parse_args()
+
+    xml_files = discover_inputs(args.inputs)
+    if args.sink == 'sqlite':
+        output = args.output or DB_PATH
+        if count := existing_transactions(output):
+            parser.error(f"{output} already holds {count} transactions; use "
+                         "etl/ingest.py --sink sqlite to add records, or move it "
+                         "aside to rebuild from scratch")
+        sink = SQLiteSink(output)
+    else:
+        output = args.output or ETL_OUTPUT_JSON
+        if live := live_api_files(output):
+            parser.error(f"{output} has newer API data in {', '.join(live)}; "
+                         "use etl/ingest.py to add records, or stop the server and "
+                         "move those files aside to rebuild from scratch")
+        sink = JsonSink(output, pretty=args.pretty)
+
+    try:
+        metrics = run_pipeline(xml_files, sink, workers=args.workers,
+                               chunk_size=int(args.chunk_mb * 1024 * 1024), recover=args.recover)
+    except sqlite3.IntegrityError as e:
+        parser.error(f"Load failed, {output} left unchanged: {e}")
+    print_metrics(metrics)
@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+# Run the parallel ETL over data/raw/*.xml (or the given files/directories)
+set -euo pipefail
+cd "$(dirname "$0")/.."
+python3 etl/run.py "$@"
@@ -0,0 +1,77 @@
+import base64
+
+import pytest
+
+import api.auth
+import api.server
+from api.auth import BasicAuth, hash_password, parse_credentials
+
+
+def basic(username, password):
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+
+@pytest.fixture
+def verified(monkeypatch):
+    """Count the slow password checks BasicAuth actually makes"""
+    calls = []
+    real = api.auth.verify_password
+    monkeypatch.setattr(api.auth, "verify_password",
+                        lambda password, hashed: calls.append(password) or real(password, hashed))
+    return calls
+
+
+def make_auth(**options):
+    return BasicAuth({"admin": hash_password("secret", iterations=1000),
+                      "teller": hash_password("till", iterations=1000)}, **options)
+
+
+def test_cache_hit_skips_the_hash(verified):
+    auth = make_auth()
+    assert auth.check(basic("admin", "secret")) == "admin"
+    assert auth.check(basic("admin", "secret")) == "admin"
+    assert verified == ["secret"]
+
+
+def test_failures_are_never_cached(verified):
+    auth = make_auth()
+    for _ in range(2):
+        assert auth.check(basic("admin", "wrong")) is None
+        assert auth.check(basic("nobody", "secret")) is None
+    assert auth.check("Bearer abc") is None and auth.check("Basic !!!") is None
+    assert auth.check(None) is None
+    assert len(verified) == 4 and not auth._verified
+
+
+def test_cache_is_bounded_lru(verified):
+    auth = make_auth(max_entries=1)
+    auth.check(basic("admin", "secret"))
+    auth.check(basic("teller", "till"))
+    auth.check(basic("admin", "secret"))
+    assert verified == ["secret", "till", "secret"] and len(auth._verified) == 1
+
+    auth = make_auth(max_entries=0)
+    auth.check(basic("admin", "secret"))
+    auth.check(basic("admin", "secret"))
+    assert len(verified) == 5
+
+
+def test_set_password_forgets_cached_headers(verified):
+    auth = make_auth()
+    assert auth.check(basic("admin", "secret")) == "admin"
+    auth.set_password("admin", hash_password("rotated", iterations=1000))
+    assert auth.check(basic("admin", "secret")) is None
+    assert auth.check(basic("admin", "rotated")) == "admin"
+
+
+def test_parse_credentials():
+    assert parse_credentials("admin:h1, teller:h2") == {"admin": "h1", "teller": "h2"}
+    for text in ("admin", ":hash", "admin:"):
+        with pytest.raises(ValueError):
+            parse_credentials(text)
+
+
+def test_banner_shows_the_password_only_for_the_default(monkeypatch):
+    assert "secure123" in api.server.describe_credentials()
+    monkeypatch.setattr(api.server, "CREDENTIALS", {"ops": hash_password("x", iterations=1000)})
+    assert api.server.describe_credentials() == "ops (from MOMO_API_CREDENTIALS)"
@@ -0,0 +1,69 @@
+from email.utils import formatdate
+
+from api.cache import ResponseCache
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_write_in_same_second_is_not_hidden_by_if_modified_since(monkeypatch):
+    clock = Clock(1000.2)
+    monkeypatch.setattr("api.cache.time.time", clock)
+    cache = ResponseCache()
+    cache.invalidate()
+
+    # Built in the second of the write: no date to revalidate against
+    clock.now = 1000.4
+    entry = cache.put("/transactions/1", cache.version, b'{"amount": 1}')
+    assert entry.last_modified is None
+    assert not entry.matches(if_modified_since=formatdate(1000, usegmt=True))
+
+    clock.now = 1001.5
+    cache.invalidate()
+    clock.now = 2000.0
+    entry = cache.put("/transactions/1", cache.version, b'{"amount": 1}')
+    assert entry.last_modified == formatdate(1002, usegmt=True)
+    assert entry.matches(if_modified_since=entry.last_modified)
+
+    # Another write within the same second as the client's date
+    clock.now = 2000.3
+    cache.invalidate()
+    clock.now = 2001.5
+    changed = cache.put("/transactions/1", cache.version, b'{"amount": 2}')
+    assert not changed.matches(if_modified_since=entry.last_modified)
+
+
+def test_etag_survives_unrelated_writes_only():
+    cache = ResponseCache()
+    first = cache.put("/transactions/1", cache.version, b'{"amount": 1}')
+    assert cache.get("/transactions/1") is first
+    assert first.matches(if_none_match=first.etag)
+
+    cache.invalidate()
+    assert cache.get("/transactions/1") is None
+    same = cache.put("/transactions/1", cache.version, b'{"amount": 1}')
+    changed = cache.put("/transactions/1", cache.version, b'{"amount": 2}')
+    assert same.matches(if_none_match=first.etag)
+    assert not changed.matches(if_none_match=first.etag)
+    # If-None-Match wins over a matching date
+    assert not changed.matches(first.etag.replace("W/", ""), changed.last_modified)
+
+
+def test_stale_version_is_not_stored():
+    cache = ResponseCache()
+    version = cache.version
+    cache.invalidate()
+    cache.put("/analytics", version, b"{}")
+    assert len(cache) == 0
+
+
+def test_startup_date_follows_the_data():
+    cache = ResponseCache()
+    cache.invalidate(modified=1_700_000_000.5)
+    entry = cache.put("/analytics", cache.version, b"{}")
+    assert entry.last_modified == formatdate(1_700_000_001, usegmt=True)
@@ -0,0 +1,22 @@
+from etl.categorize import categorize, categorize_type
+
+
+def test_known_types_pass_through():
+    for name in ("SEND", "RECEIVE", "DEPOSIT", "WITHDRAW", "PAYMENT"):
+        assert categorize_type(name) == name
+
+
+def test_aliases_and_case():
+    assert categorize_type("transfer") == "SEND"
+    assert categorize_type("Withdrawal") == "WITHDRAW"
+
+
+def test_body_keywords_when_type_missing():
+    assert categorize_type("", "You have received 2000 RWF from Jane") == "RECEIVE"
+    assert categorize_type(None, "Your payment of 1,500 RWF to SHOP") == "PAYMENT"
+    assert categorize_type("", "Hello") == "UNKNOWN"
+
+
+def test_categorize_drops_body():
+    record = categorize({"type": "", "body": "Bank deposit of 5000"})
+    assert record == {"type": "DEPOSIT"}
@@ -0,0 +1,39 @@
+import pytest
+
+from etl.clean_normalize import (clean_record, normalize_amount, normalize_phone,
+                                 normalize_timestamp)
+
+
+def test_normalize_phone():
+    assert normalize_phone(" 079-123 4567 ") == "0791234567"
+    assert normalize_phone("+250 788 000 111") == "+250788000111"
+    assert normalize_phone("bank") == "BANK"
+    assert normalize_phone(None) == ""
+
+
+def test_normalize_amount():
+    assert normalize_amount("5,000") == 5000.0
+    assert normalize_amount("1500.50 RWF") == 1500.5
+    with pytest.raises(ValueError):
+        normalize_amount("")
+    with pytest.raises(ValueError):
+        normalize_amount("-10")
+    with pytest.raises(ValueError):
+        normalize_amount("abc")
+
+
+def test_normalize_timestamp():
+    assert normalize_timestamp("2024-01-15T10:30:00") == "2024-01-15T10:30:00"
+    assert normalize_timestamp("2024-01-15 10:30:00.250") == "2024-01-15T10:30:00"
+    assert normalize_timestamp("1705314600") == "2024-01-15T10:30:00"
+    assert normalize_timestamp("1705314600000") == "2024-01-15T10:30:00"
+    with pytest.raises(ValueError):
+        normalize_timestamp("yesterday")
+
+
+def test_clean_record_defaults():
+    record = clean_record({"type": " send ", "amount": "100", "sender": "A",
+                           "receiver": "B", "timestamp": "2024-01-15T10:30:00"})
+    assert record["type"] == "SEND"
+    assert record["status"] == "completed"
+    assert record["reference"] == ""
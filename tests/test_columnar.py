@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from api.store import TransactionStore
+from dsa.columnar import MISSING_TIMESTAMP, ColumnarTransactions, dict_group_by, to_epoch
+
+
+def make(tid, type="SEND", amount=100.0, timestamp="2024-01-15T10:00:00", **fields):
+    return {"id": str(tid), "type": type, "amount": amount, "sender": "0788000001",
+            "receiver": "0788000002", "timestamp": timestamp, "status": "completed",
+            "reference": f"TXN{tid:06d}", **fields}
+
+
+ROWS = [make(1, amount=10.0, timestamp="2024-01-15T10:05:00"),
+        make(2, type="DEPOSIT", amount=20.0, timestamp="2024-01-15T10:55:00"),
+        make(3, amount=30.0, timestamp="2024-01-15T11:00:00+02:00", status="failed"),
+        make(4, type="PAYMENT", amount=40.0, timestamp="2024-01-16", sender="0799000000"),
+        make(5, amount=50.0, timestamp="not a date")]
+
+
+def test_to_epoch():
+    assert to_epoch("1970-01-02") == 86400
+    assert to_epoch("1970-01-01T02:00:00+02:00") == 0
+    assert to_epoch(None) == to_epoch("15/01/2024") == MISSING_TIMESTAMP
+
+
+def test_group_by_matches_the_dict_path():
+    columns = ColumnarTransactions.from_records(ROWS)
+    assert len(columns) == 5
+    assert columns.group_by("type") == dict_group_by(ROWS, "type")
+    mask = columns.mask(min_amount=25)
+    assert columns.group_by("type", mask) == dict_group_by(ROWS, "type", min_amount=25)
+
+
+def test_mask_filters():
+    columns = ColumnarTransactions.from_records(ROWS)
+    assert columns.total() == {"count": 5, "amount": 150.0}
+    assert columns.total(columns.mask(type="SEND", status="completed")) == {"count": 2, "amount": 60.0}
+    assert columns.total(columns.mask(min_amount=20, max_amount=40))["count"] == 3
+    assert columns.total(columns.mask(type="WITHDRAW"))["count"] == 0
+    # The unparseable timestamp falls outside every time range
+    assert columns.total(columns.mask(until="2024-01-16"))["amount"] == 60.0
+    assert columns.total(columns.mask(since="2024-01-15T09:00:00"))["count"] == 4
+
+
+def test_volume_by_period_in_utc():
+    columns = ColumnarTransactions.from_records(ROWS)
+    assert columns.volume_by_period("hour") == {
+        "2024-01-15T09": {"count": 1, "amount": 30.0},
+        "2024-01-15T10": {"count": 2, "amount": 30.0},
+        "2024-01-16T00": {"count": 1, "amount": 40.0}}
+    assert columns.volume_by_period("day", columns.mask(type="SEND")) == {
+        "2024-01-15": {"count": 2, "amount": 40.0}}
+
+
+def test_from_store_reads_records():
+    columns = ColumnarTransactions.from_store(TransactionStore(ROWS))
+    assert columns.ids.tolist() == [1, 2, 3, 4, 5]
+    assert columns.dictionaries["sender"] == ["0788000001", "0799000000"]
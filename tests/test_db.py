@@ -0,0 +1,96 @@
+import pytest
+
+from api.db import ConnectionPool, SQLiteTransactionStore
+from etl.load_db import connect, create_schema, load_transactions
+
+
+def make(tid, **fields):
+    return {"id": str(tid), "type": "SEND", "amount": 100.0, "sender": "0788000001",
+            "receiver": "0788000002", "timestamp": f"2024-01-{tid:02d}T10:00:00",
+            "status": "completed", "reference": f"TXN{tid:06d}", **fields}
+
+
+@pytest.fixture
+def store(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "momo.db"), size=2)
+    store = SQLiteTransactionStore(pool)
+    store.load([make(n) for n in range(1, 6)])
+    yield store
+    pool.close()
+
+
+def test_create_update_delete(store):
+    created = store.add(make(store.allocate_id(), sender="0799000000"))
+    assert created.id == 6 and store.get(6)["sender"] == "0799000000"
+
+    updated = store.update(6, {"amount": 42.5, "status": "reversed"})
+    assert (updated["amount"], store.get(6)["status"]) == (42.5, "reversed")
+    assert store.update(99, {"amount": 1.0}) is None
+
+    assert store.delete(6)["id"] == "6" and store.get(6) is None
+    assert store.delete(6) is None and len(store) == 5
+
+
+def test_constraints_become_value_errors(store):
+    for fields, message in (({"reference": "TXN000001"}, "Reference already exists"),
+                            ({"status": "refunded"}, "Invalid status")):
+        with pytest.raises(ValueError, match=message):
+            store.add(make(6, **fields))
+        with pytest.raises(ValueError, match=message):
+            store.update(2, fields)
+    assert store.get(6) is None and store.get(2)["status"] == "completed"
+
+
+def test_create_never_overwrites_rows_written_by_another_process(store):
+    # etl/ingest.py --sink sqlite appending while the API holds its counter
+    conn = connect(store.pool.db_path)
+    load_transactions(conn, [make(6, reference="NEW000001")])
+    conn.close()
+
+    tid = store.allocate_id()
+    assert tid == 7
+    with pytest.raises(ValueError, match="Transaction id already exists"):
+        store.add(make(6))
+    assert store.get(6)["reference"] == "NEW000001"
+
+
+def test_query_filters_prefixes_ranges_and_cursor(store):
+    store.update(2, {"sender": "0799000000"})
+    store.update(4, {"sender": "0799123456", "amount": 500.0})
+
+    page, cursor = store.query(prefixes={"sender": "0799"})
+    assert [t["id"] for t in page] == ["2", "4"] and cursor is None
+    page, _ = store.query(prefixes={"sender": "0799"}, min_amount=200)
+    assert [t["id"] for t in page] == ["4"]
+    page, _ = store.query(since="2024-01-02", until="2024-01-04")
+    assert [t["id"] for t in page] == ["2", "3"]
+    page, cursor = store.query(filters={"sender": "0788000001"}, limit=2)
+    assert [t["id"] for t in page] == ["1", "3"] and cursor == "3"
+    page, cursor = store.query(filters={"sender": "0788000001"}, after=cursor, limit=2)
+    assert [t["id"] for t in page] == ["5"] and cursor is None
+
+
+def test_batch_rolls_back_failed_rows_or_everything(store):
+    with store.batch():
+        store.add(make(6))
+        with pytest.raises(ValueError):
+            store.add(make(7, reference="TXN000001"))
+        store.delete(1)
+    assert store.get(6) is not None and store.get(7) is None and store.get(1) is None
+
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.add(make(8))
+            raise RuntimeError("request failed")
+    assert store.get(8) is None and len(store) == 5
+
+
+def test_bulk_load_upserts_by_id(tmp_path):
+    conn = connect(str(tmp_path / "momo.db"))
+    create_schema(conn)
+    assert load_transactions(conn, [make(n) for n in range(1, 4)], batch_size=2) == 3
+    assert load_transactions(conn, [make(2, amount=7.0)]) == 1
+
+    rows = conn.execute("SELECT id, amount FROM vw_transactions ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(1, 100.0), (2, 7.0), (3, 100.0)]
@@ -0,0 +1,89 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from api.encoding import ChunkedWriter, accepts_gzip, dumpb, iter_json_items, iter_json_list
+
+
+def items_of(body, chunk_size):
+    return list(iter_json_items(io.BytesIO(body), len(body), chunk_size=chunk_size))
+
+
+def unchunk(data):
+    """Body of a chunked transfer, checking each chunk's size line"""
+    body = b""
+    while True:
+        size_line, _, data = data.partition(b"\r\n")
+        size = int(size_line, 16)
+        if size == 0:
+            assert data == b"\r\n"
+            return body
+        body += data[:size]
+        assert data[size:size + 2] == b"\r\n"
+        data = data[size + 2:]
+
+
+@pytest.mark.parametrize("pretty", [False, True])
+@pytest.mark.parametrize("count", [0, 1, 5, 7])
+def test_list_encoding_matches_whole_document(pretty, count):
+    items = [{"id": str(n), "amount": n * 1.5, "sender": "Zoë"} for n in range(count)]
+    envelope = {"count": count, "next_cursor": None}
+    body = b"".join(iter_json_list(envelope, "transactions", items, pretty=pretty, batch_size=2))
+    assert json.loads(body) == {**envelope, "transactions": items}
+    if not pretty:
+        assert body == dumpb({**envelope, "transactions": items})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 65536])
+def test_array_items_survive_any_chunking(chunk_size):
+    items = [{"amount": 1234.5, "sender": "Zoë €"}, 12, -0.25, "a,]b", [1, [2]], None, True]
+    body = b"  \n" + json.dumps(items, ensure_ascii=False).encode()
+    assert items_of(body, chunk_size) == [(item, None) for item in items]
+    assert items_of(b"[ ]", chunk_size) == []
+
+
+@pytest.mark.parametrize("chunk_size", [1, 65536])
+@pytest.mark.parametrize("body", [b"[1, 2", b"[1 2]", b"[1,]", b"[{]", b"[1] x"])
+def test_malformed_array_raises(body, chunk_size):
+    with pytest.raises(ValueError):
+        items_of(body, chunk_size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 65536])
+def test_ndjson_lines_fail_independently(chunk_size):
+    body = b'{"a": 1}\n\n{bad\r\n"\xc3\xa9"\n{"b": 2}'
+    assert items_of(body, chunk_size) == [({"a": 1}, None), (None, "Invalid JSON"),
+                                          ("é", None), ({"b": 2}, None)]
+
+
+def test_only_length_bytes_are_read():
+    rfile = io.BytesIO(b'[1, 2]GET / HTTP/1.1\r\n')
+    assert list(iter_json_items(rfile, 6, chunk_size=4)) == [(1, None), (2, None)]
+    assert rfile.read() == b"GET / HTTP/1.1\r\n"
+
+
+@pytest.mark.parametrize("chunked", [True, False])
+@pytest.mark.parametrize("compress", [True, False])
+def test_chunked_writer_framing(chunked, compress):
+    out = io.BytesIO()
+    writer = ChunkedWriter(out, chunked=chunked, gzip=compress, buffer_size=16)
+    fragments = [b"x" * 10, "héllo", b"", b"y" * 40]
+    for fragment in fragments:
+        writer.write(fragment)
+    writer.close()
+
+    data = out.getvalue()
+    body = unchunk(data) if chunked else data
+    assert writer.bytes_written == len(body)
+    if compress:
+        body = gzip.decompress(body)
+    assert body == b"x" * 10 + "héllo".encode() + b"y" * 40
+
+
+def test_accepts_gzip():
+    for header in ("gzip", "deflate, gzip;q=0.5", "*", "GZIP"):
+        assert accepts_gzip(header)
+    for header in (None, "", "deflate", "gzip;q=0", "gzip; q=0.000", "identity"):
+        assert not accepts_gzip(header)
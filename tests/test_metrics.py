@@ -0,0 +1,77 @@
+import io
+import random
+import re
+
+from api.metrics import BUCKETS, CountingWriter, Histogram, Metrics, SlowRequestProfiler
+
+
+def test_quantiles_within_20_percent_of_exact():
+    rng = random.Random(7)
+    samples = sorted(rng.lognormvariate(-5, 1) for _ in range(5000))
+    histogram = Histogram()
+    for seconds in samples:
+        histogram.observe(seconds)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = samples[int(q * len(samples)) - 1]
+        assert abs(histogram.quantile(q) - exact) / exact < 0.2
+    assert histogram.count == 5000 and abs(histogram.sum - sum(samples)) < 1e-9
+
+
+def test_quantile_edges():
+    histogram = Histogram()
+    assert histogram.quantile(0.5) == 0.0
+    histogram.observe(BUCKETS[-1] * 10)
+    assert histogram.quantile(0.99) == BUCKETS[-1]
+    # An observation exactly on a bound falls in that bound's bucket
+    histogram.observe(BUCKETS[3])
+    assert histogram.cumulative()[3] == (BUCKETS[3], 1)
+    assert histogram.cumulative()[-1] == (float("inf"), 2)
+
+
+def test_render_prometheus_text():
+    metrics = Metrics()
+    metrics.observe_request("GET", "/transactions/{id}", 200, 0.002, response_bytes=300)
+    metrics.observe_request("GET", "/transactions/{id}", 404, 0.001, response_bytes=40)
+    metrics.observe_request("POST", "/transactions", 201, 0.05, request_bytes=90)
+    with metrics.time("store"):
+        pass
+    text = metrics.render(extra=[("momo_store_transactions", "gauge", "Rows", 25)])
+
+    assert text.endswith("\n")
+    assert 'momo_http_requests_total{method="GET",endpoint="/transactions/{id}",status="404"} 1' in text
+    assert 'momo_http_response_bytes_total{method="GET",endpoint="/transactions/{id}"} 340' in text
+    assert 'momo_http_request_bytes_total{method="POST",endpoint="/transactions"} 90' in text
+    assert 'momo_http_phase_duration_seconds_count{phase="store"} 1' in text
+    assert "# TYPE momo_store_transactions gauge\nmomo_store_transactions 25" in text
+
+    # One HELP/TYPE pair per family, and every sample line is name{labels} value
+    types = re.findall(r"^# TYPE (\S+) ", text, re.M)
+    assert len(types) == len(set(types))
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            assert re.fullmatch(r'[a-z_]+(\{(\w+="[^"]*",?)+\})? [0-9.e+-]+', line), line
+
+    buckets = [int(n) for n in re.findall(
+        r'^momo_http_request_duration_seconds_bucket\{method="GET",.*\} (\d+)$', text, re.M)]
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+
+
+def test_profiler_dumps_only_slow_sampled_requests(tmp_path):
+    assert SlowRequestProfiler().begin() is None
+
+    profiler = SlowRequestProfiler(sample_rate=1.0, threshold_ms=50,
+                                   directory=str(tmp_path), max_dumps=1)
+    assert profiler.end(profiler.begin(), 0.01, "GET /fast") is None
+    path = profiler.end(profiler.begin(), 0.2, "GET /transactions/{id}")
+    assert path.endswith("_1_GET_transactions_id_200ms.prof")
+    assert profiler.begin() is None and len(list(tmp_path.iterdir())) == 1
+
+
+def test_counting_writer():
+    out = io.BytesIO()
+    writer = CountingWriter(out)
+    writer.write(b"abc")
+    writer.write(b"de")
+    writer.flush()
+    assert writer.bytes_written == 5 and writer.getvalue() == b"abcde"
@@ -0,0 +1,114 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from etl.dead_letter import DeadLetterQueue
+from etl.parse_xml import (iter_sms, iter_sms_range, next_record_offset, records_end_offset,
+                           split_ranges)
+
+SAMPLE = """<?xml version="1.0" encoding="UTF-8"?>
+<sms_records>
+    <sms type="SEND" amount="5000" sender="0791234567" receiver="0797654321"
+         timestamp="2024-01-15T10:30:00" status="completed" reference="TXN000001"/>
+    <sms type="RECEIVE" amount="3500" sender="0797654321" receiver="0791234567"
+         timestamp="2024-01-15T11:45:00" status="completed" reference="TXN000002"/>
+    <sms type="PAYMENT" amount="1500" sender="0791234567" receiver="SHOP"
+         timestamp="2024-01-16T16:30:00" status="completed" reference="TXN000003"/>
+</sms_records>
+"""
+
+
+def write_sample(tmp_path, repeat=1):
+    path = tmp_path / "sms.xml"
+    body = SAMPLE.split("<sms_records>\n")[1].split("</sms_records>")[0]
+    path.write_text(SAMPLE.replace(body, body * repeat))
+    return str(path)
+
+
+def test_iter_sms_yields_attributes(tmp_path):
+    records = list(iter_sms(write_sample(tmp_path)))
+    assert [r["reference"] for r in records] == ["TXN000001", "TXN000002", "TXN000003"]
+    assert records[0]["amount"] == "5000"
+
+
+def test_split_ranges_cover_every_record_once(tmp_path):
+    path = write_sample(tmp_path, repeat=50)
+    expected = list(iter_sms(path))
+
+    for chunk_size in (1, 200, 1000, 10 ** 6):
+        ranges = split_ranges(path, chunk_size)
+        records = [r for start, end in ranges for r in iter_sms_range(path, start, end)]
+        assert records == expected
+
+
+def test_split_ranges_skip_header_and_footer(tmp_path):
+    path = write_sample(tmp_path)
+    (start, _), = split_ranges(path, 10 ** 6)
+    with open(path, "rb") as f:
+        f.seek(start)
+        assert f.read(5) == b"<sms "
+
+
+def test_resume_from_records_end_reads_only_appended(tmp_path):
+    path = write_sample(tmp_path)
+    end = records_end_offset(path)
+    with open(path, "rb") as f:
+        f.seek(end)
+        assert f.read().strip() == b"</sms_records>"
+
+    # Simulate the exporter appending one more record
+    with open(path) as f:
+        text = f.read()
+    extra = '    <sms type="SEND" amount="10" sender="A" receiver="B" reference="NEW"/>\n'
+    with open(path, "w") as f:
+        f.write(text.replace("</sms_records>", extra + "</sms_records>"))
+
+    with open(path, "rb") as f:
+        start = next_record_offset(f, end, records_end_offset(path))
+    records = list(iter_sms_range(path, start, records_end_offset(path)))
+    assert [r["reference"] for r in records] == ["NEW"]
+
+
+def test_recover_skips_corrupt_fragments(tmp_path, monkeypatch):
+    path = write_sample(tmp_path, repeat=20)
+    with open(path) as f:
+        text = f.read()
+    # An unterminated attribute and a stray entity, 20 records apart
+    text = text.replace('reference="TXN000002"/>', 'reference="TXN000002>', 1)
+    text = text.replace('amount="1500" sender', 'amount="1500" &bad; sender', 2)
+    with open(path, "w") as f:
+        f.write(text)
+
+    (start, end), = split_ranges(path, 10 ** 6)
+    with pytest.raises(ET.ParseError):
+        list(iter_sms_range(path, start, end))
+
+    # Small reads put corrupt fragments on block boundaries too
+    monkeypatch.setattr("etl.parse_xml.READ_SIZE", 64)
+    errors = []
+    records = list(iter_sms_range(path, start, end, recover=True,
+                                  on_error=lambda *error: errors.append(error)))
+    assert len(records) == 60 - 3
+    with open(path, "rb") as f:
+        for offset, reason, fragment in errors:
+            f.seek(offset)
+            assert f.read(len(fragment)) == fragment
+            assert reason.startswith("XML parse error")
+
+
+def test_dead_letter_queue_writes_jsonl_lazily(tmp_path):
+    queue = DeadLetterQueue(str(tmp_path / "dead"), name="test")
+    queue.close()
+    assert queue.path is None and not (tmp_path / "dead").exists()
+
+    queue.add("sms.xml", "clean", "missing amount", record={"type": "SEND"})
+    queue.add("sms.xml", "parse", "XML parse error", offset=42, fragment=b"<sms type=")
+    queue.close()
+
+    with open(queue.path) as f:
+        entries = [json.loads(line) for line in f]
+    assert [e["stage"] for e in entries] == ["clean", "parse"]
+    assert entries[0]["record"] == {"type": "SEND"}
+    assert entries[1]["offset"] == 42 and entries[1]["fragment"] == "<sms type="
+    assert queue.counts == {"clean": 1, "parse": 1} and len(queue) == 2
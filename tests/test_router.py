@@ -0,0 +1,35 @@
+from api.router import Router
+
+
+def make_router():
+    router = Router()
+    router.add("/transactions", GET="list", POST="create")
+    router.add("/transactions/bulk", POST="bulk_create", DELETE="bulk_delete")
+    router.add("/transactions/{id}", GET="get", PUT="update", DELETE="delete")
+    router.add("/users/{phone:str}/summary", GET="summary")
+    return router
+
+
+def test_static_paths_win_over_templates():
+    router = make_router()
+    route, params = router.match("/transactions/bulk")
+    assert route.handlers["POST"] == "bulk_create" and params == {}
+
+    route, params = router.match("/transactions/42")
+    assert route.template == "/transactions/{id}" and params == {"id": "42"}
+    route, params = router.match("/users/+250788000001/summary")
+    assert params == {"phone": "+250788000001"}
+
+
+def test_templates_match_the_whole_path():
+    router = make_router()
+    for path in ("/transactions/12abc", "/transactions/12/extra", "/transactions/",
+                 "/users//summary", "/users/a/b/summary", "/transactions/bulk/"):
+        assert router.match(path) == (None, None)
+
+
+def test_allowed_lists_registered_methods():
+    router = make_router()
+    route, _ = router.match("/transactions/7")
+    assert route.allowed == "DELETE, GET, PUT"
+    assert "PATCH" not in route.handlers
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+
+import pytest
+
+from dsa.xml_parser import parse_xml_to_json, stream_xml_to_json
+from etl.run import JsonSink, SQLiteSink, existing_transactions, live_api_files, run_pipeline
+
+
+def test_live_api_files_guard_the_api_snapshot(tmp_path):
+    output = str(tmp_path / "transactions.json")
+    assert live_api_files(output) == []
+
+    (tmp_path / "transactions.json").write_text("[]")
+    (tmp_path / "transactions.journal").write_text("")
+    assert live_api_files(output) == []
+
+    (tmp_path / "transactions.journal").write_text('{"op": "delete", "id": "1"}\n')
+    (tmp_path / "transactions.snap").write_bytes(b"")
+    assert live_api_files(output) == [str(tmp_path / "transactions.snap"),
+                                      str(tmp_path / "transactions.journal")]
+
+
+def test_failed_run_leaves_no_partial_output(tmp_path):
+    output = tmp_path / "out.json"
+    output.write_text("[]")
+    sink = JsonSink(str(output))
+
+    with pytest.raises(FileNotFoundError):
+        run_pipeline([str(tmp_path / "missing.xml")], sink, workers=1,
+                     dead_letter=_NoDeadLetters())
+    assert os.listdir(tmp_path) == ["out.json"] and output.read_text() == "[]"
+
+
+class _NoDeadLetters:
+    counts = {}
+    path = None
+
+    def write(self, entries):
+        pass
+
+
+def test_sqlite_sink_loads_all_or_nothing(tmp_path):
+    db_path = str(tmp_path / "momo.db")
+    assert existing_transactions(db_path) == 0
+
+    sink = SQLiteSink(db_path)
+    sink.write([make(1), make(2)])
+    sink.abort()
+    assert existing_transactions(db_path) == 0
+
+    sink = SQLiteSink(db_path)
+    sink.write([make(1), make(2)])
+    with pytest.raises(sqlite3.IntegrityError):
+        sink.write([make(3, reference="TXN000001")])
+    sink.abort()
+    assert existing_transactions(db_path) == 0
+
+    sink = SQLiteSink(db_path)
+    sink.write([make(1)])
+    sink.close()
+    assert existing_transactions(db_path) == 1
+
+
+def make(tid, **fields):
+    return {"id": str(tid), "type": "SEND", "amount": 100.0, "sender": "0788000001",
+            "receiver": "0788000002", "timestamp": "2024-01-15T10:00:00",
+            "status": "completed", "reference": f"TXN{tid:06d}", **fields}
+
+
+def test_xml_parser_refuses_to_overwrite_live_api_data(tmp_path, capsys):
+    output = tmp_path / "transactions.json"
+    output.write_text("[]")
+    (tmp_path / "transactions.journal").write_text('{"op": "delete", "id": "1"}\n')
+
+    assert parse_xml_to_json("missing.xml", str(output)) == []
+    assert stream_xml_to_json("missing.xml", str(output)) is None
+    assert "etl/ingest.py" in capsys.readouterr().out
+    assert output.read_text() == "[]" and not os.path.exists(str(output) + ".tmp")
@@ -0,0 +1,30 @@
+import pytest
+
+from dsa import serializer
+from dsa.record import Transaction
+
+INSTALLED = [name for name, (_, module) in serializer.BACKENDS.items() if module is not None]
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_backends_round_trip_transactions(name):
+    backend = serializer.get_backend(name)
+    row = {"id": "1", "type": "SEND", "amount": 12.5, "sender": "a", "receiver": "b",
+           "timestamp": "2024-01-15T10:00:00", "status": "completed", "reference": "TXN1"}
+    document = {"count": 1, "next_cursor": None, "transactions": [Transaction.from_dict(row)]}
+
+    for pretty in (False, True):
+        assert backend.loads(backend.dumpb(document, pretty=pretty)) == {
+            **document, "transactions": [row]}
+
+
+@pytest.mark.parametrize("name", INSTALLED)
+def test_backends_refuse_non_finite_floats(name):
+    backend = serializer.get_backend(name)
+    row = {"id": "1", "type": "SEND", "amount": 1.0, "sender": "a", "receiver": "b",
+           "timestamp": "2024-01-15", "status": "completed", "reference": "TXN1"}
+    for value in (float("inf"), float("-inf"), float("nan")):
+        for document in ({"amount": value, "next": None}, [None, [value]],
+                         {"op": "put", "transaction": Transaction.from_dict({**row, "amount": value})}):
+            with pytest.raises(ValueError):
+                backend.dumpb(document)
@@ -0,0 +1,259 @@
+import base64
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+
+import pytest
+
+from api.analytics import AnalyticsEngine
+from api.auth import BasicAuth, hash_password
+from api.cache import ResponseCache
+from api.journal import Journal
+from api.rollups import RollupEngine
+from api.server import PooledHTTPServer, TransactionAPI
+from api.store import TransactionStore
+from dsa import serializer
+
+AUTH = "Basic " + base64.b64encode(b"admin:secret").decode()
+
+
+def make(tid):
+    return {"id": str(tid), "type": "SEND", "amount": 100.0, "sender": "0788000001",
+            "receiver": "0788000002", "timestamp": f"2024-01-{tid:02d}T10:00:00",
+            "status": "completed", "reference": f"TXN{tid:06d}"}
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """A live API on a free port, backed by a fresh store and a temporary journal"""
+    store = TransactionStore([make(n) for n in range(1, 6)])
+    analytics = AnalyticsEngine()
+    rollups = RollupEngine()
+    store.subscribe(analytics)
+    store.subscribe(rollups)
+    monkeypatch.setattr(TransactionAPI, "store", store)
+    monkeypatch.setattr(TransactionAPI, "analytics", analytics)
+    monkeypatch.setattr(TransactionAPI, "rollups", rollups)
+    monkeypatch.setattr(TransactionAPI, "journal", Journal(
+        snapshot_path=str(tmp_path / "transactions.json"),
+        journal_path=str(tmp_path / "transactions.journal"),
+        fsync="never", compact_every=0))
+    monkeypatch.setattr(TransactionAPI, "cache", ResponseCache(64, 1 << 20))
+    monkeypatch.setattr(TransactionAPI, "auth",
+                        BasicAuth({"admin": hash_password("secret", iterations=1000)}))
+    monkeypatch.setattr(TransactionAPI, "timeout", 2)
+
+    httpd = PooledHTTPServer(("127.0.0.1", 0), TransactionAPI, workers=2)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def request(method, path, body=None, headers=None):
+    """Raw HTTP/1.1 request bytes with credentials and Content-Length"""
+    body = body if isinstance(body, bytes) else (json.dumps(body).encode() if body is not None else b"")
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Authorization: {AUTH}",
+             f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def exchange(address, *requests):
+    """Send requests on one keep-alive connection; everything read until it closes"""
+    with socket.create_connection(address, timeout=5) as sock:
+        sock.sendall(b"".join(requests))
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    return data
+
+
+def statuses(data):
+    return [int(status) for status in re.findall(rb"HTTP/1\.1 (\d{3}) ", data)]
+
+
+def test_error_with_unread_body_closes_keep_alive(server):
+    smuggled = request("DELETE", "/transactions/5")
+    data = exchange(server,
+                    request("POST", "/transactions",
+                            {"type": "SEND", "amount": 10, "sender": "a", "receiver": "b"}),
+                    request("PUT", "/transactions/99999", smuggled))
+
+    assert statuses(data) == [201, 404]
+    assert b"Connection: close" in data
+    assert TransactionAPI.store.get(5) is not None
+
+
+def test_ignored_body_is_not_read_as_next_request(server):
+    smuggled = request("DELETE", "/transactions/4")
+    data = exchange(server, request("GET", "/transactions/1", smuggled))
+
+    assert statuses(data) == [200]
+    assert TransactionAPI.store.get(4) is not None
+
+
+def header(data, name):
+    found = re.search(rb"\r\n" + name.encode() + rb": ([^\r]*)", data)
+    return found.group(1).decode() if found else None
+
+
+def test_etag_revalidates_until_a_write(server):
+    first = exchange(server, request("GET", "/transactions/1", headers={"Connection": "close"}))
+    etag = header(first, "ETag")
+    assert statuses(first) == [200] and etag
+
+    data = exchange(server,
+                    request("GET", "/transactions/1", headers={"If-None-Match": etag}),
+                    request("PUT", "/transactions/1", {"amount": 999}),
+                    request("GET", "/transactions/1",
+                            headers={"If-None-Match": etag, "Connection": "close"}))
+    assert statuses(data) == [304, 200, 200]
+    assert b'"amount":999' in data.replace(b" ", b"")
+    assert data.count(etag.encode()) == 1
+
+
+def call(address, method, path, body=None, headers=None):
+    """One request on its own connection: (status, headers, decoded JSON body)"""
+    conn = http.client.HTTPConnection(*address, timeout=5)
+    try:
+        data = body if isinstance(body, bytes) else (json.dumps(body) if body is not None else None)
+        conn.request(method, path, body=data, headers={"Authorization": AUTH, **(headers or {})})
+        response = conn.getresponse()
+        payload = response.read()
+        return response.status, response, json.loads(payload) if payload else None
+    finally:
+        conn.close()
+
+
+def test_bulk_items_fail_independently(server):
+    items = [{"type": "SEND", "amount": 10, "sender": "a", "receiver": "b"},
+             {"type": "GIFT", "amount": 10, "sender": "a", "receiver": "b"},
+             {"type": "SEND", "amount": 10, "sender": ["a"], "receiver": "b"},
+             {"type": "SEND", "amount": 20, "sender": "c", "receiver": "d"}]
+    ndjson = "\n".join(json.dumps(item) for item in items[:2]) + "\n{not json\n" + json.dumps(items[3])
+    status, _, body = call(server, "POST", "/transactions/bulk", ndjson.encode(),
+                           {"Content-Type": "application/x-ndjson"})
+    assert status == 200
+    assert [r["status"] for r in body["results"]] == [201, 400, 400, 201]
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    created = [r["id"] for r in body["results"] if r["status"] == 201]
+    assert created == ["6", "7"]
+
+    status, _, body = call(server, "PUT", "/transactions/bulk",
+                           [{"id": "6", "amount": 50}, {"id": "999", "amount": 1}, items[2] | {"id": "7"}])
+    assert [r["status"] for r in body["results"]] == [200, 404, 400]
+    assert TransactionAPI.store.get(6)["amount"] == 50
+
+    status, _, body = call(server, "DELETE", "/transactions/bulk", ["1", {"id": 2}, "abc", "999"])
+    assert [r["status"] for r in body["results"]] == [200, 200, 400, 404]
+    assert TransactionAPI.store.get(1) is None and TransactionAPI.store.get(3) is not None
+
+    # Only the applied writes reached the journal, in order
+    ops = [(e["op"], e.get("id") or e["transaction"]["id"])
+           for e in TransactionAPI.journal.iter_entries()]
+    assert ops == [("put", "6"), ("put", "7"), ("put", "6"), ("delete", "1"), ("delete", "2")]
+
+    status, _, body = call(server, "POST", "/transactions/bulk", b"[{]")
+    assert status == 400
+
+
+def test_wrong_method_lists_allowed_methods(server):
+    status, response, body = call(server, "PATCH", "/transactions/1")
+    assert status == 501  # not a method the server dispatches at all
+
+    status, response, body = call(server, "POST", "/transactions/1", {})
+    assert status == 405 and response.getheader("Allow") == "DELETE, GET, PUT"
+    status, response, body = call(server, "DELETE", "/analytics")
+    assert status == 405 and response.getheader("Allow") == "GET"
+    status, response, body = call(server, "GET", "/transactions/1/extra")
+    assert status == 404
+
+
+def test_unauthorized_before_routing(server):
+    status, response, body = call(server, "GET", "/transactions/1",
+                                  headers={"Authorization": "Basic " + base64.b64encode(b"admin:nope").decode()})
+    assert status == 401 and response.getheader("WWW-Authenticate") == 'Basic realm="API"'
+
+
+def test_users_answer_404_without_rollups(server, monkeypatch):
+    monkeypatch.setattr(TransactionAPI, "rollups", None)
+    for path in ("/users", "/users/0788000001", "/users/0788000001/history"):
+        status, _, body = call(server, "GET", path)
+        assert status == 404 and "MOMO_ROLLUPS" in body["error"]
+
+
+def test_compaction_leaves_rollups_json_to_shutdown(server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(TransactionAPI.journal, "compact_every", 2)
+    for amount in (10, 20):
+        status, _, _ = call(server, "POST", "/transactions",
+                            {"type": "SEND", "amount": amount, "sender": "a", "receiver": "b"})
+        assert status == 201
+
+    assert TransactionAPI.journal.entries == 0
+    assert os.path.exists("data/processed/dashboard.json")
+    assert not os.path.exists("data/processed/rollups.json")
+
+    TransactionAPI.save_data()
+    with open("data/processed/rollups.json", "rb") as f:
+        assert serializer.load(f)["users"]["a"]["total_sent"] == 30
+
+
+def test_idle_keep_alive_connections_yield_to_queued_ones(server):
+    # Two idle keep-alive clients on a two-worker pool
+    idle = [http.client.HTTPConnection(*server, timeout=5) for _ in range(2)]
+    for conn in idle:
+        conn.request("GET", "/transactions/1", headers={"Authorization": AUTH})
+        assert conn.getresponse().read()
+
+    start = time.monotonic()
+    status, _, _ = call(server, "GET", "/transactions/2")
+    assert status == 200 and time.monotonic() - start < 1
+    for conn in idle:
+        conn.close()
+
+
+def test_idle_keep_alive_connection_times_out(server, monkeypatch):
+    monkeypatch.setattr(TransactionAPI, "idle_timeout", 0.2)
+    with socket.create_connection(server, timeout=5) as sock:
+        sock.sendall(request("GET", "/transactions/1"))
+        start = time.monotonic()
+        data = b""
+        while chunk := sock.recv(65536):
+            data += chunk
+    assert statuses(data) == [200] and time.monotonic() - start < 2
+
+
+
+def unchunk(data):
+    body = b""
+    while True:
+        size, _, data = data.partition(b"\r\n")
+        if int(size, 16) == 0:
+            return body
+        body += data[:int(size, 16)]
+        data = data[int(size, 16) + 2:]
+
+
+@pytest.mark.parametrize("version", ["HTTP/1.1", "HTTP/1.0"])
+def test_large_list_streams_chunked_or_until_close(server, monkeypatch, version):
+    monkeypatch.setattr(TransactionAPI, "store", TransactionStore([make(n) for n in range(1, 1202)]))
+    raw = request("GET", "/transactions", headers={"Connection": "close"})
+    data = exchange(server, raw.replace(b"HTTP/1.1", version.encode(), 1))
+
+    body = data.partition(b"\r\n\r\n")[2]
+    if version == "HTTP/1.1":
+        assert header(data, "Transfer-Encoding") == "chunked"
+        body = unchunk(body)
+    else:
+        # No length and no chunking: closing the connection ends the body
+        assert header(data, "Transfer-Encoding") is None and header(data, "Content-Length") is None
+    assert json.loads(body)["count"] == 1201
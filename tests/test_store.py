@@ -0,0 +1,162 @@
+import pytest
+
+from api.analytics import AnalyticsEngine
+from api.rollups import RollupEngine
+from api.schemas import UPDATABLE_FIELDS, validate_changes, validate_transaction
+from api.store import TransactionStore
+from dsa.record import CodeTable
+from dsa.snapshot import MappedSnapshot, write_snapshot
+
+
+def make(tid, **fields):
+    return {"id": str(tid), "type": "SEND", "amount": 100.0, "sender": "0788000001",
+            "receiver": "0788000002", "timestamp": f"2024-01-{tid:02d}T10:00:00",
+            "status": "completed", "reference": f"TXN{tid:06d}", **fields}
+
+
+class FailingListener:
+    """Listener that raises on the first add of a chosen id"""
+
+    def __init__(self, fail_id):
+        self.fail_id = fail_id
+        self.ids = set()
+
+    def on_reset(self):
+        self.ids = set()
+
+    def on_add(self, transaction):
+        if transaction.id == self.fail_id:
+            self.fail_id = None
+            raise RuntimeError("listener failed")
+        self.ids.add(transaction.id)
+
+    def on_remove(self, transaction):
+        self.ids.discard(transaction.id)
+
+
+def test_query_uses_indexes_after_writes():
+    store = TransactionStore([make(n) for n in range(1, 6)])
+    store.update(2, {"sender": "0799000000"})
+    store.delete(3)
+
+    page, cursor = store.query(prefixes={"sender": "0799"})
+    assert [t["id"] for t in page] == ["2"] and cursor is None
+    page, cursor = store.query(filters={"sender": "0788000001"}, limit=2)
+    assert [t["id"] for t in page] == ["1", "4"] and cursor == "4"
+    assert store.get_by_reference("TXN000003") is None
+
+
+def test_failed_listener_leaves_store_unchanged():
+    store = TransactionStore([make(n) for n in range(1, 4)])
+    analytics = AnalyticsEngine()
+    store.subscribe(analytics)
+    store.subscribe(FailingListener(fail_id=4))
+    before = analytics.snapshot()
+
+    with pytest.raises(RuntimeError):
+        store.add(make(4, sender="0799000000"))
+
+    assert store.get(4) is None and len(store) == 3
+    assert store.find_prefix("sender", "0799") == []
+    assert store.get_by_reference("TXN000004") is None
+    assert analytics.snapshot() == before
+
+    # The next write goes through normally
+    store.add(make(4))
+    assert store.get(4)["reference"] == "TXN000004"
+    assert analytics.count == 4
+
+
+def test_schema_rejects_non_string_fields():
+    body = make(1)
+    del body["id"]
+    assert validate_transaction(body)["sender"] == "0788000001"
+
+    for field, value in (("sender", ["x"]), ("receiver", 7), ("reference", {}),
+                         ("timestamp", 1705312200), ("status", 5)):
+        with pytest.raises(ValueError):
+            validate_transaction({**body, field: value})
+        if field in UPDATABLE_FIELDS:
+            with pytest.raises(ValueError):
+                validate_changes({field: value})
+
+
+def test_amount_must_be_finite():
+    body = make(1)
+    del body["id"]
+    assert validate_transaction({**body, "amount": "12.5"})["amount"] == 12.5
+    for value in ("inf", "Infinity", "nan", 1e309, -5, 0):
+        with pytest.raises(ValueError):
+            validate_transaction({**body, "amount": value})
+        with pytest.raises(ValueError):
+            validate_changes({"amount": value})
+
+
+def test_timestamp_must_be_iso():
+    body = make(1)
+    del body["id"]
+    for value in ("2024-01-15", "2024-01-15T10:30:00", "2024-01-15 10:30:00.5+02:00"):
+        assert validate_transaction({**body, "timestamp": value})["timestamp"] == value
+    for value in ("20240115", "15/01/2024", "2024-13-01T00:00:00", "2024-01-15T25:00:00"):
+        with pytest.raises(ValueError):
+            validate_transaction({**body, "timestamp": value})
+
+
+def test_analytics_accepts_rows_without_iso_timestamp():
+    store = TransactionStore([make(1)])
+    analytics = AnalyticsEngine()
+    store.subscribe(analytics)
+
+    store.add(make(2, timestamp=1705312200))
+    store.delete(2)
+    assert analytics.count == 1 and list(analytics.daily) == ["2024-01-01"]
+
+
+def test_rollups_accept_rows_without_iso_timestamp():
+    store = TransactionStore([make(1)])
+    rollups = RollupEngine()
+    store.subscribe(rollups)
+    before = rollups.snapshot()
+
+    store.add(make(2, timestamp=1705312200, receiver=None))
+    assert rollups.balance("0788000001")["total_transactions"] == 2
+    assert [w["period"] for w in rollups.history("0788000001")] == ["2024-01-01"]
+    store.delete(2)
+    assert rollups.snapshot() == before
+
+
+def test_status_must_be_known():
+    body = make(1)
+    del body["id"]
+    assert validate_transaction({**body, "status": "reversed"})["status"] == "reversed"
+    for value in ("Completed", "refunded", ""):
+        with pytest.raises(ValueError):
+            validate_transaction({**body, "status": value})
+        with pytest.raises(ValueError):
+            validate_changes({"status": value})
+
+
+def test_code_table_rejects_non_strings_without_registering():
+    table = CodeTable(("completed", "pending"))
+    for value in (5, ["x"]):
+        with pytest.raises(TypeError):
+            table.code(value)
+    assert table.values == ["completed", "pending"]
+    assert table.code("reversed") == 2 and table.value(2) == "reversed"
+
+
+def test_hydrate_keeps_the_cold_view_consistent_for_racing_readers(tmp_path):
+    path = str(tmp_path / "transactions.snap")
+    write_snapshot(path, [make(n) for n in range(1, 6)])
+    store = TransactionStore()
+    store.load_snapshot(MappedSnapshot(path))
+    store.update(3, {"amount": 999.0})
+    store.delete(4)
+
+    # What get() sees if hydrate() runs between its read of _base and _overlay
+    base = store._base
+    store.hydrate()
+    overlay = store._overlay
+    assert base is not None and overlay[3]["amount"] == 999.0 and overlay[4] is None
+
+    assert store.get(3)["amount"] == 999.0 and store.get(4) is None and len(store) == 4